@@ -1,6 +1,4 @@
 from logging.config import fileConfig
-from sqlalchemy import engine_from_config
-from sqlalchemy import pool, create_engine
 from alembic import context
 import os
 import sys
@@ -9,6 +7,7 @@ import sys
 sys.path.insert(0, os.path.realpath(os.path.join(os.path.dirname(__file__), '..')))
 
 from app.core.config import settings
+from app.core.database import create_db_engine, normalize_database_url
 from app.db.base import Base
 
 # This is the Alembic Config object
@@ -22,7 +21,7 @@ target_metadata = Base.metadata
 
 def run_migrations_offline() -> None:
     """Run migrations in 'offline' mode."""
-    url = settings.DATABASE_URL
+    url, _ = normalize_database_url(settings.DATABASE_URL)
     context.configure(
         url=url,
         target_metadata=target_metadata,
@@ -35,11 +34,8 @@ def run_migrations_offline() -> None:
 
 def run_migrations_online() -> None:
     """Run migrations in 'online' mode."""
-    # Tạo engine trực tiếp từ DATABASE_URL trong settings
-    connectable = create_engine(
-        settings.DATABASE_URL,
-        poolclass=pool.NullPool,
-    )
+    # Dùng chung engine factory với app; migration không cần giữ pool
+    connectable = create_db_engine(pool_mode="null")
 
     with connectable.connect() as connection:
         context.configure(
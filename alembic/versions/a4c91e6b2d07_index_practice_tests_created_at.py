@@ -0,0 +1,40 @@
+"""Index practice_tests.created_at for the retention job
+
+Revision ID: a4c91e6b2d07
+Revises: f7a3c8e21d56
+Create Date: 2026-10-17 15:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a4c91e6b2d07'
+down_revision: Union[str, Sequence[str], None] = 'f7a3c8e21d56'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Job dọn dữ liệu quét đề cũ theo created_at; CONCURRENTLY để không khóa ghi bảng
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_practice_tests_created_at',
+            'practice_tests',
+            ['created_at'],
+            unique=False,
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            'ix_practice_tests_created_at', table_name='practice_tests', postgresql_concurrently=True, if_exists=True
+        )
@@ -0,0 +1,50 @@
+"""Add pregenerated_selections for the pre-generated test pool
+
+Revision ID: b8d2f4a61c39
+Revises: a4c91e6b2d07
+Create Date: 2026-10-17 18:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b8d2f4a61c39'
+down_revision: Union[str, Sequence[str], None] = 'a4c91e6b2d07'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('pregenerated_selections',
+    sa.Column('subject', sa.String(), nullable=False),
+    sa.Column('topic', sa.String(), nullable=False),
+    sa.Column('level', sa.String(), nullable=False),
+    sa.Column('question_count', sa.Integer(), nullable=False),
+    sa.Column('question_ids', sa.String(), nullable=False),
+    sa.Column('claimed_at', sa.DateTime(), nullable=True),
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_pregenerated_selections_id'), 'pregenerated_selections', ['id'], unique=False)
+    # Chỉ chứa dòng chưa giao: claim đọc dòng đầu tiên theo tiêu chí
+    op.create_index(
+        'ix_pregenerated_selections_ready',
+        'pregenerated_selections',
+        ['subject', 'topic', 'level', 'question_count', 'id'],
+        unique=False,
+        postgresql_where=sa.text('claimed_at IS NULL'),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_pregenerated_selections_ready', table_name='pregenerated_selections')
+    op.drop_index(op.f('ix_pregenerated_selections_id'), table_name='pregenerated_selections')
+    op.drop_table('pregenerated_selections')
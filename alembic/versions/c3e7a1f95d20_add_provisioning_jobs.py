@@ -0,0 +1,70 @@
+"""Add provisioning_jobs and provisioning_rows for resumable bulk provisioning
+
+Revision ID: c3e7a1f95d20
+Revises: b8d2f4a61c39
+Create Date: 2026-10-18 09:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c3e7a1f95d20'
+down_revision: Union[str, Sequence[str], None] = 'b8d2f4a61c39'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('provisioning_jobs',
+    sa.Column('created_by', sa.Integer(), nullable=True),
+    sa.Column('filename', sa.String(), nullable=True),
+    sa.Column('status', sa.String(), nullable=False),
+    sa.Column('total_rows', sa.Integer(), nullable=False),
+    sa.Column('processed_rows', sa.Integer(), nullable=False),
+    sa.Column('created_count', sa.Integer(), nullable=False),
+    sa.Column('conflict_count', sa.Integer(), nullable=False),
+    sa.Column('invalid_count', sa.Integer(), nullable=False),
+    sa.Column('heartbeat_at', sa.DateTime(), nullable=True),
+    sa.Column('finished_at', sa.DateTime(), nullable=True),
+    sa.Column('error', sa.Text(), nullable=True),
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['created_by'], ['users.id'], ondelete='SET NULL'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_provisioning_jobs_id'), 'provisioning_jobs', ['id'], unique=False)
+    op.create_table('provisioning_rows',
+    sa.Column('job_id', sa.Integer(), nullable=False),
+    sa.Column('row', sa.Integer(), nullable=False),
+    sa.Column('username', sa.String(), nullable=False),
+    sa.Column('email', sa.String(), nullable=False),
+    sa.Column('full_name', sa.String(), nullable=False),
+    sa.Column('status', sa.String(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=True),
+    sa.Column('message', sa.String(), nullable=False),
+    sa.Column('password', sa.String(), nullable=True),
+    sa.Column('temporary_password', sa.String(), nullable=True),
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['job_id'], ['provisioning_jobs.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_provisioning_rows_id'), 'provisioning_rows', ['id'], unique=False)
+    # Runner đọc các dòng pending của job theo thứ tự dòng CSV
+    op.create_index('ix_provisioning_rows_job_status_row', 'provisioning_rows', ['job_id', 'status', 'row'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_provisioning_rows_job_status_row', table_name='provisioning_rows')
+    op.drop_index(op.f('ix_provisioning_rows_id'), table_name='provisioning_rows')
+    op.drop_table('provisioning_rows')
+    op.drop_index(op.f('ix_provisioning_jobs_id'), table_name='provisioning_jobs')
+    op.drop_table('provisioning_jobs')
@@ -0,0 +1,52 @@
+"""Index the columns filtered by submit, result and history queries
+
+Revision ID: d5e2a9c14b73
+Revises: 8c4d1e7a2f90
+Create Date: 2026-10-17 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd5e2a9c14b73'
+down_revision: Union[str, Sequence[str], None] = '8c4d1e7a2f90'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# (tên index, bảng, cột, cột INCLUDE)
+INDEXES = [
+    ('ix_submissions_student_id_submitted_at', 'submissions', ['student_id', 'submitted_at'], None),
+    ('ix_submissions_test_id', 'submissions', ['test_id'], ['id']),
+    ('ix_practice_tests_student_id', 'practice_tests', ['student_id'], None),
+    ('ix_grading_results_submission_id', 'grading_results', ['submission_id'], None),
+    ('ix_learning_suggestions_result_id', 'learning_suggestions', ['result_id'], None),
+    ('ix_questions_subject_topic_level', 'questions', ['subject', 'topic', 'level'], ['id']),
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # CREATE INDEX CONCURRENTLY không chạy được trong transaction và không khóa ghi bảng
+    with op.get_context().autocommit_block():
+        for name, table, columns, include in INDEXES:
+            op.create_index(
+                name,
+                table,
+                columns,
+                unique=False,
+                postgresql_include=include or [],
+                postgresql_concurrently=True,
+                if_not_exists=True,
+            )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        for name, table, _, _ in reversed(INDEXES):
+            op.drop_index(name, table_name=table, postgresql_concurrently=True, if_exists=True)
@@ -0,0 +1,116 @@
+"""Partition submissions and grading_results by month of created_at
+
+Revision ID: f7a3c8e21d56
+Revises: d5e2a9c14b73
+Create Date: 2026-10-17 14:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f7a3c8e21d56'
+down_revision: Union[str, Sequence[str], None] = 'd5e2a9c14b73'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# Số tháng tạo sẵn partition phía trước; scripts/manage_partitions.py tạo tiếp về sau
+MONTHS_AHEAD = 3
+
+# (bảng, index: (tên, cột, cột INCLUDE))
+TABLES = [
+    ('submissions', [
+        ('ix_submissions_id', ['id'], None),
+        ('ix_submissions_student_id_submitted_at', ['student_id', 'submitted_at'], None),
+        ('ix_submissions_test_id', ['test_id'], ['id']),
+    ]),
+    ('grading_results', [
+        ('ix_grading_results_id', ['id'], None),
+        ('ix_grading_results_submission_id', ['submission_id'], None),
+    ]),
+]
+
+FOREIGN_KEYS = {
+    'submissions': [
+        ('submissions_student_id_fkey', 'student_id', 'users'),
+        ('submissions_test_id_fkey', 'test_id', 'practice_tests'),
+    ],
+    'grading_results': [],
+}
+
+
+def _create_monthly_partitions(table: str) -> None:
+    # Partition từ tháng của dòng cũ nhất tới MONTHS_AHEAD tháng sau; dòng ngoài khoảng vào DEFAULT
+    op.execute(f"""
+        DO $$
+        DECLARE
+            bound date := date_trunc('month', coalesce(
+                (SELECT min(created_at) FROM {table}_unpartitioned), now()))::date;
+            last_bound date := (date_trunc('month', now()) + interval '{MONTHS_AHEAD} months')::date;
+        BEGIN
+            WHILE bound <= last_bound LOOP
+                EXECUTE format(
+                    'CREATE TABLE %I PARTITION OF {table} FOR VALUES FROM (%L) TO (%L)',
+                    '{table}_p' || to_char(bound, 'YYYY_MM'), bound, (bound + interval '1 month')::date
+                );
+                bound := (bound + interval '1 month')::date;
+            END LOOP;
+        END $$;
+    """)
+    op.execute(f"CREATE TABLE {table}_default PARTITION OF {table} DEFAULT")
+
+
+def _swap_in(table: str, partitioned: bool) -> None:
+    """Tạo lại bảng (có hoặc không partition), chép dữ liệu, giữ sequence của cột id."""
+    op.execute(f"ALTER TABLE {table} RENAME TO {table}_unpartitioned")
+    partition_clause = " PARTITION BY RANGE (created_at)" if partitioned else ""
+    op.execute(f"CREATE TABLE {table} (LIKE {table}_unpartitioned INCLUDING DEFAULTS){partition_clause}")
+    if partitioned:
+        _create_monthly_partitions(table)
+    op.execute(f"INSERT INTO {table} SELECT * FROM {table}_unpartitioned")
+    op.execute(f"ALTER SEQUENCE {table}_id_seq OWNED BY NONE")
+    op.execute(f"DROP TABLE {table}_unpartitioned")
+    op.execute(f"ALTER SEQUENCE {table}_id_seq OWNED BY {table}.id")
+
+    # Khóa chính của bảng partition phải chứa cột partition
+    primary_key = "id, created_at" if partitioned else "id"
+    op.execute(f"ALTER TABLE {table} ADD CONSTRAINT {table}_pkey PRIMARY KEY ({primary_key})")
+    for name, column, referenced in FOREIGN_KEYS[table]:
+        op.create_foreign_key(name, table, referenced, [column], ['id'])
+
+
+def _create_indexes(table: str, indexes) -> None:
+    for name, columns, include in indexes:
+        op.create_index(name, table, columns, unique=False, postgresql_include=include or [])
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Khóa ngoại trỏ tới bảng partition phải chứa cả created_at; quan hệ
+    # submission -> result -> suggestion chỉ còn được giữ ở tầng ứng dụng
+    op.drop_constraint('learning_suggestions_result_id_fkey', 'learning_suggestions', type_='foreignkey')
+    op.drop_constraint('grading_results_submission_id_fkey', 'grading_results', type_='foreignkey')
+
+    for table, indexes in TABLES:
+        _swap_in(table, partitioned=True)
+        _create_indexes(table, indexes)
+        op.execute(f"ANALYZE {table}")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # Partition đã detach (archive) không được chép lại
+    for table, indexes in reversed(TABLES):
+        _swap_in(table, partitioned=False)
+        _create_indexes(table, indexes)
+
+    op.create_foreign_key(
+        'grading_results_submission_id_fkey', 'grading_results', 'submissions', ['submission_id'], ['id']
+    )
+    op.create_foreign_key(
+        'learning_suggestions_result_id_fkey', 'learning_suggestions', 'grading_results', ['result_id'], ['id']
+    )
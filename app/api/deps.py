@@ -1,27 +1,68 @@
 
-from typing import Generator
-from fastapi import Depends, HTTPException, status
+import secrets
+from typing import AsyncGenerator
+from fastapi import Depends, HTTPException, Request, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import jwt, JWTError
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.core.config import settings
-from app.core.database import SessionLocal
-from app.models.account import User
+from app.core.database import AsyncSessionLocal
+from app.db import queries
 from app.core.exceptions import AuthException
+from app.core.auth_cache import AuthState, Principal, principal_cache, token_version_cache
+from app.core.replicas import LAST_WRITE_HEADER, USER_ID_KEY, parse_last_write, replica_router
+from app.core.shards import shard_router
 
 reusable_oauth2 = OAuth2PasswordBearer(tokenUrl=f"{settings.API_V1_STR}/auth/student/login")
 
-def get_db() -> Generator:
-    try:
-        db = SessionLocal()
+async def get_db() -> AsyncGenerator[AsyncSession, None]:
+    # AsyncSession chỉ lấy connection từ pool ở câu lệnh đầu tiên và trả lại
+    # khi commit/rollback; endpoint dùng ManagedRoute còn đóng session
+    # ngay khi handler trả về (xem app/api/routing.py)
+    async with AsyncSessionLocal() as db:
         yield db
-    finally:
-        db.close()
 
-def get_current_user(
-    db: Session = Depends(get_db),
+def get_client_ip(request: Request) -> str | None:
+    # Client tự ghi được phần đầu của x-forwarded-for; mỗi proxy tin cậy (Vercel/Render)
+    # nối IP nó thấy vào cuối, nên IP thật là phần tử thứ TRUSTED_PROXY_HOPS tính từ cuối
+    hops = settings.TRUSTED_PROXY_HOPS
+    forwarded_for = request.headers.get("x-forwarded-for")
+    if hops > 0 and forwarded_for:
+        entries = [e.strip() for e in forwarded_for.split(",") if e.strip()]
+        if len(entries) >= hops:
+            return entries[-hops]
+    return request.client.host if request.client else None
+
+async def _load_auth_state(db: AsyncSession, user_id: int) -> AuthState | None:
+    state = token_version_cache.get(user_id)
+    if state is not None:
+        return state
+    row = await queries.get_auth_state(db, user_id)
+    # Kết thúc transaction chỉ đọc: trả connection về pool trong lúc handler chưa cần DB
+    await db.rollback()
+    if row is None:
+        return None
+    state = AuthState(token_version=row.token_version, role=row.role, active=row.is_active and not row.is_locked)
+    token_version_cache.set(user_id, state)
+    return state
+
+async def get_current_user(
+    db: AsyncSession = Depends(get_db),
     token: str = Depends(reusable_oauth2)
-) -> User:
+) -> Principal:
+    principal = principal_cache.get(token)
+    if principal is not None:
+        # Principal cache sống lâu hơn token_version_cache: vẫn so ver với trạng thái
+        # hiện tại (thường có sẵn trong cache) để thu hồi token có hiệu lực sau tối đa
+        # TOKEN_VERSION_CACHE_TTL_SECONDS ở mọi worker
+        state = await _load_auth_state(db, principal.id)
+        if state is None or not state.active or state.token_version != principal.token_version:
+            principal_cache.invalidate_user(principal.id)
+            raise AuthException("Token has been revoked")
+        db.info[USER_ID_KEY] = principal.id
+        shard_router.bind_student(db, principal.id)
+        return principal
+
     try:
         payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
         user_id: str = payload.get("sub")
@@ -34,18 +75,58 @@ def get_current_user(
         logging.error(f"JWT Decode Error: {str(e)}")
         raise AuthException()
     
-    user = db.query(User).filter(User.id == int(user_id)).first()
-    if not user:
+    state = await _load_auth_state(db, int(user_id))
+    if state is None:
         import logging
         logging.error(f"User not found for ID: {user_id}")
         raise AuthException("User not found")
-    if not user.is_active:
+    if not state.active:
         import logging
         logging.error(f"User account is inactive for ID: {user_id}")
         raise AuthException("User account is inactive")
-    return user
+    # Token cũ (trước khi có claim ver) được coi là version 0
+    token_version = payload.get("ver", 0)
+    if token_version != state.token_version:
+        raise AuthException("Token has been revoked")
 
-def get_current_student(current_user: User = Depends(get_current_user)) -> User:
+    principal = Principal(id=int(user_id), role=payload.get("role") or state.role, token_version=token_version)
+    principal_cache.set(token, principal, token_exp=payload.get("exp"))
+    # Ghi nhận user để bật read-your-writes khi request này commit dữ liệu
+    db.info[USER_ID_KEY] = principal.id
+    # Dữ liệu học tập của request nằm trên shard của chính user này
+    shard_router.bind_student(db, principal.id)
+    return principal
+
+async def get_read_db(
+    request: Request, current_user: Principal = Depends(get_current_user)
+) -> AsyncGenerator[AsyncSession, None]:
+    """Session cho route chỉ đọc: replica nếu có, primary nếu user vừa ghi dữ liệu."""
+    last_write_at = parse_last_write(request.headers.get(LAST_WRITE_HEADER))
+    async with replica_router.session(current_user.id, last_write_at) as db:
+        shard_router.bind_student(db, current_user.id)
+        yield db
+
+def get_current_student(current_user: Principal = Depends(get_current_user)) -> Principal:
     if current_user.role != "student":
         raise HTTPException(status_code=403, detail="The user doesn't have enough privileges")
     return current_user
+
+def get_current_teacher(current_user: Principal = Depends(get_current_user)) -> Principal:
+    if current_user.role not in ("teacher", "admin"):
+        raise HTTPException(status_code=403, detail="The user doesn't have enough privileges")
+    return current_user
+
+def get_current_admin(current_user: Principal = Depends(get_current_user)) -> Principal:
+    if current_user.role != "admin":
+        raise HTTPException(status_code=403, detail="The user doesn't have enough privileges")
+    return current_user
+
+async def require_metrics_access(request: Request, db: AsyncSession = Depends(get_db)) -> None:
+    """/metrics: header X-Metrics-Token khớp METRICS_TOKEN (cho scraper) hoặc access token admin."""
+    metrics_token = settings.METRICS_TOKEN
+    if metrics_token and secrets.compare_digest(request.headers.get("x-metrics-token", ""), metrics_token):
+        return
+    scheme, _, token = request.headers.get("authorization", "").partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        raise AuthException()
+    get_current_admin(await get_current_user(db, token))
@@ -0,0 +1,114 @@
+import asyncio
+import functools
+import logging
+from typing import Any, Callable
+
+from fastapi import Request
+from fastapi.routing import APIRoute
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.deadlines import is_statement_timeout, reset_deadline, set_deadline
+from app.core.exceptions import GatewayTimeoutException
+from app.core.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+DEADLINE_HEADER = "x-request-deadline-ms"
+# Tên tham số dùng để FastAPI truyền Request vào endpoint không khai báo Request
+_REQUEST_PARAM = "_managed_route_request"
+
+
+def deadline(seconds: float) -> Callable:
+    """Đặt ngân sách thời gian riêng cho một endpoint (mặc định REQUEST_DEADLINE_SECONDS)."""
+    def decorator(endpoint: Callable) -> Callable:
+        endpoint.deadline_seconds = seconds
+        return endpoint
+    return decorator
+
+
+class ManagedRoute(APIRoute):
+    """
+    Route cho các endpoint dùng DB:
+    - chạy handler trong hạn chót của route (header X-Request-Deadline-Ms có thể
+      đổi, tối đa REQUEST_DEADLINE_MAX_SECONDS); transaction Postgres nhận
+      SET LOCAL statement_timeout theo thời gian còn lại; quá hạn trả 504
+    - hủy handler (và câu lệnh đang chạy) khi client ngắt kết nối
+    - đóng các AsyncSession ngay khi handler trả về, trước khi FastAPI
+      serialize response; transaction chưa commit sẽ bị rollback
+    """
+
+    def get_route_handler(self) -> Callable:
+        call = self.dependant.call
+        if call is not None and asyncio.iscoroutinefunction(call):
+            request_param = self.dependant.request_param_name
+            if request_param is None:
+                request_param = self.dependant.request_param_name = _REQUEST_PARAM
+            budget = getattr(call, "deadline_seconds", settings.REQUEST_DEADLINE_SECONDS)
+            self.dependant.call = _managed(call, request_param, budget, self.path)
+        return super().get_route_handler()
+
+
+def _budget_for(request: Request, default: float) -> float:
+    raw = request.headers.get(DEADLINE_HEADER)
+    if raw:
+        try:
+            return min(max(int(raw), 1) / 1000, settings.REQUEST_DEADLINE_MAX_SECONDS)
+        except ValueError:
+            pass
+    return default
+
+
+async def _wait_for_disconnect(request: Request) -> None:
+    """
+    Chờ message http.disconnect từ server. Body đã được FastAPI đọc trước khi gọi
+    endpoint, nên receive() chỉ trả về khi client ngắt (hoặc response đã gửi xong).
+    Không dùng request.is_disconnected(): CancelScope bên trong nó có thể nuốt
+    lệnh cancel của task này.
+    """
+    while True:
+        message = await request.receive()
+        if message["type"] == "http.disconnect":
+            return
+
+
+def _managed(call: Callable, request_param: str, default_budget: float, path: str) -> Callable:
+    @functools.wraps(call)
+    async def endpoint(**kwargs: Any) -> Any:
+        request: Request = kwargs[request_param]
+        if request_param == _REQUEST_PARAM:
+            del kwargs[request_param]
+        budget = _budget_for(request, default_budget)
+        token = set_deadline(budget)
+        # Task con kế thừa context (hạn chót, thống kê query) của request
+        handler = asyncio.ensure_future(call(**kwargs))
+        watcher = asyncio.ensure_future(_wait_for_disconnect(request))
+        try:
+            done, _ = await asyncio.wait({handler, watcher}, timeout=budget, return_when=asyncio.FIRST_COMPLETED)
+            if handler in done:
+                try:
+                    return handler.result()
+                except Exception as e:
+                    if is_statement_timeout(e):
+                        metrics.inc("request_deadline_exceeded_total")
+                        raise GatewayTimeoutException() from e
+                    raise
+            if watcher in done:
+                metrics.inc("request_client_disconnected_total")
+                logger.info(f"Client disconnected, cancelled {request.method} {path}")
+            else:
+                metrics.inc("request_deadline_exceeded_total")
+                logger.warning(f"Deadline of {budget:.1f}s exceeded on {request.method} {path}")
+            raise GatewayTimeoutException()
+        finally:
+            reset_deadline(token)
+            for task in (handler, watcher):
+                if not task.done():
+                    task.cancel()
+            # Chờ handler dừng hẳn để không còn ai dùng session khi đóng nó;
+            # watcher không giữ tài nguyên nên không cần chờ
+            await asyncio.gather(handler, return_exceptions=True)
+            for value in kwargs.values():
+                if isinstance(value, AsyncSession):
+                    await value.close()
+    return endpoint
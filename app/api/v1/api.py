@@ -1,5 +1,5 @@
 from fastapi import APIRouter
-from app.api.v1.endpoints import auth, auth_google, tests, submit, results, history
+from app.api.v1.endpoints import auth, auth_google, tests, submit, results, history, admin
 
 api_router = APIRouter()
 
@@ -12,4 +12,5 @@ api_router.include_router(auth_google.router, prefix="/auth", tags=["Google OAut
 api_router.include_router(tests.router, prefix="/practice-tests", tags=["Practice Tests"])
 api_router.include_router(submit.router, prefix="/practice-tests", tags=["Submission"])
 api_router.include_router(results.router, prefix="/submissions", tags=["Results & Suggestions"])
-api_router.include_router(history.router, prefix="/students", tags=["Learning History"])
\ No newline at end of file
+api_router.include_router(history.router, prefix="/students", tags=["Learning History"])
+api_router.include_router(admin.router, prefix="/admin", tags=["Administration"])
\ No newline at end of file
@@ -0,0 +1,85 @@
+from fastapi import APIRouter, Depends, UploadFile, File
+from fastapi.responses import Response
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.api import deps
+from app.api.routing import ManagedRoute
+from app.services.provisioning_service import provisioning_service
+from app.core.auth_cache import Principal
+from app.core.response import APIResponse
+
+router = APIRouter(route_class=ManagedRoute)
+
+@router.post("/students/bulk", status_code=202)
+async def bulk_provision_students(
+    file: UploadFile = File(...),
+    db: AsyncSession = Depends(deps.get_db),
+    current_user: Principal = Depends(deps.get_current_admin)
+):
+    """
+    Tạo tài khoản học sinh hàng loạt từ file CSV (username, email, full_name, password tùy chọn).
+    Chỉ kiểm tra và lưu các dòng thành job; tài khoản được tạo nền. Theo dõi tiến độ ở
+    GET /students/bulk/{job_id}, tải CSV kết quả (created / conflict / invalid) ở .../result.
+    """
+    rows = provisioning_service.read_rows(file.file)
+    job = await provisioning_service.create_job(db, rows, created_by=current_user.id, filename=file.filename)
+    provisioning_service.start_job(job.id)
+    return APIResponse.success(data=provisioning_service.summary(job), message="Đã nhận file, đang tạo tài khoản")
+
+@router.get("/students/bulk")
+async def list_provisioning_jobs(
+    db: AsyncSession = Depends(deps.get_db),
+    current_user: Principal = Depends(deps.get_current_admin)
+):
+    jobs = await provisioning_service.list_jobs(db)
+    return APIResponse.success(data=[provisioning_service.summary(job) for job in jobs])
+
+@router.get("/students/bulk/{job_id}")
+async def get_provisioning_job(
+    job_id: int,
+    db: AsyncSession = Depends(deps.get_db),
+    current_user: Principal = Depends(deps.get_current_admin)
+):
+    job = await provisioning_service.get_job(db, job_id)
+    return APIResponse.success(data=provisioning_service.summary(job))
+
+@router.get("/students/bulk/{job_id}/result")
+async def get_provisioning_result(
+    job_id: int,
+    db: AsyncSession = Depends(deps.get_db),
+    current_user: Principal = Depends(deps.get_current_admin)
+):
+    """CSV kết quả từng dòng; dòng chưa xử lý xong có trạng thái pending."""
+    job = await provisioning_service.get_job(db, job_id)
+    results = await provisioning_service.result_rows(db, job_id)
+    return Response(
+        content=provisioning_service.to_csv(results),
+        media_type="text/csv",
+        headers={
+            "Content-Disposition": f'attachment; filename="provisioning_result_{job_id}.csv"',
+            "X-Provision-Status": job.status,
+            "X-Provision-Created": str(job.created_count),
+            "X-Provision-Conflicts": str(job.conflict_count),
+            "X-Provision-Invalid": str(job.invalid_count),
+        },
+    )
+
+@router.post("/students/bulk/{job_id}/resume", status_code=202)
+async def resume_provisioning_job(
+    job_id: int,
+    db: AsyncSession = Depends(deps.get_db),
+    current_user: Principal = Depends(deps.get_current_admin)
+):
+    """Chạy tiếp job bị lỗi hoặc có runner đã dừng (worker restart/deploy) từ các dòng còn pending."""
+    job = await provisioning_service.ensure_resumable(db, job_id)
+    provisioning_service.start_job(job.id)
+    return APIResponse.success(data=provisioning_service.summary(job), message="Đang chạy tiếp job")
+
+@router.delete("/students/bulk/{job_id}")
+async def delete_provisioning_job(
+    job_id: int,
+    db: AsyncSession = Depends(deps.get_db),
+    current_user: Principal = Depends(deps.get_current_admin)
+):
+    """Xóa job và kết quả (gồm mật khẩu tạm) sau khi đã tải CSV kết quả."""
+    await provisioning_service.delete_job(db, job_id)
+    return APIResponse.success(message="Đã xóa job")
@@ -1,30 +1,78 @@
 import logging
-from fastapi import APIRouter, Depends
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, BackgroundTasks, Depends, Request
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.api import deps
-from app.schemas.auth import LoginRequest, UserCreate, UserOut
+from app.db import queries
+from app.api.routing import ManagedRoute
+from app.schemas.auth import ChangePasswordRequest, LoginRequest, RefreshRequest, UserCreate, UserOut
 from app.services.auth_service import auth_service
+from app.services.session_service import session_service
 from app.core.response import APIResponse
-from app.models.account import User
+from app.core.rate_limit import login_rate_limiter
+from app.core.auth_cache import Principal
 
 logger = logging.getLogger(__name__)
 
-router = APIRouter()
+router = APIRouter(route_class=ManagedRoute)
 
 @router.post("/login")
-def login(request_data: LoginRequest, db: Session = Depends(deps.get_db)):
-    result = auth_service.authenticate_student(
+async def login(
+    request: Request,
+    request_data: LoginRequest,
+    background_tasks: BackgroundTasks,
+    db: AsyncSession = Depends(deps.get_db)
+):
+    # Chặn brute-force/retry loop trước khi tốn CPU cho bcrypt
+    await login_rate_limiter.check(request_data.username, deps.get_client_ip(request))
+    result = await auth_service.authenticate_student(
         db, 
         username=request_data.username, 
-        password=request_data.password
+        password=request_data.password,
+        background_tasks=background_tasks
     )
     return APIResponse.success(data=result)
 
 @router.post("/register")
-def register(user_in: UserCreate, db: Session = Depends(deps.get_db)):
-    result = auth_service.register_student(db, user_in=user_in)
+async def register(user_in: UserCreate, db: AsyncSession = Depends(deps.get_db)):
+    result = await auth_service.register_student(db, user_in=user_in)
     return APIResponse.success(data=result, message="Đăng ký tài khoản thành công")
 
+@router.post("/refresh")
+async def refresh(request_data: RefreshRequest, db: AsyncSession = Depends(deps.get_db)):
+    result = await auth_service.refresh_tokens(db, refresh_token=request_data.refresh_token)
+    return APIResponse.success(data=result)
+
+@router.post("/logout")
+async def logout(request_data: RefreshRequest, db: AsyncSession = Depends(deps.get_db)):
+    await session_service.revoke(db, refresh_token=request_data.refresh_token)
+    return APIResponse.success(message="Đăng xuất thành công")
+
+@router.post("/change-password")
+async def change_password(
+    request_data: ChangePasswordRequest,
+    db: AsyncSession = Depends(deps.get_db),
+    current_user: Principal = Depends(deps.get_current_user)
+):
+    # Mọi phiên khác (access + refresh token) bị thu hồi; client hiện tại nhận token mới
+    result = await auth_service.change_password(
+        db,
+        user_id=current_user.id,
+        current_password=request_data.current_password,
+        new_password=request_data.new_password,
+    )
+    return APIResponse.success(data=result, message="Đổi mật khẩu thành công")
+
 @router.get("/me", response_model=APIResponse[UserOut])
-def get_me(current_user: User = Depends(deps.get_current_user)):
-    return APIResponse.success(data=current_user)
\ No newline at end of file
+async def get_me(
+    db: AsyncSession = Depends(deps.get_db),
+    current_user: Principal = Depends(deps.get_current_user)
+):
+    user = await queries.get_user_profile(db, current_user.id)
+    return APIResponse.success(data=UserOut(
+        id=user.id,
+        username=user.username,
+        email=user.email,
+        full_name=user.full_name,
+        role=user.role,
+        is_active=user.is_active,
+    ))
\ No newline at end of file
@@ -3,22 +3,18 @@
 import logging
 from urllib.parse import urlencode
 
-import httpx
 from fastapi import APIRouter, HTTPException, Request
 from fastapi.responses import RedirectResponse
 
 from app.core.config import settings
-from app.core.database import SessionLocal
-from app.core.security import create_access_token
+from app.core.database import AsyncSessionLocal
+from app.core.exceptions import AuthException
 from app.services.auth_service import auth_service
+from app.services.google_auth import google_oauth_client
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
 
-GOOGLE_AUTH_URL = "https://accounts.google.com/o/oauth2/v2/auth"
-GOOGLE_TOKEN_URL = "https://oauth2.googleapis.com/token"
-GOOGLE_USERINFO_URL = "https://www.googleapis.com/oauth2/v3/userinfo"
-
 
 def get_dynamic_config(request: Request):
     """Tính toán URL linh hoạt dựa trên request thực tế để hỗ trợ Production/Local."""
@@ -73,7 +69,7 @@ async def google_login(request: Request):
         "access_type": "offline",
         "prompt": "select_account",
     }
-    url = f"{GOOGLE_AUTH_URL}?{urlencode(params)}"
+    url = f"{settings.GOOGLE_AUTH_URL}?{urlencode(params)}"
     return RedirectResponse(url=url)
 
 
@@ -104,77 +100,80 @@ async def google_callback(
         raise HTTPException(status_code=501, detail="Google OAuth chưa được cấu hình")
 
     try:
-        async with httpx.AsyncClient(timeout=15.0) as client:
-            # 1. Trao đổi mã lấy token từ Google
-            token_resp = await client.post(
-                GOOGLE_TOKEN_URL,
-                data={
-                    "code": code,
-                    "client_id": settings.GOOGLE_CLIENT_ID,
-                    "client_secret": settings.GOOGLE_CLIENT_SECRET,
-                    "redirect_uri": redirect_uri,
-                    "grant_type": "authorization_code",
-                },
-                headers={"Content-Type": "application/x-www-form-urlencoded"},
+        # 1. Trao đổi mã lấy token từ Google (client keep-alive dùng chung)
+        token_resp = await google_oauth_client.exchange_code(code, redirect_uri)
+        if token_resp.status_code != 200:
+            logger.error(
+                f"Google token exchange failed (Redirect URI: {redirect_uri}): {token_resp.text[:500]}"
             )
-            if token_resp.status_code != 200:
-                logger.error(
-                    f"Google token exchange failed (Redirect URI: {redirect_uri}): {token_resp.text[:500]}"
-                )
+            return RedirectResponse(
+                url=f"{frontend_url}/auth/callback?error=token_failed&status={token_resp.status_code}",
+                status_code=302,
+            )
+        
+        tokens = token_resp.json()
+        access_token_google = tokens.get("access_token")
+        if not access_token_google:
+            return RedirectResponse(
+                url=f"{frontend_url}/auth/callback?error=no_access_token",
+                status_code=302,
+            )
+
+        # 2. Xác thực id_token cục bộ bằng JWKS đã cache (không cần gọi UserInfo)
+        id_token = tokens.get("id_token")
+        if id_token:
+            try:
+                google_user = await google_oauth_client.verify_id_token(id_token, access_token=access_token_google)
+            except AuthException as e:
+                logger.error(f"Google id_token rejected: {e.detail}")
                 return RedirectResponse(
-                    url=f"{frontend_url}/auth/callback?error=token_failed&status={token_resp.status_code}",
+                    url=f"{frontend_url}/auth/callback?error=user_info_failed",
                     status_code=302,
                 )
-            
-            tokens = token_resp.json()
-            access_token_google = tokens.get("access_token")
-            if not access_token_google:
+            if google_user.get("email_verified") is False:
                 return RedirectResponse(
-                    url=f"{frontend_url}/auth/callback?error=no_access_token",
+                    url=f"{frontend_url}/auth/callback?error=email_missing",
                     status_code=302,
                 )
-
-            # 2. Lấy thông tin người dùng (UserInfo)
-            userinfo_resp = await client.get(
-                GOOGLE_USERINFO_URL,
-                headers={"Authorization": f"Bearer {access_token_google}"},
-            )
+        else:
+            userinfo_resp = await google_oauth_client.fetch_userinfo(access_token_google)
             if userinfo_resp.status_code != 200:
                 logger.error(f"Google UserInfo fetch failed: {userinfo_resp.text[:500]}")
                 return RedirectResponse(
                     url=f"{frontend_url}/auth/callback?error=user_info_failed",
                     status_code=302,
                 )
-            
             google_user = userinfo_resp.json()
-            email = (google_user.get("email") or "").strip().lower()
-            if not email:
-                logger.error("Google profile missing email")
-                return RedirectResponse(
-                    url=f"{frontend_url}/auth/callback?error=email_missing",
-                    status_code=302,
-                )
-            
-            full_name = google_user.get("name", "") or email.split("@")[0]
-            google_id = str(google_user.get("id") or google_user.get("sub", ""))
 
-        # 3. Tạo một Database Session mới ngay sau khi thực hiện các lệnh await
-        db = SessionLocal()
+        email = (google_user.get("email") or "").strip().lower()
+        if not email:
+            logger.error("Google profile missing email")
+            return RedirectResponse(
+                url=f"{frontend_url}/auth/callback?error=email_missing",
+                status_code=302,
+            )
+        
+        full_name = google_user.get("name", "") or email.split("@")[0]
+        google_id = str(google_user.get("id") or google_user.get("sub", ""))
+
+        # 3. Chỉ mở Database Session sau khi đã xong các lệnh gọi tới Google
+        db = AsyncSessionLocal()
         try:
-            user = auth_service.get_or_create_google_user(
+            user = await auth_service.get_or_create_google_user(
                 db, email=email, full_name=full_name, google_id=google_id
             )
-            jwt_token = create_access_token(subject=user.id)
+            auth_tokens = await auth_service.issue_tokens(db, user)
             logger.info(f"Google login successful for: {email}")
-            # Redirect về Frontend kèm Token JWT
+            # Redirect về Frontend kèm Token JWT + refresh token
+            callback_params = {"token": auth_tokens["access_token"], "refresh_token": auth_tokens["refresh_token"]}
             return RedirectResponse(
-                url=f"{frontend_url}/auth/callback?token={jwt_token}",
+                url=f"{frontend_url}/auth/callback?{urlencode(callback_params)}",
                 status_code=302,
             )
         except Exception as db_e:
             err_msg = str(db_e)
             logger.exception(f"Database error during Google callback for {email}")
-            db.rollback()
+            await db.rollback()
             # Trả thêm chi tiết lỗi để chẩn đoán trên Frontend
             params = {
                 "error": "callback_failed",
@@ -186,7 +185,7 @@ async def google_callback(
                 status_code=302,
             )
         finally:
-            db.close()
+            await db.close()
     except Exception as e:
         logger.exception("Unexpected exception in Google callback flow")
         return RedirectResponse(
@@ -1,30 +1,32 @@
 
 from fastapi import APIRouter, Depends
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.api import deps
+from app.api.routing import ManagedRoute, deadline
 from app.services.grading_service import grading_service
 from app.services.suggestion_service import suggestion_service
 from app.core.response import APIResponse
-from app.models.account import User
+from app.core.auth_cache import Principal
 
-router = APIRouter()
+router = APIRouter(route_class=ManagedRoute)
 
 @router.get("/{submissionId}/result")
-def get_result(
+@deadline(5)
+async def get_result(
     submissionId: int,
-    db: Session = Depends(deps.get_db),
-    current_user: User = Depends(deps.get_current_student)
+    db: AsyncSession = Depends(deps.get_read_db),
+    current_user: Principal = Depends(deps.get_current_student)
 ):
     """Xem kết quả chấm bài chi tiết."""
-    result = grading_service.get_result(db, submissionId, current_user.id)
+    result = await grading_service.get_result(db, submissionId, current_user.id)
     return APIResponse.success(data=result)
 
 @router.get("/{submissionId}/learning-suggestions")
-def get_suggestions(
+async def get_suggestions(
     submissionId: int,
-    db: Session = Depends(deps.get_db),
-    current_user: User = Depends(deps.get_current_student)
+    db: AsyncSession = Depends(deps.get_read_db),
+    current_user: Principal = Depends(deps.get_current_student)
 ):
     """Nhận gợi ý học tập sau khi làm bài."""
-    suggestions = suggestion_service.get_suggestions(db, submissionId, current_user.id)
+    suggestions = await suggestion_service.get_suggestions(db, submissionId, current_user.id)
     return APIResponse.success(data=suggestions)
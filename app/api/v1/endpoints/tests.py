@@ -1,46 +1,70 @@
 
 from fastapi import APIRouter, Depends, Body
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.api import deps
-from app.schemas.test import TestGenerateRequest, TestContent
+from app.api.routing import ManagedRoute, deadline
+from app.schemas.test import TestBatchGenerateRequest, TestGenerateRequest, TestContent
 from app.services.test_service import test_service
 from app.core.response import APIResponse
-from app.models.account import User
+from app.core.auth_cache import Principal
 
-router = APIRouter()
+router = APIRouter(route_class=ManagedRoute)
 
 @router.post("/generate")
-def generate(
+@deadline(15)
+async def generate(
     request: TestGenerateRequest, 
-    db: Session = Depends(deps.get_db),
-    current_user: User = Depends(deps.get_current_student)
+    db: AsyncSession = Depends(deps.get_db),
+    current_user: Principal = Depends(deps.get_current_student)
 ):
     """Tạo đề luyện tập mới dựa trên tiêu chí."""
     # Debug logging
     print(f"🔍 DEBUG: Generate test request - User: {current_user.id}, Subject: {request.subject}, Topic: {request.topic}, Level: {request.level}, Count: {request.question_count}")
     
-    test = test_service.generate_test(
+    if request.include_content:
+        content = await test_service.generate_test_content(
+            db, current_user.id, request.subject, request.topic, request.level, request.question_count
+        )
+        # Giữ test_id như response cũ, cộng thêm các trường của TestContent
+        return APIResponse.success(data={"test_id": content["id"], **content})
+
+    test = await test_service.generate_test(
         db, current_user.id, request.subject, request.topic, request.level, request.question_count
     )
     return APIResponse.success(data={"test_id": test.id, "title": test.title})
 
+@router.post("/batch-generate")
+@deadline(60)
+async def batch_generate(
+    request: TestBatchGenerateRequest,
+    db: AsyncSession = Depends(deps.get_db),
+    current_user: Principal = Depends(deps.get_current_teacher)
+):
+    """Giáo viên tạo đề riêng (ngẫu nhiên) cho từng học sinh trong lớp với cùng tiêu chí."""
+    tests = await test_service.generate_batch(
+        db, request.student_ids, request.subject, request.topic, request.level,
+        request.question_count, request.max_question_uses,
+    )
+    return APIResponse.success(data={"tests": tests})
+
 @router.get("/{testId}/content")
-def get_content(
+@deadline(5)
+async def get_content(
     testId: int, 
-    db: Session = Depends(deps.get_db),
-    current_user: User = Depends(deps.get_current_student)
+    db: AsyncSession = Depends(deps.get_read_db),
+    current_user: Principal = Depends(deps.get_current_student)
 ):
     """Tải nội dung đề cho học sinh."""
-    test = test_service.get_test_content(db, testId, current_user.id)
+    test = await test_service.get_test_content(db, testId, current_user.id)
     return APIResponse.success(data=test)
 
 @router.get("/{testId}/download")
-def download(
+async def download(
     testId: int,
     format: str = "pdf",
-    db: Session = Depends(deps.get_db),
-    current_user: User = Depends(deps.get_current_student)
+    db: AsyncSession = Depends(deps.get_db),
+    current_user: Principal = Depends(deps.get_current_student)
 ):
     """Xuất đề ra file."""
-    result = test_service.export_test(db, testId, current_user.id, format)
+    result = await test_service.export_test(db, testId, current_user.id, format)
     return APIResponse.success(data=result)
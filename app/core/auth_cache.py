@@ -0,0 +1,193 @@
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, NamedTuple, Optional, Set, Tuple
+
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session, object_session
+
+from app.core.config import settings
+from app.core.metrics import metrics
+from app.models.account import User
+
+
+@dataclass(frozen=True)
+class Principal:
+    """Thông tin tối thiểu về user đã xác thực, dùng thay cho ORM User trong request."""
+    id: int
+    role: str
+    token_version: int
+
+
+class AuthState(NamedTuple):
+    """Trạng thái của user cần cho việc kiểm tra thu hồi token."""
+    token_version: int
+    role: str
+    active: bool
+
+
+class PrincipalCache:
+    """
+    LRU + TTL cache: access token -> Principal.
+    Mỗi entry hết hạn theo TTL hoặc theo exp của token, tùy cái nào đến trước.
+    """
+
+    def __init__(self, maxsize: int, ttl_seconds: int):
+        self.maxsize = maxsize
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, Tuple[float, Principal]]" = OrderedDict()
+        self._tokens_by_user: Dict[int, Set[str]] = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, token: str) -> Optional[Principal]:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(token)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, principal = entry
+            if expires_at <= now:
+                self._remove(token)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(token)
+            self.hits += 1
+            return principal
+
+    def set(self, token: str, principal: Principal, token_exp: Optional[float] = None) -> None:
+        if self.maxsize <= 0:
+            return
+        ttl = self.ttl_seconds
+        if token_exp is not None:
+            ttl = min(ttl, token_exp - time.time())
+        if ttl <= 0:
+            return
+        with self._lock:
+            self._remove(token)
+            self._entries[token] = (time.monotonic() + ttl, principal)
+            self._tokens_by_user.setdefault(principal.id, set()).add(token)
+            while len(self._entries) > self.maxsize:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def invalidate_user(self, user_id: int) -> None:
+        with self._lock:
+            for token in list(self._tokens_by_user.get(user_id, ())):
+                self._remove(token)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._tokens_by_user.clear()
+
+    def _remove(self, token: str) -> None:
+        entry = self._entries.pop(token, None)
+        if entry is None:
+            return
+        tokens = self._tokens_by_user.get(entry[1].id)
+        if tokens is not None:
+            tokens.discard(token)
+            if not tokens:
+                del self._tokens_by_user[entry[1].id]
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "size": len(self._entries),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+
+class TokenVersionCache:
+    """
+    Map user_id -> AuthState (token_version hiện tại, role, còn hoạt động hay không).
+    Token có claim ver khác token_version hiện tại coi như đã bị thu hồi.
+    """
+
+    def __init__(self, ttl_seconds: int):
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._states: Dict[int, Tuple[float, AuthState]] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, user_id: int) -> Optional[AuthState]:
+        with self._lock:
+            entry = self._states.get(user_id)
+            if entry is None or entry[0] <= time.monotonic():
+                self.misses += 1
+                return None
+            self.hits += 1
+            return entry[1]
+
+    def set(self, user_id: int, state: AuthState) -> None:
+        with self._lock:
+            self._states[user_id] = (time.monotonic() + self.ttl_seconds, state)
+            # Dọn entry hết hạn khi map phình to, tránh tăng bộ nhớ không giới hạn
+            if len(self._states) > 2 * settings.PRINCIPAL_CACHE_SIZE:
+                now = time.monotonic()
+                for uid in [k for k, v in self._states.items() if v[0] <= now]:
+                    del self._states[uid]
+
+    def invalidate(self, user_id: int) -> None:
+        with self._lock:
+            self._states.pop(user_id, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._states.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return {"size": len(self._states), "hits": self.hits, "misses": self.misses}
+
+
+principal_cache = PrincipalCache(
+    maxsize=settings.PRINCIPAL_CACHE_SIZE,
+    ttl_seconds=settings.PRINCIPAL_CACHE_TTL_SECONDS,
+)
+metrics.register("principal_cache", principal_cache.stats)
+
+
+token_version_cache = TokenVersionCache(ttl_seconds=settings.TOKEN_VERSION_CACHE_TTL_SECONDS)
+metrics.register("token_version_cache", token_version_cache.stats)
+
+
+def invalidate_user(user_id: int) -> None:
+    principal_cache.invalidate_user(user_id)
+    token_version_cache.invalidate(user_id)
+
+
+def _invalidate_on_change(target: User, value: Any, oldvalue: Any, initiator: Any) -> None:
+    if target.id is not None and value != oldvalue:
+        invalidate_user(target.id)
+        # Xóa lại sau commit: request khác có thể đã nạp trạng thái cũ trước khi commit
+        session = object_session(target)
+        if session is not None:
+            session.info.setdefault("invalidated_user_ids", set()).add(target.id)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_after_commit(session: Session) -> None:
+    for user_id in session.info.pop("invalidated_user_ids", ()):
+        invalidate_user(user_id)
+
+
+@event.listens_for(User, "before_update")
+def _bump_token_version(mapper: Any, connection: Any, target: User) -> None:
+    state = inspect(target)
+    if any(state.attrs[name].history.has_changes() for name in ("is_active", "is_locked", "role")):
+        target.token_version = (target.token_version or 0) + 1
+
+
+# Khóa / vô hiệu hóa / đổi role phải có hiệu lực ngay trong worker hiện tại.
+# Các worker khác sẽ thấy thay đổi sau tối đa TOKEN_VERSION_CACHE_TTL_SECONDS.
+for _attr in (User.is_active, User.is_locked, User.role, User.token_version):
+    event.listen(_attr, "set", _invalidate_on_change)
@@ -1,4 +1,4 @@
-from typing import List, Union, Optional, Any
+from typing import List, Tuple, Union, Optional, Any
 from pydantic import AnyHttpUrl, validator, root_validator, BaseSettings, Field
 
 class EduNexiaSettings(BaseSettings):
@@ -6,7 +6,20 @@ class EduNexiaSettings(BaseSettings):
     API_V1_STR: str = "/api/v1"
     SECRET_KEY: str = "development_secret_key_change_me_in_production"
     ALGORITHM: str = "HS256"
-    ACCESS_TOKEN_EXPIRE_MINUTES: int = 60 * 24 * 7  # 7 days
+    ACCESS_TOKEN_EXPIRE_MINUTES: int = 15
+    # Refresh token lưu (dạng hash) trong bảng sessions, xoay vòng mỗi lần dùng
+    REFRESH_TOKEN_EXPIRE_DAYS: int = 30
+    SESSION_PURGE_BATCH_SIZE: int = 1000
+
+    # Job dọn dữ liệu (scripts/run_retention.py): đề chưa nộp quá số ngày này bị xóa
+    RETENTION_UNSUBMITTED_TEST_DAYS: int = 30
+    RETENTION_BATCH_SIZE: int = 500
+
+    # Cache principal đã xác thực (per worker) cho get_current_user
+    PRINCIPAL_CACHE_SIZE: int = 10000
+    PRINCIPAL_CACHE_TTL_SECONDS: int = 60
+    # Cache user_id -> token_version dùng để kiểm tra thu hồi token
+    TOKEN_VERSION_CACHE_TTL_SECONDS: int = 30
     
     ENVIRONMENT: str = "development"
     DEBUG: bool = True
@@ -24,17 +37,103 @@ class EduNexiaSettings(BaseSettings):
             elif v.startswith("postgresql+psycopg://"):
                 v = v.replace("postgresql+psycopg://", "postgresql://", 1)
             
-            # Remove incompatible pgbouncer parameter which crashes psycopg3
-            if "pgbouncer=true" in v:
-                if "?" in v:
-                    base, params = v.split("?", 1)
-                    # Filter out pgbouncer parameter
-                    new_params = "&".join([p for p in params.split("&") if not p.startswith("pgbouncer=")])
-                    v = f"{base}?{new_params}" if new_params else base
-                
+            # Tham số pgbouncer=true được engine factory (app/core/database.py) xử lý
             return v.rstrip("&")
         return v
 
+    # Connection pool (xem create_db_engine trong app/core/database.py)
+    # DB_POOL_MODE: "queue" (container lâu dài) | "null" (serverless); để trống = tự chọn theo môi trường
+    DB_POOL_MODE: Optional[str] = None
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: int = 30
+    DB_POOL_RECYCLE: int = 1800
+    DB_POOL_PRE_PING: bool = True
+    # Chạy sau PgBouncer transaction pooling: tắt prepared statement phía server.
+    # Để trống = tự bật nếu DATABASE_URL có pgbouncer=true
+    DB_PGBOUNCER: Optional[bool] = None
+
+    # Read replica cho các route chỉ đọc (xem app/core/replicas.py), phân cách bằng dấu phẩy
+    DATABASE_REPLICA_URLS: Optional[str] = None
+    DB_REPLICA_HEALTH_CHECK_SECONDS: int = 10
+    DB_REPLICA_HEALTH_CHECK_TIMEOUT_SECONDS: float = 2.0
+    # Sau khi user ghi dữ liệu, đọc từ primary trong khoảng này để không thấy dữ liệu cũ
+    DB_READ_YOUR_WRITES_SECONDS: int = 5
+
+    # Shard dữ liệu học sinh theo student_id (app/core/shards.py), phân cách bằng dấu phẩy.
+    # Để trống = mọi bảng nằm ở DATABASE_URL
+    DATABASE_SHARD_URLS: Optional[str] = None
+
+    # Tạo đề: pool từ ngần này câu trở lên (Postgres) thì lấy mẫu bằng TABLESAMPLE,
+    # lấy dư OVERSAMPLE lần số câu cần để bù phần không khớp tiêu chí
+    QUESTION_TABLESAMPLE_MIN_POOL: int = 20000
+    QUESTION_TABLESAMPLE_OVERSAMPLE: float = 4.0
+
+    # Snapshot ngân hàng câu hỏi mmap dùng chung giữa các worker (app/core/question_bank.py),
+    # dựng bằng scripts/build_question_snapshot.py. Để trống = luôn đọc câu hỏi từ DB
+    QUESTION_SNAPSHOT_PATH: Optional[str] = None
+    QUESTION_SNAPSHOT_CHECK_SECONDS: float = 30.0
+    # Snapshot cũ hơn ngần này giây bị bỏ qua (đọc DB); build --watch dựng lại sau nửa thời gian này.
+    # 0 = không giới hạn tuổi
+    QUESTION_SNAPSHOT_MAX_AGE_SECONDS: float = 600
+
+    # Pool đề dựng sẵn cho tiêu chí phổ biến (app/core/test_pool.py). TEST_POOL_DEPTH: số bộ
+    # câu hỏi chưa giao giữ sẵn cho mỗi tiêu chí, 0 = tắt
+    TEST_POOL_DEPTH: int = 0
+    # "subject|topic|level|số câu" cách nhau bởi ";". Để trống = mọi nhóm (subject, topic, level)
+    # trong ngân hàng câu hỏi với từng số câu trong TEST_POOL_QUESTION_COUNTS
+    TEST_POOL_CRITERIA: Optional[str] = None
+    TEST_POOL_QUESTION_COUNTS: str = "1,2,3"
+    # Chu kỳ bù pool chạy nền trong mỗi worker; 0 = chỉ bù qua scripts/fill_test_pool.py
+    TEST_POOL_FILL_SECONDS: float = 0
+    # Bộ câu chưa giao quá tuổi này bị thay để câu hỏi mới thêm vào ngân hàng được dùng
+    TEST_POOL_MAX_AGE_SECONDS: int = 3600
+
+    # Đo câu lệnh SQL theo request (app/core/query_stats.py)
+    QUERY_STATS_ENABLED: bool = True
+    # Header X-DB-Queries trên response; để trống = theo DEBUG
+    QUERY_STATS_HEADER: Optional[bool] = None
+    SLOW_QUERY_MS: int = 200
+    # Cùng một câu SQL lặp lại từ ngần này lần trong một request thì coi là N+1
+    N_PLUS_ONE_THRESHOLD: int = 5
+
+    # Hạn chót xử lý mỗi request (app/api/routing.py); route có thể đặt riêng bằng @deadline
+    REQUEST_DEADLINE_SECONDS: float = 10.0
+    # Giới hạn trên cho header X-Request-Deadline-Ms
+    REQUEST_DEADLINE_MAX_SECONDS: float = 60.0
+
+    # Partition theo tháng của submissions/grading_results (app/db/partitions.py, scripts/manage_partitions.py)
+    PARTITION_MONTHS_AHEAD: int = 3
+    PARTITION_ARCHIVE_AFTER_MONTHS: int = 12
+    # "tablespace": chuyển partition cũ sang PARTITION_ARCHIVE_TABLESPACE (vẫn truy vấn được)
+    # "detach": tách partition cũ khỏi bảng và chuyển sang schema PARTITION_ARCHIVE_SCHEMA;
+    #   job retention khi đó không xóa đề tạo trước mốc lưu trữ (xem app/db/partitions.py)
+    PARTITION_ARCHIVE_MODE: str = "tablespace"
+    PARTITION_ARCHIVE_TABLESPACE: Optional[str] = None
+    PARTITION_ARCHIVE_SCHEMA: str = "archive"
+    PARTITION_LOCK_TIMEOUT_SECONDS: int = 5
+
+    @property
+    def replica_urls(self) -> List[str]:
+        return [u.strip() for u in (self.DATABASE_REPLICA_URLS or "").split(",") if u.strip()]
+
+    @property
+    def shard_urls(self) -> List[str]:
+        return [u.strip() for u in (self.DATABASE_SHARD_URLS or "").split(",") if u.strip()]
+
+    @property
+    def test_pool_criteria(self) -> List[Tuple[str, str, str, int]]:
+        criteria = []
+        for item in (self.TEST_POOL_CRITERIA or "").split(";"):
+            if item.strip():
+                subject, topic, level, count = (part.strip() for part in item.split("|"))
+                criteria.append((subject, topic, level, int(count)))
+        return criteria
+
+    @property
+    def test_pool_question_counts(self) -> List[int]:
+        return [int(c) for c in self.TEST_POOL_QUESTION_COUNTS.split(",") if c.strip()]
+
     # CORS
     # Đổi tên hoàn toàn để Pydantic V1 không bao giờ nhầm lẫn
     CORS_ORIGINS: List[str] = []
@@ -95,12 +194,65 @@ class EduNexiaSettings(BaseSettings):
     GOOGLE_CLIENT_SECRET: Optional[str] = None
     GOOGLE_REDIRECT_URI: Optional[str] = None
     FRONTEND_URL: str = "http://localhost:3000"
+    # Endpoint Google có thể trỏ sang OAuth server giả lập khi test local
+    GOOGLE_AUTH_URL: str = "https://accounts.google.com/o/oauth2/v2/auth"
+    GOOGLE_TOKEN_URL: str = "https://oauth2.googleapis.com/token"
+    GOOGLE_USERINFO_URL: str = "https://www.googleapis.com/oauth2/v3/userinfo"
+    GOOGLE_JWKS_URL: str = "https://www.googleapis.com/oauth2/v3/certs"
+    GOOGLE_ISSUERS: List[str] = ["https://accounts.google.com", "accounts.google.com"]
+    GOOGLE_HTTP_TIMEOUT_SECONDS: float = 10.0
+    GOOGLE_HTTP_MAX_CONNECTIONS: int = 50
 
     # File Storage
     UPLOAD_DIR: str = "uploads"
     MAX_FILE_SIZE_MB: int = 10
     FILE_EXTENSIONS: List[str] = ["jpg", "jpeg", "png", "pdf"]
 
+    # Giới hạn đăng nhập (token bucket) theo username và IP, chặn trước khi chạy bcrypt
+    # LOGIN_RATE_LIMIT_BACKEND: "memory" (mỗi worker) hoặc "redis" (dùng chung qua REDIS_URL)
+    LOGIN_RATE_LIMIT_ENABLED: bool = True
+    LOGIN_RATE_LIMIT_BACKEND: str = "memory"
+    REDIS_URL: Optional[str] = None
+    # Khi Redis lỗi: "memory" (dùng bucket trong worker), "closed" (từ chối đăng nhập), "open" (cho qua)
+    LOGIN_RATE_LIMIT_REDIS_FAILURE: str = "memory"
+    LOGIN_RATE_LIMIT_USERNAME_CAPACITY: int = 5
+    LOGIN_RATE_LIMIT_USERNAME_PER_MINUTE: float = 5
+    # Cả trường dùng chung một IP (NAT) nên giới hạn theo IP phải rộng
+    LOGIN_RATE_LIMIT_IP_CAPACITY: int = 300
+    LOGIN_RATE_LIMIT_IP_PER_MINUTE: float = 300
+    LOGIN_RATE_LIMIT_MAX_BUCKETS: int = 100000
+    # Số proxy tin cậy phía trước app (Vercel/Render: 1); 0 = bỏ qua x-forwarded-for
+    TRUSTED_PROXY_HOPS: int = 1
+
+    # /metrics chỉ mở cho admin hoặc request có header X-Metrics-Token bằng giá trị này
+    METRICS_TOKEN: Optional[str] = None
+
+    # Bulk provisioning học sinh từ file CSV (job chạy nền, xem provisioning_service)
+    # Số dòng hash + INSERT + ghi kết quả trong một transaction của job
+    PROVISION_BATCH_SIZE: int = 100
+    PROVISION_MAX_ROWS: int = 20000
+    # Job running không cập nhật heartbeat quá lâu được coi là đã dừng, chạy tiếp được
+    PROVISION_JOB_STALE_SECONDS: int = 300
+    # Job đã xong (kèm mật khẩu tạm) bị xóa bởi scripts/run_retention.py sau số ngày này
+    PROVISION_JOB_RETENTION_DAYS: int = 7
+
+    # Giáo viên tạo đề cho cả lớp trong một request (POST /practice-tests/batch-generate)
+    TEST_BATCH_MAX_STUDENTS: int = 1000
+
+    # Password hashing (bcrypt chạy trong process pool riêng)
+    # PASSWORD_HASH_WORKERS=0 -> dùng thread pool (môi trường không hỗ trợ multiprocessing)
+    PASSWORD_HASH_WORKERS: int = 2
+    PASSWORD_HASH_QUEUE_SIZE: int = 64
+    # Số hash mỗi job khi tạo tài khoản hàng loạt; nhỏ để đăng nhập không phải chờ lâu
+    PASSWORD_HASH_BULK_CHUNK: int = 4
+    # Tham số cost; chạy scripts/calibrate_password_hash.py để đo trên phần cứng thật.
+    # Hash cũ khác tham số sẽ được hash lại ở nền sau lần đăng nhập thành công kế tiếp.
+    PASSWORD_HASH_SCHEME: str = "bcrypt"  # bcrypt | argon2 (cần argon2-cffi)
+    BCRYPT_ROUNDS: int = 12
+    ARGON2_TIME_COST: int = 2
+    ARGON2_MEMORY_COST: int = 65536  # KiB
+    ARGON2_PARALLELISM: int = 2
+
     class Config:
         case_sensitive = True
         env_file = ".env"
@@ -1,26 +1,132 @@
 import logging
+import os
+from typing import Any, Dict, Optional, Tuple
 from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import NullPool
 from app.core.config import settings
+from app.core.metrics import metrics
 
 logger = logging.getLogger(__name__)
 
-# Import all models so that SQLAlchemy can resolve relationship() 
+# Import all models so that SQLAlchemy can resolve relationship()
 # string references like "Session" when mappers are configured.
 # This import is required for proper mapper configuration at application startup.
 from app.db import base  # noqa: F401
 
+
+def normalize_database_url(raw_url: str, driver: str = "psycopg") -> Tuple[str, bool]:
+    """
+    Chuẩn hóa URL về driver psycopg 3 và tách tham số pgbouncer=true
+    (psycopg không hiểu tham số này). Trả về (url, có_pgbouncer).
+    Chỉ đổi driver và query qua sqlalchemy URL, phần còn lại (vd. đường dẫn
+    sqlite:///./dev.db, sqlite:///:memory:, mật khẩu có ký tự đặc biệt) giữ nguyên.
+    """
+    url = make_url(raw_url)
+    if url.drivername in ("postgres", "postgresql"):
+        url = url.set(drivername=f"postgresql+{driver}")
+
+    value = url.query.get("pgbouncer")
+    values = value if isinstance(value, tuple) else (value,)
+    pgbouncer = any((v or "").lower() == "true" for v in values)
+    url = url.difference_update_query(["pgbouncer"])
+    return url.render_as_string(hide_password=False), pgbouncer
+
+
+def resolve_pool_mode() -> str:
+    if settings.DB_POOL_MODE:
+        return settings.DB_POOL_MODE
+    # Mỗi Vercel function là một process ngắn hạn: giữ pool chỉ tốn connection của Postgres
+    return "null" if os.environ.get("VERCEL") else "queue"
+
+
+def _engine_options(url: Optional[str], pool_mode: Optional[str]) -> Tuple[str, Dict[str, Any], str, bool]:
+    db_url, pgbouncer_in_url = normalize_database_url(url or settings.DATABASE_URL)
+    pgbouncer = settings.DB_PGBOUNCER if settings.DB_PGBOUNCER is not None else pgbouncer_in_url
+    pool_mode = pool_mode or resolve_pool_mode()
+
+    options: Dict[str, Any] = {"pool_pre_ping": settings.DB_POOL_PRE_PING}
+    if pool_mode == "null":
+        options["poolclass"] = NullPool
+    elif not db_url.startswith("sqlite"):
+        options.update(
+            pool_size=settings.DB_POOL_SIZE,
+            max_overflow=settings.DB_MAX_OVERFLOW,
+            pool_timeout=settings.DB_POOL_TIMEOUT,
+            pool_recycle=settings.DB_POOL_RECYCLE,
+        )
+    if pgbouncer and db_url.startswith("postgresql+psycopg"):
+        # prepare_threshold=None: không bao giờ PREPARE, an toàn khi connection bị đổi giữa các transaction
+        options["connect_args"] = {"prepare_threshold": None}
+    return db_url, options, pool_mode, pgbouncer
+
+
+def create_db_engine(url: Optional[str] = None, pool_mode: Optional[str] = None, **overrides: Any) -> Engine:
+    """
+    Engine factory duy nhất cho app, script và Alembic.
+    - pool_mode "queue": QueuePool với kích thước theo DB_POOL_* (Render, local)
+    - pool_mode "null": NullPool, mở/đóng connection theo request (Vercel, migration)
+    - PgBouncer transaction pooling: tắt prepared statement phía server của psycopg
+    """
+    db_url, options, pool_mode, pgbouncer = _engine_options(url, pool_mode)
+    options.update(overrides)
+    logger.info(
+        f"Connecting to database with driver: {db_url.split('://')[0]}, "
+        f"pool={pool_mode}, pgbouncer={pgbouncer}"
+    )
+    return create_engine(db_url, **options)
+
+
+def create_async_db_engine(url: Optional[str] = None, pool_mode: Optional[str] = None, **overrides: Any) -> AsyncEngine:
+    """Phiên bản async của create_db_engine (psycopg 3 async), cùng cấu hình pool."""
+    db_url, options, pool_mode, pgbouncer = _engine_options(url, pool_mode)
+    if db_url.startswith("sqlite://"):
+        db_url = db_url.replace("sqlite://", "sqlite+aiosqlite://", 1)
+    options.update(overrides)
+    return create_async_engine(db_url, **options)
+
+
 # Engine setup
-db_url = settings.DATABASE_URL
-if db_url.startswith("postgres://"):
-    db_url = db_url.replace("postgres://", "postgresql+psycopg://", 1)
-elif db_url.startswith("postgresql://"):
-    if "+psycopg" not in db_url:
-        db_url = db_url.replace("postgresql://", "postgresql+psycopg://", 1)
+# Sync engine: facade cho các script seed/check, Alembic và endpoint debug
+engine = create_db_engine()
+# Async engine: dùng cho toàn bộ API
+async_engine = create_async_db_engine()
+
+
+class RoutingSession(Session):
+    """
+    Session đồng bộ bên dưới mọi AsyncSession của app: cho router (nếu có)
+    chọn engine theo từng câu lệnh. Khi bật shard, app/core/shards.py gán
+    router để bảng dữ liệu học sinh đi tới shard của học sinh.
+    """
+    router: Optional[Any] = None
 
-logger.info(f"Connecting to database with driver: {db_url.split('://')[0]}")
-engine = create_engine(db_url, pool_pre_ping=True)
+    def get_bind(self, mapper=None, clause=None, **kw):
+        if self.router is not None:
+            bind = self.router.get_bind(self, mapper, clause)
+            if bind is not None:
+                return bind
+        return super().get_bind(mapper=mapper, clause=clause, **kw)
 
 
 # Session factory
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
\ No newline at end of file
+SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# expire_on_commit=False: không lazy-load lại thuộc tính sau commit (không hợp lệ trong async)
+AsyncSessionLocal = async_sessionmaker(
+    async_engine, autoflush=False, expire_on_commit=False, sync_session_class=RoutingSession
+)
+
+
+def pool_stats() -> Dict[str, Any]:
+    pool = async_engine.pool
+    stats: Dict[str, Any] = {"pool": type(pool).__name__}
+    for name in ("size", "checkedout", "overflow", "checkedin"):
+        value = getattr(pool, name, None)
+        if callable(value):
+            stats[name] = value()
+    return stats
+
+
+metrics.register("db_pool", pool_stats)
@@ -0,0 +1,39 @@
+import time
+from contextvars import ContextVar
+from typing import Any, Optional
+
+from sqlalchemy import event
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.orm import Session
+
+# Postgres SQLSTATE khi câu lệnh bị hủy bởi statement_timeout
+QUERY_CANCELED_SQLSTATE = "57014"
+
+_deadline: ContextVar[Optional[float]] = ContextVar("request_deadline", default=None)
+
+
+def set_deadline(seconds: float) -> Any:
+    """Đặt hạn chót (tính từ bây giờ) cho request hiện tại; trả về token để reset."""
+    return _deadline.set(time.monotonic() + seconds)
+
+
+def reset_deadline(token: Any) -> None:
+    _deadline.reset(token)
+
+
+def remaining_seconds() -> Optional[float]:
+    deadline = _deadline.get()
+    return None if deadline is None else deadline - time.monotonic()
+
+
+def is_statement_timeout(error: BaseException) -> bool:
+    return isinstance(error, DBAPIError) and getattr(error.orig, "sqlstate", None) == QUERY_CANCELED_SQLSTATE
+
+
+@event.listens_for(Session, "after_begin")
+def _apply_statement_timeout(session: Session, transaction: Any, connection: Any) -> None:
+    # Mỗi transaction chỉ được chạy trong phần thời gian còn lại của request
+    remaining = remaining_seconds()
+    if remaining is None or connection.dialect.name != "postgresql":
+        return
+    connection.exec_driver_sql(f"SET LOCAL statement_timeout = {max(1, int(remaining * 1000))}")
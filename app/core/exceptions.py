@@ -2,8 +2,8 @@
 from fastapi import HTTPException, status
 
 class EduNexiaException(HTTPException):
-    def __init__(self, detail: str, status_code: int = status.HTTP_400_BAD_REQUEST):
-        super().__init__(status_code=status_code, detail=detail)
+    def __init__(self, detail: str, status_code: int = status.HTTP_400_BAD_REQUEST, headers: dict = None):
+        super().__init__(status_code=status_code, detail=detail, headers=headers)
 
 class AuthException(EduNexiaException):
     def __init__(self, detail: str = "Invalid credentials"):
@@ -20,3 +20,19 @@ class PermissionException(EduNexiaException):
 class BusinessLogicException(EduNexiaException):
     def __init__(self, detail: str):
         super().__init__(detail=detail, status_code=status.HTTP_400_BAD_REQUEST)
+
+class ServiceUnavailableException(EduNexiaException):
+    def __init__(self, detail: str = "Hệ thống đang quá tải, vui lòng thử lại sau"):
+        super().__init__(detail=detail, status_code=status.HTTP_503_SERVICE_UNAVAILABLE)
+
+class RateLimitException(EduNexiaException):
+    def __init__(self, retry_after: int, detail: str = "Bạn thao tác quá nhanh, vui lòng thử lại sau"):
+        super().__init__(
+            detail=detail,
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            headers={"Retry-After": str(retry_after)},
+        )
+
+class GatewayTimeoutException(EduNexiaException):
+    def __init__(self, detail: str = "Yêu cầu xử lý quá thời gian cho phép, vui lòng thử lại"):
+        super().__init__(detail=detail, status_code=status.HTTP_504_GATEWAY_TIMEOUT)
@@ -0,0 +1,126 @@
+import asyncio
+import logging
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+
+from app.core import security
+from app.core.config import settings
+from app.core.exceptions import ServiceUnavailableException
+from app.core.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class PasswordHasher:
+    """
+    Chạy bcrypt hash/verify trong process pool để không chiếm threadpool
+    của Starlette và event loop. Hàng đợi có giới hạn: khi số job đang chờ
+    vượt quá queue_size thì từ chối ngay với 503 thay vì để request treo.
+    """
+
+    def __init__(self, max_workers: int, queue_size: int):
+        self.max_workers = max_workers
+        self.queue_size = queue_size
+        self._executor: Optional[Executor] = None
+        self._in_flight = 0
+        self._completed = 0
+        self._rejected = 0
+        self._total_latency = 0.0
+        self._max_latency = 0.0
+
+    def start(self) -> None:
+        if self._executor is not None:
+            return
+        if self.max_workers > 0:
+            try:
+                self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+            except (OSError, NotImplementedError) as e:
+                # Serverless (vd. Vercel) không có /dev/shm cho multiprocessing
+                logger.warning(f"Process pool unavailable, falling back to threads: {e}")
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=max(1, self.max_workers), thread_name_prefix="password-hash"
+            )
+        logger.info(f"Password hasher started with {type(self._executor).__name__}")
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    @property
+    def queue_depth(self) -> int:
+        return max(0, self._in_flight - max(1, self.max_workers))
+
+    async def _run(self, fn: Callable[..., Any], *args: Any) -> Any:
+        if self.queue_depth >= self.queue_size:
+            self._rejected += 1
+            metrics.inc("password_hash_rejected_total")
+            raise ServiceUnavailableException()
+        if self._executor is None:
+            self.start()
+
+        loop = asyncio.get_running_loop()
+        self._in_flight += 1
+        started = time.perf_counter()
+        try:
+            return await loop.run_in_executor(self._executor, fn, *args)
+        finally:
+            elapsed = time.perf_counter() - started
+            self._in_flight -= 1
+            self._completed += 1
+            self._total_latency += elapsed
+            self._max_latency = max(self._max_latency, elapsed)
+
+    async def hash(self, password: str) -> str:
+        return await self._run(security.get_password_hash, password)
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        return await self._run(security.verify_password, plain_password, hashed_password)
+
+    async def hash_many(self, passwords: List[str]) -> List[str]:
+        """
+        Hash một lô lớn (bulk provisioning) bằng các job nhỏ PASSWORD_HASH_BULK_CHUNK
+        hash đi qua _run, mỗi worker nhận tối đa một job lô. Job lô chỉ được đẩy khi
+        hàng đợi trống nên request đăng nhập chờ nhiều nhất một job nhỏ.
+        """
+        if not passwords:
+            return []
+        size = max(1, settings.PASSWORD_HASH_BULK_CHUNK)
+        chunks = [passwords[i:i + size] for i in range(0, len(passwords), size)]
+        results: List[List[str]] = [[] for _ in chunks]
+        slots = asyncio.Semaphore(max(1, self.max_workers))
+        started = time.perf_counter()
+
+        async def run_chunk(index: int) -> None:
+            async with slots:
+                # Nhường job đăng nhập đang xếp hàng; không có await giữa lần kiểm tra
+                # này và kiểm tra trong _run nên job lô không bị từ chối 503
+                while self.queue_depth > 0:
+                    await asyncio.sleep(0.01)
+                results[index] = await self._run(security.hash_passwords, chunks[index])
+
+        await asyncio.gather(*(run_chunk(i) for i in range(len(chunks))))
+        metrics.inc("password_hash_bulk_total", len(passwords))
+        metrics.inc("password_hash_bulk_seconds_total", time.perf_counter() - started)
+        return [hashed for chunk in results for hashed in chunk]
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "workers": self.max_workers,
+            "queue_size": self.queue_size,
+            "queue_depth": self.queue_depth,
+            "in_flight": self._in_flight,
+            "completed": self._completed,
+            "rejected": self._rejected,
+            "avg_latency_ms": round(self._total_latency / self._completed * 1000, 2) if self._completed else 0.0,
+            "max_latency_ms": round(self._max_latency * 1000, 2),
+        }
+
+
+password_hasher = PasswordHasher(
+    max_workers=settings.PASSWORD_HASH_WORKERS,
+    queue_size=settings.PASSWORD_HASH_QUEUE_SIZE,
+)
+metrics.register("password_hasher", password_hasher.stats)
@@ -0,0 +1,35 @@
+import threading
+from typing import Any, Callable, Dict
+
+
+class MetricsRegistry:
+    """
+    Registry metrics đơn giản trong tiến trình (per worker).
+    Counter được cộng dồn; provider là hàm trả về dict trạng thái hiện tại
+    của một thành phần (pool hash, cache, limiter...). Xuất ra qua /metrics.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters: Dict[str, float] = {}
+        self._providers: Dict[str, Callable[[], Dict[str, Any]]] = {}
+
+    def inc(self, name: str, value: float = 1) -> None:
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + value
+
+    def register(self, name: str, provider: Callable[[], Dict[str, Any]]) -> None:
+        self._providers[name] = provider
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            data: Dict[str, Any] = {"counters": dict(self._counters)}
+        for name, provider in list(self._providers.items()):
+            try:
+                data[name] = provider()
+            except Exception as e:
+                data[name] = {"error": str(e)}
+        return data
+
+
+metrics = MetricsRegistry()
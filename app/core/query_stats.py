@@ -0,0 +1,134 @@
+import logging
+import time
+from collections import Counter
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.core.config import settings
+from app.core.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+QUERY_STATS_HEADER = "X-DB-Queries"
+
+
+class QueryStats:
+    """Số câu lệnh, tổng thời gian DB và các câu lặp lại (N+1) của một request."""
+
+    def __init__(self, scope: Dict[str, Any]):
+        self._scope = scope
+        self.count = 0
+        self.total_ms = 0.0
+        self.slow = 0
+        self._statements: Counter = Counter()
+        self.repeated: List[str] = []
+
+    @property
+    def route(self) -> str:
+        # Sau khi router khớp, FastAPI đặt route vào scope: dùng path mẫu thay vì path thật
+        route = self._scope.get("route")
+        path = getattr(route, "path", None) or self._scope.get("path", "")
+        return f"{self._scope.get('method', '')} {path}".strip()
+
+    def record(self, statement: str, elapsed_ms: float) -> None:
+        self.count += 1
+        self.total_ms += elapsed_ms
+        # Cùng câu SQL, khác tham số: đếm theo chuỗi SQL
+        self._statements[statement] += 1
+        if self._statements[statement] == settings.N_PLUS_ONE_THRESHOLD:
+            self.repeated.append(statement)
+
+    def header_value(self) -> str:
+        return f"count={self.count}; time_ms={self.total_ms:.1f}; n_plus_one={len(self.repeated)}"
+
+
+_current: ContextVar[Optional[QueryStats]] = ContextVar("query_stats", default=None)
+
+
+def current_query_stats() -> Optional[QueryStats]:
+    return _current.get()
+
+
+def _shorten(statement: str, limit: int = 300) -> str:
+    statement = " ".join(statement.split())
+    return statement if len(statement) <= limit else statement[:limit] + "..."
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    conn.info.setdefault("query_started_at", []).append((statement, time.perf_counter()))
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    _, started = conn.info["query_started_at"].pop()
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    stats = _current.get()
+    if stats is not None:
+        stats.record(statement, elapsed_ms)
+    metrics.inc("db_queries_total")
+    metrics.inc("db_query_seconds_total", elapsed_ms / 1000)
+    if elapsed_ms >= settings.SLOW_QUERY_MS:
+        if stats is not None:
+            stats.slow += 1
+        metrics.inc("db_slow_queries_total")
+        route = stats.route if stats is not None else "-"
+        logger.warning(f"Slow query ({elapsed_ms:.1f} ms) on {route}: {_shorten(statement)}")
+
+
+@event.listens_for(Engine, "handle_error")
+def _handle_error(exception_context) -> None:
+    # Câu lệnh lỗi không gọi after_cursor_execute: bỏ mốc thời gian của nó để conn.info
+    # (sống cùng kết nối trong pool) không phình ra. Lỗi trước khi chạy cursor thì không có mốc.
+    conn = exception_context.connection
+    started_at = conn.info.get("query_started_at") if conn is not None else None
+    if started_at and started_at[-1][0] == exception_context.statement:
+        started_at.pop()
+
+
+class QueryStatsMiddleware:
+    """
+    ASGI middleware gắn QueryStats vào mỗi request, ghi log tổng kết và
+    (khi bật) trả header X-DB-Queries: count=..; time_ms=..; n_plus_one=..
+    """
+
+    def __init__(self, app: Any):
+        self.app = app
+
+    async def __call__(self, scope: Dict[str, Any], receive: Any, send: Any) -> None:
+        if scope["type"] != "http" or not settings.QUERY_STATS_ENABLED:
+            await self.app(scope, receive, send)
+            return
+
+        stats = QueryStats(scope)
+        token = _current.set(stats)
+        show_header = settings.QUERY_STATS_HEADER if settings.QUERY_STATS_HEADER is not None else settings.DEBUG
+
+        async def send_with_stats(message: Dict[str, Any]) -> None:
+            if show_header and message["type"] == "http.response.start":
+                headers = list(message.get("headers", []))
+                headers.append((QUERY_STATS_HEADER.lower().encode(), stats.header_value().encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_stats)
+        finally:
+            _current.reset(token)
+            self._log(stats)
+
+    @staticmethod
+    def _log(stats: QueryStats) -> None:
+        if stats.count == 0:
+            return
+        if stats.repeated:
+            metrics.inc("db_n_plus_one_requests_total")
+            for statement in stats.repeated:
+                logger.warning(f"Possible N+1 on {stats.route}: {_shorten(statement)}")
+        logger.log(
+            logging.INFO if settings.DEBUG else logging.DEBUG,
+            f"{stats.route}: {stats.count} queries, {stats.total_ms:.1f} ms in DB",
+        )
@@ -0,0 +1,335 @@
+"""
+Snapshot ngân hàng câu hỏi dạng file nhị phân, mmap chỉ đọc trong mọi worker:
+các trang nằm trong page cache của OS nên nhiều process dùng chung một bản.
+
+Bố cục file (little-endian, mỗi phần căn 8 byte):
+    header   magic, số câu, số nhóm, số chuỗi, thời điểm build, id chuỗi fingerprint, offset các phần
+    ids      int64[N]        id câu hỏi, tăng dần (tìm bằng bisect)
+    records  uint32[N][4]    id chuỗi của content, options, correct_answer, explanation
+    groups   uint32[G][5]    id chuỗi subject, topic, level + (start, count) trong members
+    members  uint32[N]       chỉ số câu hỏi (theo ids) gom theo nhóm (subject, topic, level)
+    offsets  uint64[S + 1]   chuỗi thứ i là blob[offsets[i]:offsets[i + 1]]
+    blob     UTF-8           chuỗi đã intern (mỗi giá trị giống nhau chỉ lưu một lần)
+
+scripts/build_question_snapshot.py dựng file từ DB, ghi ra file tạm rồi os.replace
+nên worker luôn thấy bản cũ hoặc bản mới hoàn chỉnh; worker kiểm tra file mỗi
+QUESTION_SNAPSHOT_CHECK_SECONDS và mmap lại khi file đổi.
+"""
+
+import bisect
+import logging
+import mmap
+import os
+import random
+import struct
+import time
+from datetime import datetime
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+from sqlalchemy import func, select
+from sqlalchemy.engine import Connection
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.metrics import metrics
+from app.db import queries
+from app.models.question import Question
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"EQB1"
+HEADER = struct.Struct("<4sIIIdI6Q")
+# Các phần dữ liệu bắt đầu ở biên 8 byte ngay sau header
+DATA_START = (HEADER.size + 7) // 8 * 8
+NONE = 0xFFFFFFFF
+RECORD_FIELDS = 4
+GROUP_FIELDS = 5
+
+
+class QuestionView(NamedTuple):
+    """Cùng tên thuộc tính với Row của queries.test_questions_stmt."""
+    id: int
+    content: str
+    options: Optional[str]
+
+
+class AnswerKey(NamedTuple):
+    """Cùng tên thuộc tính với Row của queries.answer_key_stmt."""
+    id: int
+    correct_answer: str
+    explanation: Optional[str]
+
+
+def source_fingerprint(conn: Connection) -> str:
+    """Thay đổi khi thêm, xóa hoặc sửa câu hỏi: dùng để bỏ qua lần build không cần thiết."""
+    count, max_id, max_updated = conn.execute(
+        select(func.count(Question.id), func.max(Question.id), func.max(Question.updated_at))
+    ).one()
+    return f"{count}:{max_id}:{max_updated}"
+
+
+def snapshot_is_current(conn: Connection, path: str, max_age: float = None) -> bool:
+    """
+    File ở path còn dùng được: cùng fingerprint với DB và chưa quá nửa max_age.
+    Fingerprint không thấy sửa bằng SQL tay không đổi updated_at, nên snapshot vẫn
+    được dựng lại theo tuổi trước khi worker coi nó là quá cũ.
+    """
+    max_age = settings.QUESTION_SNAPSHOT_MAX_AGE_SECONDS if max_age is None else max_age
+    try:
+        snapshot = QuestionSnapshot(path)
+    except (OSError, ValueError):
+        return False
+    if max_age and time.time() - snapshot.built_at > max_age / 2:
+        return False
+    return snapshot.fingerprint == source_fingerprint(conn)
+
+
+def _pad(buffer: bytearray) -> None:
+    buffer.extend(b"\0" * (-len(buffer) % 8))
+
+
+def build_snapshot(conn: Connection, path: str) -> int:
+    """Dựng snapshot từ bảng questions và thay file ở path một cách nguyên tử. Trả về số câu."""
+    fingerprint = source_fingerprint(conn)
+    strings: Dict[str, int] = {}
+
+    def intern(value: Optional[str]) -> int:
+        if value is None:
+            return NONE
+        return strings.setdefault(value, len(strings))
+
+    ids: List[int] = []
+    records: List[int] = []
+    groups: Dict[Tuple[int, int, int], List[int]] = {}
+    rows = conn.execution_options(yield_per=1000).execute(
+        select(
+            Question.id, Question.subject, Question.topic, Question.level,
+            Question.content, Question.options, Question.correct_answer, Question.explanation,
+        ).order_by(Question.id)
+    )
+    for row in rows:
+        index = len(ids)
+        ids.append(row.id)
+        records.extend((intern(row.content), intern(row.options), intern(row.correct_answer), intern(row.explanation)))
+        groups.setdefault((intern(row.subject), intern(row.topic), intern(row.level)), []).append(index)
+    fingerprint_sid = intern(fingerprint)
+
+    group_table: List[int] = []
+    members: List[int] = []
+    for key, indexes in groups.items():
+        group_table.extend((*key, len(members), len(indexes)))
+        members.extend(indexes)
+
+    encoded = [s.encode("utf-8") for s in strings]
+    offsets = [0]
+    for value in encoded:
+        offsets.append(offsets[-1] + len(value))
+
+    body = bytearray()
+    section_offsets = []
+    for fmt, values in (("q", ids), ("I", records), ("I", group_table), ("I", members), ("Q", offsets)):
+        section_offsets.append(DATA_START + len(body))
+        body.extend(struct.pack(f"<{len(values)}{fmt}", *values))
+        _pad(body)
+    section_offsets.append(DATA_START + len(body))
+    body.extend(b"".join(encoded))
+
+    header = HEADER.pack(
+        MAGIC, len(ids), len(groups), len(encoded), time.time(), fingerprint_sid, *section_offsets
+    )
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{path}.tmp-{os.getpid()}"
+    with open(tmp_path, "wb") as f:
+        f.write(header.ljust(DATA_START, b"\0"))
+        f.write(body)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+    return len(ids)
+
+
+class QuestionSnapshot:
+    """Một file snapshot đã mmap; chỉ đọc, không giữ dữ liệu câu hỏi trong heap của Python."""
+
+    def __init__(self, path: str):
+        with open(path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        view = memoryview(self._mm)
+        if len(view) < HEADER.size:
+            raise ValueError(f"{path} is not a question bank snapshot")
+        (
+            magic, count, group_count, string_count, self.built_at, fingerprint_sid,
+            ids_off, records_off, groups_off, members_off, offsets_off, blob_off,
+        ) = HEADER.unpack_from(view)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a question bank snapshot")
+        self.count = count
+        self._ids = view[ids_off:ids_off + 8 * count].cast("q")
+        self._records = view[records_off:records_off + 4 * RECORD_FIELDS * count].cast("I")
+        self._members = view[members_off:members_off + 4 * count].cast("I")
+        self._offsets = view[offsets_off:offsets_off + 8 * (string_count + 1)].cast("Q")
+        self._blob = view[blob_off:]
+        groups = view[groups_off:groups_off + 4 * GROUP_FIELDS * group_count].cast("I")
+        # Chỉ bảng nhóm (vài trăm dòng) được dựng thành dict trong heap
+        self._groups: Dict[Tuple[str, str, str], Tuple[int, int]] = {}
+        for g in range(group_count):
+            subject, topic, level, start, size = groups[g * GROUP_FIELDS:(g + 1) * GROUP_FIELDS]
+            self._groups[(self._string(subject), self._string(topic), self._string(level))] = (start, size)
+        self.fingerprint = self._string(fingerprint_sid)
+
+    def _string(self, sid: int) -> Optional[str]:
+        if sid == NONE:
+            return None
+        return str(self._blob[self._offsets[sid]:self._offsets[sid + 1]], "utf-8")
+
+    def _index(self, question_id: int) -> Optional[int]:
+        index = bisect.bisect_left(self._ids, question_id)
+        if index < self.count and self._ids[index] == question_id:
+            return index
+        return None
+
+    def _field(self, index: int, field: int) -> Optional[str]:
+        return self._string(self._records[index * RECORD_FIELDS + field])
+
+    def pool_size(self, subject: str, topic: str, level: str) -> int:
+        return self._groups.get((subject, topic, level), (0, 0))[1]
+
+    def pool_ids(self, subject: str, topic: str, level: str) -> List[int]:
+        start, size = self._groups.get((subject, topic, level), (0, 0))
+        return [self._ids[self._members[start + i]] for i in range(size)]
+
+    def sample_ids(self, subject: str, topic: str, level: str, count: int) -> List[int]:
+        start, size = self._groups.get((subject, topic, level), (0, 0))
+        return [self._ids[self._members[start + i]] for i in random.sample(range(size), count)]
+
+    def questions(self, question_ids: Sequence[int]) -> Optional[List[QuestionView]]:
+        """Nội dung hiển thị của các câu; None nếu có câu chưa có trong snapshot."""
+        indexes = [self._index(i) for i in question_ids]
+        if None in indexes:
+            return None
+        return [QuestionView(self._ids[i], self._field(i, 0), self._field(i, 1)) for i in indexes]
+
+    def answer_key(self, question_ids: Sequence[int]) -> Optional[List[AnswerKey]]:
+        """Đáp án để chấm; None nếu có câu chưa có trong snapshot."""
+        indexes = [self._index(i) for i in question_ids]
+        if None in indexes:
+            return None
+        return [AnswerKey(self._ids[i], self._field(i, 2), self._field(i, 3)) for i in indexes]
+
+
+class QuestionBank:
+    """
+    Snapshot hiện tại của worker. Sau mỗi check_seconds kiểm tra (inode, mtime)
+    của file, nếu file đã được thay thì mmap bản mới; bản cũ được giải phóng khi
+    không còn request nào dùng. Không có snapshot, hoặc snapshot dựng quá max_age
+    giây trước (build --watch đã dừng), thì trả về None và service đọc DB.
+    """
+
+    def __init__(self, path: Optional[str], check_seconds: float, max_age: float = 0):
+        self.path = path
+        self.check_seconds = check_seconds
+        self.max_age = max_age
+        self.stale = False
+        self._snapshot: Optional[QuestionSnapshot] = None
+        self._identity: Optional[Tuple[int, int]] = None
+        self._next_check = 0.0
+        self.reloads = 0
+        self.hits = 0
+        self.misses = 0
+
+    def snapshot(self) -> Optional[QuestionSnapshot]:
+        if not self.path:
+            return None
+        now = time.monotonic()
+        if now >= self._next_check:
+            self._next_check = now + self.check_seconds
+            self._reload_if_changed()
+            self._check_age()
+        return None if self.stale else self._snapshot
+
+    def _check_age(self) -> None:
+        stale = (
+            self._snapshot is not None and bool(self.max_age)
+            and time.time() - self._snapshot.built_at > self.max_age
+        )
+        if stale and not self.stale:
+            logger.warning(f"Question bank snapshot {self.path} is older than {self.max_age}s, reading questions from the database")
+        self.stale = stale
+
+    def _reload_if_changed(self) -> None:
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return
+        identity = (st.st_ino, st.st_mtime_ns)
+        if identity == self._identity:
+            return
+        try:
+            self._snapshot = QuestionSnapshot(self.path)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Could not load question bank snapshot {self.path}: {e}")
+            return
+        self._identity = identity
+        self.reloads += 1
+        logger.info(f"Loaded question bank snapshot with {self._snapshot.count} questions")
+
+    def record(self, hit: bool) -> None:
+        if hit:
+            self.hits += 1
+        else:
+            self.misses += 1
+
+    def stats(self) -> Dict[str, Any]:
+        snapshot = self._snapshot
+        return {
+            "enabled": bool(self.path),
+            "questions": snapshot.count if snapshot else 0,
+            "built_at": datetime.utcfromtimestamp(snapshot.built_at).isoformat() if snapshot else None,
+            "stale": self.stale,
+            "reloads": self.reloads,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+question_bank = QuestionBank(
+    path=settings.QUESTION_SNAPSHOT_PATH,
+    check_seconds=settings.QUESTION_SNAPSHOT_CHECK_SECONDS,
+    max_age=settings.QUESTION_SNAPSHOT_MAX_AGE_SECONDS,
+)
+metrics.register("question_bank", question_bank.stats)
+
+
+async def load_test_questions(db: AsyncSession, test_id: int) -> Sequence[Any]:
+    """Câu hỏi của đề để hiển thị: nội dung lấy từ snapshot, chỉ đọc id câu hỏi từ DB."""
+    snapshot = question_bank.snapshot()
+    if snapshot is not None:
+        rows = snapshot.questions(await queries.get_test_question_ids(db, test_id))
+        question_bank.record(rows is not None)
+        if rows is not None:
+            return rows
+    return await queries.get_test_questions(db, test_id)
+
+
+async def load_questions(db: AsyncSession, question_ids: Sequence[int]) -> Sequence[Any]:
+    """Nội dung các câu theo id (sắp theo id), ưu tiên snapshot."""
+    question_ids = sorted(question_ids)
+    snapshot = question_bank.snapshot()
+    if snapshot is not None:
+        rows = snapshot.questions(question_ids)
+        question_bank.record(rows is not None)
+        if rows is not None:
+            return rows
+    return await queries.get_questions(db, question_ids)
+
+
+async def load_answer_key(db: AsyncSession, test_id: int) -> Sequence[Any]:
+    """Đáp án của đề để chấm, ưu tiên snapshot như load_test_questions."""
+    snapshot = question_bank.snapshot()
+    if snapshot is not None:
+        rows = snapshot.answer_key(await queries.get_test_question_ids(db, test_id))
+        question_bank.record(rows is not None)
+        if rows is not None:
+            return rows
+    return await queries.get_answer_key(db, test_id)
@@ -0,0 +1,188 @@
+import logging
+import math
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, NamedTuple, Optional, Tuple
+
+from app.core.config import settings
+from app.core.exceptions import RateLimitException
+from app.core.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class BucketResult(NamedTuple):
+    allowed: bool
+    remaining: float
+    retry_after: int
+
+
+class MemoryBucketBackend:
+    """Token bucket trong bộ nhớ của worker. Số bucket bị giới hạn (LRU)."""
+
+    name = "memory"
+
+    def __init__(self, max_buckets: int):
+        self.max_buckets = max_buckets
+        self._lock = threading.Lock()
+        self._buckets: "OrderedDict[str, Tuple[float, float, float]]" = OrderedDict()
+
+    async def take(self, key: str, capacity: int, rate: float) -> BucketResult:
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated_at, _ = self._buckets.pop(key, (capacity, now, capacity))
+            tokens = min(capacity, tokens + (now - updated_at) * rate)
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+            self._buckets[key] = (tokens, now, capacity)
+            while len(self._buckets) > self.max_buckets:
+                self._buckets.popitem(last=False)
+        return BucketResult(allowed, tokens, 0 if allowed else math.ceil((1 - tokens) / rate))
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            buckets = list(self._buckets.values())
+        # Bucket đầy không cần hiển thị; chỉ đếm các bucket đang bị tiêu hao
+        draining = [b for b in buckets if b[0] < b[2]]
+        return {
+            "backend": self.name,
+            "buckets": len(buckets),
+            "draining_buckets": len(draining),
+            "empty_buckets": sum(1 for b in buckets if b[0] < 1),
+        }
+
+
+# Refill + lấy token trong một lần gọi atomic trên Redis
+_REDIS_TAKE_SCRIPT = """
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local now = tonumber(ARGV[3])
+local data = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(data[1]) or capacity
+local ts = tonumber(data[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+local allowed = 0
+if tokens >= 1 then
+  tokens = tokens - 1
+  allowed = 1
+end
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'ts', now)
+redis.call('EXPIRE', KEYS[1], math.ceil(capacity / rate) + 1)
+return {allowed, tostring(tokens)}
+"""
+
+
+class RedisBucketBackend:
+    """Token bucket dùng chung giữa các worker/instance qua Redis (hoặc server tương thích Redis)."""
+
+    name = "redis"
+
+    def __init__(self, url: str, prefix: str = "ratelimit:", on_failure: str = "memory", fallback: Optional[MemoryBucketBackend] = None):
+        try:
+            from redis import asyncio as redis_asyncio
+        except ImportError as e:
+            raise RuntimeError("LOGIN_RATE_LIMIT_BACKEND=redis requires the 'redis' package") from e
+        self.prefix = prefix
+        self._client = redis_asyncio.from_url(url)
+        self._script = self._client.register_script(_REDIS_TAKE_SCRIPT)
+        self.on_failure = on_failure
+        self.fallback = fallback
+        self.errors = 0
+        self.fallbacks = 0
+        self.rejected_on_error = 0
+        self.last_error: Optional[str] = None
+        self.last_error_at: Optional[float] = None
+
+    async def take(self, key: str, capacity: int, rate: float) -> BucketResult:
+        try:
+            allowed, tokens = await self._script(keys=[self.prefix + key], args=[capacity, rate, time.time()])
+        except Exception as e:
+            self.errors += 1
+            self.last_error = f"{type(e).__name__}: {e}"
+            self.last_error_at = time.time()
+            metrics.inc("login_rate_limit_backend_errors_total")
+            logger.warning(f"Rate limit backend unavailable ({self.on_failure}): {e}")
+            if self.on_failure == "closed":
+                self.rejected_on_error += 1
+                return BucketResult(False, 0, math.ceil(1 / rate))
+            if self.on_failure == "memory" and self.fallback is not None:
+                # Vẫn giới hạn theo từng worker cho đến khi Redis trở lại
+                self.fallbacks += 1
+                return await self.fallback.take(key, capacity, rate)
+            return BucketResult(True, capacity, 0)
+        tokens = float(tokens)
+        allowed = bool(int(allowed))
+        return BucketResult(allowed, tokens, 0 if allowed else math.ceil((1 - tokens) / rate))
+
+    async def aclose(self) -> None:
+        await self._client.aclose()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "backend": self.name,
+            "on_failure": self.on_failure,
+            "errors": self.errors,
+            "fallbacks": self.fallbacks,
+            "rejected_on_error": self.rejected_on_error,
+            "last_error": self.last_error,
+            "last_error_age_seconds": round(time.time() - self.last_error_at, 1) if self.last_error_at else None,
+            "fallback": self.fallback.stats() if self.fallback is not None else None,
+        }
+
+
+class LoginRateLimiter:
+    """Hai bucket cho mỗi lần đăng nhập: theo username và theo IP client."""
+
+    def __init__(self, backend: Optional[Any] = None):
+        self._backend = backend
+
+    @property
+    def backend(self):
+        if self._backend is None:
+            if settings.LOGIN_RATE_LIMIT_BACKEND == "redis" and settings.REDIS_URL:
+                on_failure = settings.LOGIN_RATE_LIMIT_REDIS_FAILURE
+                if on_failure not in ("memory", "closed", "open"):
+                    raise RuntimeError(f"Unknown LOGIN_RATE_LIMIT_REDIS_FAILURE: {on_failure}")
+                self._backend = RedisBucketBackend(
+                    settings.REDIS_URL,
+                    on_failure=on_failure,
+                    fallback=MemoryBucketBackend(settings.LOGIN_RATE_LIMIT_MAX_BUCKETS) if on_failure == "memory" else None,
+                )
+            else:
+                self._backend = MemoryBucketBackend(settings.LOGIN_RATE_LIMIT_MAX_BUCKETS)
+        return self._backend
+
+    async def check(self, username: str, client_ip: Optional[str]) -> None:
+        if not settings.LOGIN_RATE_LIMIT_ENABLED:
+            return
+        checks = [(
+            "username",
+            f"login:user:{(username or '').strip().lower()}",
+            settings.LOGIN_RATE_LIMIT_USERNAME_CAPACITY,
+            settings.LOGIN_RATE_LIMIT_USERNAME_PER_MINUTE / 60.0,
+        )]
+        if client_ip:
+            checks.append((
+                "ip",
+                f"login:ip:{client_ip}",
+                settings.LOGIN_RATE_LIMIT_IP_CAPACITY,
+                settings.LOGIN_RATE_LIMIT_IP_PER_MINUTE / 60.0,
+            ))
+        for kind, key, capacity, rate in checks:
+            result = await self.backend.take(key, capacity, rate)
+            if not result.allowed:
+                metrics.inc(f"login_rate_limit_rejected_{kind}_total")
+                raise RateLimitException(retry_after=max(1, result.retry_after))
+
+    async def aclose(self) -> None:
+        if isinstance(self._backend, RedisBucketBackend):
+            await self._backend.aclose()
+
+    def stats(self) -> Dict[str, Any]:
+        return self.backend.stats()
+
+
+login_rate_limiter = LoginRateLimiter()
+metrics.register("login_rate_limit", login_rate_limiter.stats)
@@ -0,0 +1,240 @@
+import asyncio
+import itertools
+import logging
+import threading
+import time
+from collections import OrderedDict
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import event, text
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal, RoutingSession, create_async_db_engine
+from app.core.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# Đánh dấu trong session.info: transaction hiện tại có ghi dữ liệu
+WRITE_FLAG = "has_writes"
+# session.info["user_id"]: user của request (đặt bởi get_current_user)
+USER_ID_KEY = "user_id"
+# Response của request có commit ghi dữ liệu mang thời điểm ghi (epoch giây);
+# client gửi lại header này để request đọc sau đó, dù tới worker/instance khác,
+# vẫn đọc từ primary trong READ_YOUR_WRITES_SECONDS
+LAST_WRITE_HEADER = "X-DB-Last-Write"
+
+# Thời điểm commit ghi gần nhất của request hiện tại (đặt bởi ReadYourWritesMiddleware)
+_request_writes: ContextVar[Optional[Dict[str, float]]] = ContextVar("request_writes", default=None)
+
+
+class Replica:
+    def __init__(self, name: str, engine: AsyncEngine):
+        self.name = name
+        self.engine = engine
+        self.sessionmaker = async_sessionmaker(
+            engine, autoflush=False, expire_on_commit=False, sync_session_class=RoutingSession
+        )
+        self.healthy = True
+        self.failures = 0
+
+
+class ReplicaRouter:
+    """
+    Chọn database cho các route chỉ đọc: round-robin qua các replica còn sống,
+    quay về primary khi không có replica nào hoặc user vừa ghi dữ liệu
+    (read-your-writes trong READ_YOUR_WRITES_SECONDS).
+    "Vừa ghi" lấy từ header LAST_WRITE_HEADER client gửi lại (đúng giữa mọi
+    worker/instance) hoặc từ danh sách user vừa ghi trong bộ nhớ của worker.
+    Khi bật shard (app/core/shards.py), bảng dữ liệu học sinh luôn đọc từ shard
+    (primary của shard); replica chỉ phục vụ các bảng ở database chính.
+    """
+
+    def __init__(self, urls: List[str], read_your_writes_seconds: float, max_tracked_users: int):
+        self.read_your_writes_seconds = read_your_writes_seconds
+        self.max_tracked_users = max_tracked_users
+        self._urls = urls
+        self._replicas: Optional[List[Replica]] = None
+        self._cycle = itertools.count()
+        self._lock = threading.Lock()
+        self._recent_writers: "OrderedDict[int, float]" = OrderedDict()
+        self._health_task: Optional[asyncio.Task] = None
+        self.replica_reads = 0
+        self.primary_reads = 0
+        self.pinned_reads = 0
+
+    @property
+    def replicas(self) -> List[Replica]:
+        # Tạo lười: trên Vercel lifespan có thể không chạy
+        if self._replicas is None:
+            self._replicas = [
+                Replica(f"replica{i}", create_async_db_engine(url))
+                for i, url in enumerate(self._urls)
+            ]
+        return self._replicas
+
+    async def start(self) -> None:
+        if self.replicas and self._health_task is None:
+            self._health_task = asyncio.create_task(self._health_loop())
+
+    async def aclose(self) -> None:
+        if self._health_task is not None:
+            self._health_task.cancel()
+            self._health_task = None
+        for replica in self._replicas or ():
+            await replica.engine.dispose()
+
+    def mark_write(self, user_id: int) -> None:
+        with self._lock:
+            self._recent_writers.pop(user_id, None)
+            self._recent_writers[user_id] = time.monotonic() + self.read_your_writes_seconds
+            while len(self._recent_writers) > self.max_tracked_users:
+                self._recent_writers.popitem(last=False)
+
+    def _recently_wrote(self, user_id: Optional[int], last_write_at: Optional[float] = None) -> bool:
+        if last_write_at is not None and time.time() - last_write_at < self.read_your_writes_seconds:
+            return True
+        if user_id is None:
+            return False
+        with self._lock:
+            deadline = self._recent_writers.get(user_id)
+            if deadline is None:
+                return False
+            if deadline <= time.monotonic():
+                del self._recent_writers[user_id]
+                return False
+            return True
+
+    def _next_replica(self) -> Optional[Replica]:
+        healthy = [r for r in self.replicas if r.healthy]
+        if not healthy:
+            return None
+        return healthy[next(self._cycle) % len(healthy)]
+
+    def session(self, user_id: Optional[int] = None, last_write_at: Optional[float] = None) -> AsyncSession:
+        """AsyncSession cho một request chỉ đọc của user_id; last_write_at lấy từ LAST_WRITE_HEADER."""
+        if self._recently_wrote(user_id, last_write_at):
+            self.pinned_reads += 1
+            db = AsyncSessionLocal()
+        else:
+            replica = self._next_replica()
+            if replica is None:
+                self.primary_reads += 1
+                db = AsyncSessionLocal()
+            else:
+                self.replica_reads += 1
+                db = replica.sessionmaker()
+        if user_id is not None:
+            db.info[USER_ID_KEY] = user_id
+        return db
+
+    async def check_health(self) -> None:
+        for replica in self.replicas:
+            try:
+                async with replica.engine.connect() as conn:
+                    await asyncio.wait_for(
+                        conn.execute(text("SELECT 1")),
+                        timeout=settings.DB_REPLICA_HEALTH_CHECK_TIMEOUT_SECONDS,
+                    )
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                if replica.healthy:
+                    logger.warning(f"Read replica {replica.name} marked unhealthy: {e}")
+                    metrics.inc("db_replica_unhealthy_total")
+                replica.healthy = False
+                replica.failures += 1
+            else:
+                if not replica.healthy:
+                    logger.info(f"Read replica {replica.name} is healthy again")
+                replica.healthy = True
+
+    async def _health_loop(self) -> None:
+        while True:
+            try:
+                await self.check_health()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Replica health check failed: {e}")
+            await asyncio.sleep(settings.DB_REPLICA_HEALTH_CHECK_SECONDS)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "replicas": {r.name: {"healthy": r.healthy, "failures": r.failures} for r in self._replicas or ()},
+            "replica_reads": self.replica_reads,
+            "primary_reads": self.primary_reads,
+            "pinned_reads": self.pinned_reads,
+            "recent_writers": len(self._recent_writers),
+        }
+
+
+replica_router = ReplicaRouter(
+    urls=settings.replica_urls,
+    read_your_writes_seconds=settings.DB_READ_YOUR_WRITES_SECONDS,
+    max_tracked_users=settings.PRINCIPAL_CACHE_SIZE,
+)
+metrics.register("db_replicas", replica_router.stats)
+
+
+@event.listens_for(Session, "after_flush")
+def _flag_flush(session: Session, flush_context: Any) -> None:
+    session.info[WRITE_FLAG] = True
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _flag_dml(orm_execute_state: Any) -> None:
+    # INSERT/UPDATE/DELETE chạy thẳng qua session.execute không đi qua flush
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        orm_execute_state.session.info[WRITE_FLAG] = True
+
+
+@event.listens_for(Session, "after_commit")
+def _remember_writer(session: Session) -> None:
+    user_id = session.info.get(USER_ID_KEY)
+    if session.info.pop(WRITE_FLAG, False) and user_id is not None:
+        replica_router.mark_write(user_id)
+        writes = _request_writes.get()
+        if writes is not None:
+            writes["last_write_at"] = time.time()
+
+
+@event.listens_for(Session, "after_rollback")
+def _clear_write_flag(session: Session) -> None:
+    session.info.pop(WRITE_FLAG, None)
+
+
+def parse_last_write(value: Optional[str]) -> Optional[float]:
+    try:
+        return float(value) if value else None
+    except ValueError:
+        return None
+
+
+class ReadYourWritesMiddleware:
+    """ASGI middleware trả LAST_WRITE_HEADER khi request đã commit ghi dữ liệu của user."""
+
+    def __init__(self, app: Any):
+        self.app = app
+
+    async def __call__(self, scope: Dict[str, Any], receive: Any, send: Any) -> None:
+        if scope["type"] != "http" or not settings.replica_urls:
+            await self.app(scope, receive, send)
+            return
+
+        writes: Dict[str, float] = {}
+        token = _request_writes.set(writes)
+
+        async def send_with_marker(message: Dict[str, Any]) -> None:
+            if message["type"] == "http.response.start" and "last_write_at" in writes:
+                headers = list(message.get("headers", []))
+                headers.append((LAST_WRITE_HEADER.lower().encode(), f"{writes['last_write_at']:.3f}".encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_marker)
+        finally:
+            _request_writes.reset(token)
@@ -1,22 +1,62 @@
+import hashlib
+import secrets
 from datetime import datetime, timedelta
-from typing import Any, Union
+from typing import Any, List, Optional, Union
 from jose import jwt
 from passlib.context import CryptContext
 from app.core.config import settings
 
-# Sử dụng bcrypt làm scheme chính. 
+def build_password_context(
+    scheme: str = None,
+    bcrypt_rounds: int = None,
+    argon2_time_cost: int = None,
+    argon2_memory_cost: int = None,
+    argon2_parallelism: int = None,
+) -> CryptContext:
+    """
+    Tạo CryptContext theo tham số cost trong settings.
+    bcrypt luôn nằm trong danh sách để vẫn verify được hash cũ khi chuyển sang argon2.
+    """
+    scheme = scheme or settings.PASSWORD_HASH_SCHEME
+    schemes = ["argon2", "bcrypt"] if scheme == "argon2" else ["bcrypt"]
+    options = {"bcrypt__rounds": bcrypt_rounds or settings.BCRYPT_ROUNDS}
+    if scheme == "argon2":
+        options.update({
+            "argon2__time_cost": argon2_time_cost or settings.ARGON2_TIME_COST,
+            "argon2__memory_cost": argon2_memory_cost or settings.ARGON2_MEMORY_COST,
+            "argon2__parallelism": argon2_parallelism or settings.ARGON2_PARALLELISM,
+        })
+    return CryptContext(schemes=schemes, default=schemes[0], deprecated="auto", **options)
+
 # Lưu ý: bcrypt có giới hạn cứng là 72 ký tự cho mật khẩu đầu vào.
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+pwd_context = build_password_context()
 
-def create_access_token(subject: Union[str, Any], expires_delta: timedelta = None) -> str:
+def create_access_token(
+    subject: Union[str, Any],
+    expires_delta: timedelta = None,
+    role: Optional[str] = None,
+    token_version: Optional[int] = None,
+) -> str:
     if expires_delta:
         expire = datetime.utcnow() + expires_delta
     else:
         expire = datetime.utcnow() + timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
     to_encode = {"exp": expire, "sub": str(subject)}
+    # role + ver giúp xác thực request mà không cần đọc bảng users
+    if role is not None:
+        to_encode["role"] = role
+    if token_version is not None:
+        to_encode["ver"] = token_version
     encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
     return encoded_jwt
 
+def create_refresh_token() -> str:
+    return secrets.token_urlsafe(32)
+
+def hash_refresh_token(token: str) -> str:
+    # Refresh token có entropy cao nên SHA-256 là đủ, không cần bcrypt
+    return hashlib.sha256(token.encode()).hexdigest()
+
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     # Cắt tỉa password về 72 ký tự để tương thích với giới hạn của bcrypt
     safe_password = plain_password[:72] if plain_password else ""
@@ -25,4 +65,15 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
 def get_password_hash(password: str) -> str:
     # Cắt tỉa password về 72 ký tự trước khi hash để tránh ValueError
     safe_password = password[:72] if password else ""
-    return pwd_context.hash(safe_password)
\ No newline at end of file
+    return pwd_context.hash(safe_password)
+
+def hash_passwords(passwords: List[str]) -> List[str]:
+    """Hash cả lô trong một lần gọi (giảm chi phí pickle khi chạy trong process pool)."""
+    return [get_password_hash(p) for p in passwords]
+
+def password_needs_update(hashed_password: str) -> bool:
+    """Hash dùng scheme/cost khác cấu hình hiện tại (vd. sau khi calibrate lại)."""
+    try:
+        return pwd_context.needs_update(hashed_password)
+    except ValueError:
+        return False
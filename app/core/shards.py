@@ -0,0 +1,138 @@
+import logging
+from collections import Counter
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+from sqlalchemy.orm import Mapper, Session
+from sqlalchemy.sql.util import find_tables
+
+from app.core.config import settings
+from app.core.database import RoutingSession, async_engine, create_async_db_engine
+from app.core.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# Bảng mà mỗi dòng thuộc về đúng một học sinh: nằm trên shard của học sinh đó.
+# Ngân hàng câu hỏi được chép sang mọi shard (app/db/question_sync.py, chạy qua scripts/shards.py sync-questions
+# hoặc scripts/build_question_snapshot.py) sau mỗi lần seed/sửa/xóa câu hỏi
+# để truy vấn đề/đáp án join ngay trên shard; users, sessions và pool đề dựng sẵn
+# (pregenerated_selections) ở database chính.
+SHARDED_TABLES = frozenset({
+    "practice_tests",
+    "test_question_association",
+    "submissions",
+    "grading_results",
+    "learning_suggestions",
+    "learning_history",
+})
+
+# Bảng được chép sang mọi shard: câu SELECT chỉ chạm các bảng này trong session đã gắn
+# học sinh/shard cũng đọc trên shard, để id câu hỏi được chọn luôn có trên shard
+# (khóa ngoại của test_question_association) kể cả khi shard chưa sync câu mới
+REPLICATED_TABLES = frozenset({"questions"})
+
+# session.info["shard_student_id"]: học sinh mà session đang đọc/ghi dữ liệu (đặt bởi deps)
+STUDENT_ID_KEY = "shard_student_id"
+# session.info["shard_index"]: chỉ định thẳng shard, cho job chạy trên từng shard
+SHARD_INDEX_KEY = "shard_index"
+
+
+class ShardRoutingError(RuntimeError):
+    """Câu lệnh chạm bảng dữ liệu học sinh nhưng session chưa gắn học sinh/shard."""
+
+
+class ShardRouter:
+    """
+    Chia dữ liệu học sinh ra nhiều database theo student_id % số shard.
+    RoutingSession hỏi get_bind() cho từng câu lệnh: câu nào chạm bảng trong
+    SHARDED_TABLES chạy trên shard của session, còn lại dùng bind mặc định
+    (primary hoặc replica), nên service không cần biết có shard.
+    Đổi số shard nghĩa là phải chuyển dữ liệu: id sequence trên mỗi shard được
+    xen kẽ (scripts/shards.py init) để id vẫn duy nhất khi gộp/chuyển dữ liệu.
+    Câu chỉ đọc questions (chép sang mọi shard) cũng chạy trên shard của session,
+    nên chọn câu hỏi cho đề không lấy phải câu shard chưa có.
+    Shard được chọn trước replica: bảng dữ liệu học sinh luôn đọc/ghi trên shard,
+    kể cả trong session replica của get_read_db.
+    """
+
+    def __init__(self, urls: List[str]):
+        self._urls = urls
+        self._engines: Optional[List[AsyncEngine]] = None
+        self.routed: Counter = Counter()
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self._urls)
+
+    @property
+    def engines(self) -> List[AsyncEngine]:
+        # Tạo lười giống ReplicaRouter: trên Vercel lifespan có thể không chạy
+        if self._engines is None:
+            self._engines = [create_async_db_engine(url) for url in self._urls]
+        return self._engines
+
+    def shard_index(self, student_id: int) -> int:
+        return student_id % len(self._urls)
+
+    def index_for(self, student_id: int) -> Optional[int]:
+        """Shard của học sinh, None khi không shard."""
+        return self.shard_index(student_id) if self.enabled else None
+
+    def indexes(self) -> List[Optional[int]]:
+        """Các shard cần duyệt cho job chạy toàn bộ dữ liệu; [None] khi không shard."""
+        return list(range(len(self._urls))) if self.enabled else [None]
+
+    def data_engines(self) -> List[AsyncEngine]:
+        """Các engine đang chứa bảng dữ liệu học sinh."""
+        return self.engines if self.enabled else [async_engine]
+
+    @staticmethod
+    def bind_student(db: AsyncSession, student_id: int) -> None:
+        db.info[STUDENT_ID_KEY] = student_id
+
+    @staticmethod
+    def use_shard(db: AsyncSession, index: Optional[int]) -> None:
+        if index is None:
+            db.info.pop(SHARD_INDEX_KEY, None)
+        else:
+            db.info[SHARD_INDEX_KEY] = index
+
+    def get_bind(self, session: Session, mapper: Optional[Mapper], clause: Any) -> Optional[Engine]:
+        if clause is not None:
+            tables = find_tables(clause, include_crud=True, include_joins=True)
+        elif mapper is not None:
+            tables = mapper.tables
+        else:
+            return None
+        names = {getattr(t, "name", None) for t in tables}
+        if not names & SHARDED_TABLES:
+            reads_replicated = bool(names) and names <= REPLICATED_TABLES and getattr(clause, "is_select", False)
+            if not reads_replicated or (SHARD_INDEX_KEY not in session.info and STUDENT_ID_KEY not in session.info):
+                return None
+
+        index = session.info.get(SHARD_INDEX_KEY)
+        if index is None:
+            student_id = session.info.get(STUDENT_ID_KEY)
+            if student_id is None:
+                raise ShardRoutingError("Session is not bound to a student, cannot pick a shard")
+            index = self.shard_index(student_id)
+        self.routed[index] += 1
+        return self.engines[index].sync_engine
+
+    async def aclose(self) -> None:
+        for engine in self._engines or ():
+            await engine.dispose()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "shards": len(self._urls),
+            "routed": {f"shard{i}": self.routed[i] for i in range(len(self._urls))},
+        }
+
+
+shard_router = ShardRouter(urls=settings.shard_urls)
+metrics.register("db_shards", shard_router.stats)
+
+if shard_router.enabled:
+    RoutingSession.router = shard_router
@@ -0,0 +1,253 @@
+"""
+Pool đề dựng sẵn cho các tiêu chí (subject, topic, level, số câu) phổ biến.
+
+Mỗi dòng pregenerated_selections là một bộ id câu hỏi ngẫu nhiên chưa giao cho
+ai. Tạo đề chỉ cần nhận (claim) một dòng bằng một câu UPDATE ... SKIP LOCKED
+(queries.claim_selection_stmt) thay vì đếm và chọn câu lúc cao điểm; hết dòng
+thì quay về cách chọn thường.
+
+Dòng đã giao giữ claimed_at đến lượt bù kế tiếp: filler tạo lại đủ TEST_POOL_DEPTH
+dòng chưa giao cho mỗi tiêu chí rồi xóa các dòng đã giao, nên đo được độ trễ từ
+lúc một dòng bị lấy đến lúc được bù. Filler chạy nền trong worker khi
+TEST_POOL_FILL_SECONDS > 0, hoặc qua scripts/fill_test_pool.py.
+"""
+
+import asyncio
+import logging
+import random
+import time
+import zlib
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence
+
+from sqlalchemy import delete, func, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.core.metrics import metrics
+from app.core.question_bank import question_bank
+from app.db import queries
+from app.models.question import Question
+from app.models.test_pool import PregeneratedSelection
+
+logger = logging.getLogger(__name__)
+
+# Khóa advisory (Postgres) để nhiều worker/filler không cùng bù một tiêu chí
+FILL_LOCK_NAMESPACE = 7301
+
+
+class Criteria(NamedTuple):
+    subject: str
+    topic: str
+    level: str
+    count: int
+
+    @property
+    def key(self) -> str:
+        return f"{self.subject}|{self.topic}|{self.level}|{self.count}"
+
+
+class TestPool:
+    def __init__(self, depth: int, fill_seconds: float, max_age_seconds: int):
+        self.depth = depth
+        self.fill_seconds = fill_seconds
+        self.max_age_seconds = max_age_seconds
+        self.hits = 0
+        self.misses = 0
+        self.fills = 0
+        self.created = 0
+        self.expired = 0
+        self.last_fill_at: Optional[datetime] = None
+        self.last_fill_ms = 0.0
+        self.refill_lag_seconds = 0.0
+        self.max_refill_lag_seconds = 0.0
+        self.depths: Dict[str, int] = {}
+        self._fill_task: Optional[asyncio.Task] = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.depth > 0
+
+    async def claim(self, db: AsyncSession, subject: str, topic: str, level: str, count: int) -> Optional[List[int]]:
+        """
+        Nhận một bộ id câu hỏi dựng sẵn trong transaction hiện tại của db (commit cùng đề);
+        None khi pool tắt hoặc đã hết bộ cho tiêu chí này.
+        """
+        if not self.enabled:
+            return None
+        question_ids = await queries.claim_selection(db, subject, topic, level, count)
+        if question_ids is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return [int(i) for i in question_ids.split(",")]
+
+    async def discard(self, db: AsyncSession, subject: str, topic: str, level: str, question_ids: Sequence[int]) -> None:
+        """Xóa bộ đã nhận nhưng không dùng được (có câu đã bị xóa) sau khi transaction nhận bị rollback."""
+        await db.execute(
+            delete(PregeneratedSelection).where(
+                PregeneratedSelection.subject == subject,
+                PregeneratedSelection.topic == topic,
+                PregeneratedSelection.level == level,
+                PregeneratedSelection.question_count == len(question_ids),
+                PregeneratedSelection.question_ids == ",".join(map(str, question_ids)),
+                PregeneratedSelection.claimed_at.is_(None),
+            )
+        )
+        await db.commit()
+
+    async def criteria(self, db: AsyncSession) -> List[Criteria]:
+        configured = settings.test_pool_criteria
+        if configured:
+            return [Criteria(*c) for c in configured]
+        groups = (await db.execute(
+            select(Question.subject, Question.topic, Question.level, func.count())
+            .group_by(Question.subject, Question.topic, Question.level)
+        )).all()
+        return [
+            Criteria(subject, topic, level, count)
+            for subject, topic, level, size in groups
+            for count in settings.test_pool_question_counts
+            if count <= size
+        ]
+
+    async def fill(self, db: AsyncSession) -> Dict[str, Dict[str, int]]:
+        """Bù mọi tiêu chí về đủ depth dòng chưa giao; trả về số dòng tạo/xóa theo tiêu chí."""
+        started = time.perf_counter()
+        pools: Dict[tuple, Sequence[int]] = {}
+        report = {}
+        lags = []
+        for criteria in await self.criteria(db):
+            group = (criteria.subject, criteria.topic, criteria.level)
+            if group not in pools:
+                snapshot = question_bank.snapshot()
+                pools[group] = (
+                    snapshot.pool_ids(*group) if snapshot is not None
+                    else await queries.get_question_pool_ids(db, *group)
+                )
+            result = await self._fill_one(db, criteria, pools[group])
+            if result is None:
+                continue
+            lag = result.pop("lag_seconds")
+            if lag is not None:
+                lags.append(lag)
+            report[criteria.key] = result
+            self.depths[criteria.key] = result["depth"]
+
+        self.fills += 1
+        self.last_fill_at = datetime.utcnow()
+        self.last_fill_ms = (time.perf_counter() - started) * 1000
+        self.refill_lag_seconds = max(lags, default=0.0)
+        self.max_refill_lag_seconds = max(self.max_refill_lag_seconds, self.refill_lag_seconds)
+        return report
+
+    async def _fill_one(self, db: AsyncSession, criteria: Criteria, pool: Sequence[int]) -> Optional[Dict[str, Any]]:
+        """Một transaction cho mỗi tiêu chí; None nếu filler khác đang bù tiêu chí này."""
+        if db.bind.dialect.name == "postgresql":
+            key = zlib.crc32(criteria.key.encode()) - 2 ** 31
+            if not await db.scalar(select(func.pg_try_advisory_xact_lock(FILL_LOCK_NAMESPACE, key))):
+                await db.rollback()
+                return None
+
+        now = datetime.utcnow()
+        matches = (
+            PregeneratedSelection.subject == criteria.subject,
+            PregeneratedSelection.topic == criteria.topic,
+            PregeneratedSelection.level == criteria.level,
+            PregeneratedSelection.question_count == criteria.count,
+        )
+        # Thay bộ cũ để câu hỏi mới thêm vào ngân hàng cũng được giao
+        expired = (await db.execute(
+            delete(PregeneratedSelection).where(
+                *matches,
+                PregeneratedSelection.claimed_at.is_(None),
+                PregeneratedSelection.created_at < now - timedelta(seconds=self.max_age_seconds),
+            )
+        )).rowcount
+        ready = await db.scalar(
+            select(func.count()).select_from(PregeneratedSelection)
+            .where(*matches, PregeneratedSelection.claimed_at.is_(None))
+        )
+        missing = self.depth - ready if len(pool) >= criteria.count else 0
+        if missing > 0:
+            await db.execute(
+                insert(PregeneratedSelection),
+                [
+                    {
+                        "subject": criteria.subject,
+                        "topic": criteria.topic,
+                        "level": criteria.level,
+                        "question_count": criteria.count,
+                        "question_ids": ",".join(map(str, random.sample(pool, criteria.count))),
+                    }
+                    for _ in range(missing)
+                ],
+            )
+        # Các dòng giao trước lượt này đã được bù ở trên: dòng lấy sớm nhất cho biết độ trễ bù
+        claimed = (
+            *matches,
+            PregeneratedSelection.claimed_at.is_not(None),
+            PregeneratedSelection.claimed_at <= now,
+        )
+        oldest_claim = await db.scalar(select(func.min(PregeneratedSelection.claimed_at)).where(*claimed))
+        consumed = (await db.execute(delete(PregeneratedSelection).where(*claimed))).rowcount
+        await db.commit()
+
+        created = max(missing, 0)
+        self.created += created
+        self.expired += expired
+        return {
+            "created": created,
+            "consumed": consumed,
+            "expired": expired,
+            "depth": ready + created,
+            "lag_seconds": (now - oldest_claim).total_seconds() if oldest_claim is not None else None,
+        }
+
+    async def start(self) -> None:
+        if self.enabled and self.fill_seconds > 0 and self._fill_task is None:
+            self._fill_task = asyncio.create_task(self._fill_loop())
+
+    async def aclose(self) -> None:
+        if self._fill_task is not None:
+            self._fill_task.cancel()
+            self._fill_task = None
+
+    async def _fill_loop(self) -> None:
+        while True:
+            try:
+                async with AsyncSessionLocal() as db:
+                    await self.fill(db)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Test pool fill failed: {e}")
+            await asyncio.sleep(self.fill_seconds)
+
+    def stats(self) -> Dict[str, Any]:
+        claims = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "depth_target": self.depth,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / claims, 4) if claims else None,
+            "fills": self.fills,
+            "created": self.created,
+            "expired": self.expired,
+            "last_fill_at": self.last_fill_at.isoformat() if self.last_fill_at else None,
+            "last_fill_ms": round(self.last_fill_ms, 1),
+            "refill_lag_seconds": round(self.refill_lag_seconds, 3),
+            "max_refill_lag_seconds": round(self.max_refill_lag_seconds, 3),
+            # Số dòng chưa giao sau lượt bù gần nhất (chỉ có ở process chạy filler)
+            "depth": dict(self.depths),
+        }
+
+
+test_pool = TestPool(
+    depth=settings.TEST_POOL_DEPTH,
+    fill_seconds=settings.TEST_POOL_FILL_SECONDS,
+    max_age_seconds=settings.TEST_POOL_MAX_AGE_SECONDS,
+)
+metrics.register("test_pool", test_pool.stats)
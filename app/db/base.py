@@ -9,3 +9,5 @@ from app.models.submission import Submission
 from app.models.result import GradingResult
 from app.models.suggestion import LearningSuggestion
 from app.models.history import LearningHistory
+from app.models.test_pool import PregeneratedSelection
+from app.models.provisioning import ProvisioningJob, ProvisioningRow
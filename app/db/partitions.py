@@ -0,0 +1,158 @@
+"""
+Bảo trì partition theo tháng của submissions và grading_results (Postgres):
+tạo trước partition cho các tháng sắp tới và chuyển partition cũ sang lưu trữ lạnh.
+Partition đặt tên <bảng>_pYYYY_MM (xem migration f7a3c8e21d56); <bảng>_default
+chỉ hứng các dòng nằm ngoài các tháng đã tạo.
+Chạy định kỳ qua scripts/manage_partitions.py.
+
+Với PARTITION_ARCHIVE_MODE=detach, bài nộp của các tháng trước archive_cutoff()
+không còn thấy từ bảng submissions nhưng partition đã tách vẫn giữ khóa ngoại
+submissions_test_id_fkey tới practice_tests. Job dọn đề chưa nộp
+(app/services/retention_service.py) vì vậy bỏ qua đề tạo trước mốc này.
+"""
+
+import logging
+import re
+from dataclasses import dataclass
+from datetime import date, datetime
+from typing import Dict, List, Optional
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+PARTITIONED_TABLES = ("submissions", "grading_results")
+
+_PARTITION_NAME = re.compile(r"_p(\d{4})_(\d{2})$")
+
+
+@dataclass
+class Partition:
+    name: str
+    schema: str
+    tablespace: Optional[str]
+    month: Optional[date]  # None với partition DEFAULT
+
+
+def add_months(month: date, months: int) -> date:
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def current_month() -> date:
+    # created_at lưu giờ UTC (datetime.utcnow) nên tháng hiện tại cũng tính theo UTC
+    today = datetime.utcnow().date()
+    return date(today.year, today.month, 1)
+
+
+def archive_cutoff(after_months: int = None) -> date:
+    """Tháng đầu tiên còn ở bảng cha: partition của các tháng trước mốc này bị chuyển đi."""
+    after_months = settings.PARTITION_ARCHIVE_AFTER_MONTHS if after_months is None else after_months
+    return add_months(current_month(), -after_months)
+
+
+def partition_name(table: str, month: date) -> str:
+    return f"{table}_p{month:%Y_%m}"
+
+
+async def list_partitions(conn: AsyncConnection, table: str) -> List[Partition]:
+    rows = (await conn.execute(
+        text(
+            "SELECT c.relname, n.nspname, t.spcname FROM pg_inherits i "
+            "JOIN pg_class c ON c.oid = i.inhrelid "
+            "JOIN pg_namespace n ON n.oid = c.relnamespace "
+            "LEFT JOIN pg_tablespace t ON t.oid = c.reltablespace "
+            "WHERE i.inhparent = CAST(:table AS regclass) ORDER BY c.relname"
+        ),
+        {"table": table},
+    )).all()
+    partitions = []
+    for name, schema, tablespace in rows:
+        match = _PARTITION_NAME.search(name)
+        month = date(int(match.group(1)), int(match.group(2)), 1) if match else None
+        partitions.append(Partition(name=name, schema=schema, tablespace=tablespace, month=month))
+    return partitions
+
+
+async def ensure_future_partitions(conn: AsyncConnection, table: str, months_ahead: int = None) -> List[str]:
+    """Tạo partition cho tháng hiện tại và months_ahead tháng tới nếu chưa có."""
+    months_ahead = settings.PARTITION_MONTHS_AHEAD if months_ahead is None else months_ahead
+    existing = {p.month for p in await list_partitions(conn, table)}
+    created = []
+    start = current_month()
+    for offset in range(months_ahead + 1):
+        month = add_months(start, offset)
+        if month in existing:
+            continue
+        name = partition_name(table, month)
+        await conn.execute(text(
+            f"CREATE TABLE {name} PARTITION OF {table} "
+            f"FOR VALUES FROM ('{month.isoformat()}') TO ('{add_months(month, 1).isoformat()}')"
+        ))
+        created.append(name)
+    return created
+
+
+async def archive_cold_partitions(
+    conn: AsyncConnection,
+    table: str,
+    after_months: int = None,
+    mode: str = None,
+    tablespace: str = None,
+) -> List[str]:
+    """
+    Chuyển các partition có tháng cũ hơn after_months sang lưu trữ lạnh:
+    - mode "tablespace": SET TABLESPACE (kèm index) sang PARTITION_ARCHIVE_TABLESPACE,
+      dữ liệu vẫn truy vấn được qua bảng cha. Tablespace có thể nằm trên ổ rẻ hơn
+      hoặc filesystem có nén (ZFS/Btrfs), Postgres không tự nén heap.
+    - mode "detach": tách khỏi bảng cha và chuyển sang schema PARTITION_ARCHIVE_SCHEMA,
+      lịch sử học tập không còn thấy các bài này (xem ghi chú về retention ở đầu module).
+    """
+    after_months = settings.PARTITION_ARCHIVE_AFTER_MONTHS if after_months is None else after_months
+    mode = mode or settings.PARTITION_ARCHIVE_MODE
+    tablespace = tablespace or settings.PARTITION_ARCHIVE_TABLESPACE
+    if mode not in ("tablespace", "detach"):
+        raise ValueError(f"Unknown PARTITION_ARCHIVE_MODE: {mode}")
+    if mode == "tablespace" and not tablespace:
+        logger.info("PARTITION_ARCHIVE_TABLESPACE is not set, skipping archival")
+        return []
+
+    cutoff = archive_cutoff(after_months)
+    # Không chờ lâu lock của bảng đang phục vụ request; lần chạy sau sẽ thử lại
+    await conn.execute(text(f"SET lock_timeout = '{settings.PARTITION_LOCK_TIMEOUT_SECONDS}s'"))
+    archived = []
+    for partition in await list_partitions(conn, table):
+        if partition.month is None or partition.month >= cutoff:
+            continue
+        if mode == "tablespace":
+            if partition.tablespace == tablespace:
+                continue
+            await conn.execute(text(f"ALTER TABLE {partition.name} SET TABLESPACE {tablespace}"))
+            indexes = (await conn.execute(
+                text("SELECT indexrelid::regclass::text FROM pg_index WHERE indrelid = CAST(:name AS regclass)"),
+                {"name": partition.name},
+            )).scalars().all()
+            for index in indexes:
+                await conn.execute(text(f"ALTER INDEX {index} SET TABLESPACE {tablespace}"))
+        else:
+            schema = settings.PARTITION_ARCHIVE_SCHEMA
+            await conn.execute(text(f"CREATE SCHEMA IF NOT EXISTS {schema}"))
+            # Bảng cha có partition DEFAULT nên không dùng được DETACH ... CONCURRENTLY
+            await conn.execute(text(f"ALTER TABLE {table} DETACH PARTITION {partition.name}"))
+            await conn.execute(text(f"ALTER TABLE {partition.name} SET SCHEMA {schema}"))
+        archived.append(partition.name)
+    return archived
+
+
+async def maintain_partitions(conn: AsyncConnection, archive: bool = True) -> Dict[str, Dict[str, List[str]]]:
+    """Chạy cả hai bước cho mọi bảng partition; conn nên ở chế độ AUTOCOMMIT để mỗi lệnh DDL commit riêng."""
+    report = {}
+    for table in PARTITIONED_TABLES:
+        created = await ensure_future_partitions(conn, table)
+        archived = await archive_cold_partitions(conn, table) if archive else []
+        report[table] = {"created": created, "archived": archived}
+        logger.info(f"{table}: created {created or 'no'} partitions, archived {archived or 'no'} partitions")
+    return report
@@ -0,0 +1,264 @@
+"""
+Câu truy vấn nóng dưới dạng lambda_stmt: SQLAlchemy chỉ dựng và compile mỗi
+câu một lần, các lần sau chỉ thay tham số. Kết quả là Row (tuple có tên cột),
+không tạo ORM object và chỉ lấy những cột cần dùng.
+
+submissions và grading_results được partition theo tháng của created_at trên
+Postgres: câu nào biết trước cận dưới của created_at thì truyền vào để planner
+chỉ quét các partition từ tháng đó trở đi.
+"""
+
+from datetime import datetime
+from typing import Optional, Sequence
+
+from sqlalchemy import exists, func, lambda_stmt, select, tablesample, update
+from sqlalchemy.engine import Row
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.sql.lambdas import StatementLambdaElement
+
+from app.core.config import settings
+from app.models.account import User
+from app.models.practice_test import PracticeTest
+from app.models.question import Question, test_question_association
+from app.models.result import GradingResult
+from app.models.submission import Submission
+from app.models.test_pool import PregeneratedSelection
+
+
+def student_ids_stmt(user_ids: Sequence[int]) -> StatementLambdaElement:
+    return lambda_stmt(lambda: select(User.id).where(User.id.in_(user_ids), User.role == "student"))
+
+
+def auth_state_stmt(user_id: int) -> StatementLambdaElement:
+    return lambda_stmt(
+        lambda: select(User.token_version, User.role, User.is_active, User.is_locked).where(User.id == user_id)
+    )
+
+
+def user_profile_stmt(user_id: int) -> StatementLambdaElement:
+    return lambda_stmt(
+        lambda: select(User.id, User.username, User.email, User.full_name, User.role, User.is_active)
+        .where(User.id == user_id)
+    )
+
+
+def test_header_stmt(test_id: int) -> StatementLambdaElement:
+    return lambda_stmt(
+        lambda: select(
+            PracticeTest.id,
+            PracticeTest.title,
+            PracticeTest.subject,
+            PracticeTest.student_id,
+            PracticeTest.duration_minutes,
+            PracticeTest.status,
+        ).where(PracticeTest.id == test_id)
+    )
+
+
+def question_pool_count_stmt(subject: str, topic: str, level: str) -> StatementLambdaElement:
+    """Số câu hỏi theo tiêu chí: quét index-only trên ix_questions_subject_topic_level."""
+    return lambda_stmt(
+        lambda: select(func.count(Question.id))
+        .where(Question.subject == subject, Question.topic == topic, Question.level == level)
+    )
+
+
+def question_pool_ids_stmt(subject: str, topic: str, level: str) -> StatementLambdaElement:
+    """Toàn bộ id của pool (chỉ id, quét index-only) cho tạo đề hàng loạt."""
+    return lambda_stmt(
+        lambda: select(Question.id)
+        .where(Question.subject == subject, Question.topic == topic, Question.level == level)
+    )
+
+
+def sample_question_ids_stmt(subject: str, topic: str, level: str, count: int) -> StatementLambdaElement:
+    """Chọn ngẫu nhiên count id trong database: chỉ sắp xếp id, không đọc nội dung câu hỏi."""
+    return lambda_stmt(
+        lambda: select(Question.id)
+        .where(Question.subject == subject, Question.topic == topic, Question.level == level)
+        .order_by(func.random())
+        .limit(count)
+    )
+
+
+def tablesample_question_ids_stmt(subject: str, topic: str, level: str, count: int, percent: float):
+    """
+    TABLESAMPLE SYSTEM (Postgres) chỉ đọc percent% số trang của bảng nên chi phí
+    không tăng theo kích thước pool. Lấy mẫu theo trang nên các câu nằm cạnh nhau
+    hay được chọn cùng nhau; caller lấy dư và quay về sample_question_ids_stmt nếu thiếu.
+    """
+    sampled = tablesample(Question.__table__, func.system(percent))
+    return (
+        select(sampled.c.id)
+        .where(sampled.c.subject == subject, sampled.c.topic == topic, sampled.c.level == level)
+        .order_by(func.random())
+        .limit(count)
+    )
+
+
+def claim_selection_stmt(subject: str, topic: str, level: str, count: int, now: datetime) -> StatementLambdaElement:
+    """
+    Nhận bộ câu dựng sẵn chưa giao cũ nhất theo tiêu chí. SKIP LOCKED: request
+    đồng thời bỏ qua dòng đang bị giữ và lấy dòng kế tiếp thay vì chờ.
+    """
+    return lambda_stmt(
+        lambda: update(PregeneratedSelection)
+        .where(
+            PregeneratedSelection.id == select(PregeneratedSelection.id)
+            .where(
+                PregeneratedSelection.subject == subject,
+                PregeneratedSelection.topic == topic,
+                PregeneratedSelection.level == level,
+                PregeneratedSelection.question_count == count,
+                PregeneratedSelection.claimed_at.is_(None),
+            )
+            .order_by(PregeneratedSelection.id)
+            .limit(1)
+            .with_for_update(skip_locked=True)
+            .scalar_subquery()
+        )
+        .values(claimed_at=now, updated_at=now)
+        .returning(PregeneratedSelection.question_ids)
+    )
+
+
+def test_questions_stmt(test_id: int) -> StatementLambdaElement:
+    """Câu hỏi của đề để hiển thị: không lấy đáp án và lời giải."""
+    return lambda_stmt(
+        lambda: select(Question.id, Question.content, Question.options)
+        .join(test_question_association, test_question_association.c.question_id == Question.id)
+        .where(test_question_association.c.test_id == test_id)
+        .order_by(Question.id)
+    )
+
+
+def questions_by_ids_stmt(question_ids: Sequence[int]) -> StatementLambdaElement:
+    """Nội dung hiển thị của các câu vừa chọn, không cần join qua đề."""
+    return lambda_stmt(
+        lambda: select(Question.id, Question.content, Question.options)
+        .where(Question.id.in_(question_ids))
+        .order_by(Question.id)
+    )
+
+
+def test_question_ids_stmt(test_id: int) -> StatementLambdaElement:
+    """Chỉ id câu hỏi của đề (nội dung lấy từ snapshot, xem app/core/question_bank.py)."""
+    return lambda_stmt(
+        lambda: select(test_question_association.c.question_id)
+        .where(test_question_association.c.test_id == test_id)
+        .order_by(test_question_association.c.question_id)
+    )
+
+
+def answer_key_stmt(test_id: int) -> StatementLambdaElement:
+    """Đáp án của đề để chấm bài."""
+    return lambda_stmt(
+        lambda: select(Question.id, Question.correct_answer, Question.explanation)
+        .join(test_question_association, test_question_association.c.question_id == Question.id)
+        .where(test_question_association.c.test_id == test_id)
+        .order_by(Question.id)
+    )
+
+
+def submission_stmt(submission_id: int) -> StatementLambdaElement:
+    return lambda_stmt(
+        lambda: select(
+            Submission.id,
+            Submission.student_id,
+            Submission.test_id,
+            Submission.type,
+            Submission.status,
+            Submission.answers,
+            Submission.created_at,
+        ).where(Submission.id == submission_id)
+    )
+
+
+def submission_exists_stmt(test_id: int) -> StatementLambdaElement:
+    return lambda_stmt(lambda: select(exists().where(Submission.test_id == test_id)))
+
+
+def result_stmt(submission_id: int, created_after: datetime) -> StatementLambdaElement:
+    """Kết quả chấm của bài nộp; kết quả luôn được tạo sau bài nộp nên created_after = submission.created_at."""
+    return lambda_stmt(
+        lambda: select(
+            GradingResult.id,
+            GradingResult.submission_id,
+            GradingResult.score,
+            GradingResult.total_questions,
+            GradingResult.correct_answers,
+            GradingResult.wrong_answers,
+            GradingResult.feedback_details,
+        ).where(GradingResult.submission_id == submission_id, GradingResult.created_at >= created_after)
+    )
+
+
+async def get_student_ids(db: AsyncSession, user_ids: Sequence[int]) -> Sequence[int]:
+    return (await db.scalars(student_ids_stmt(user_ids))).all()
+
+
+async def get_auth_state(db: AsyncSession, user_id: int) -> Optional[Row]:
+    return (await db.execute(auth_state_stmt(user_id))).first()
+
+
+async def get_user_profile(db: AsyncSession, user_id: int) -> Optional[Row]:
+    return (await db.execute(user_profile_stmt(user_id))).first()
+
+
+async def get_test_header(db: AsyncSession, test_id: int) -> Optional[Row]:
+    return (await db.execute(test_header_stmt(test_id))).first()
+
+
+async def count_question_pool(db: AsyncSession, subject: str, topic: str, level: str) -> int:
+    return (await db.execute(question_pool_count_stmt(subject, topic, level))).scalar() or 0
+
+
+async def get_question_pool_ids(db: AsyncSession, subject: str, topic: str, level: str) -> Sequence[int]:
+    return (await db.scalars(question_pool_ids_stmt(subject, topic, level))).all()
+
+
+async def sample_question_ids(
+    db: AsyncSession, subject: str, topic: str, level: str, count: int, pool_size: int
+) -> Sequence[int]:
+    """
+    count id câu hỏi ngẫu nhiên, không trùng, trong pool có pool_size câu.
+    Pool lớn trên Postgres dùng TABLESAMPLE, còn lại ORDER BY random() trên index.
+    """
+    if pool_size >= settings.QUESTION_TABLESAMPLE_MIN_POOL and db.bind.dialect.name == "postgresql":
+        percent = min(100.0, 100.0 * count * settings.QUESTION_TABLESAMPLE_OVERSAMPLE / pool_size)
+        ids = (await db.scalars(tablesample_question_ids_stmt(subject, topic, level, count, percent))).all()
+        if len(ids) == count:
+            return ids
+    return (await db.scalars(sample_question_ids_stmt(subject, topic, level, count))).all()
+
+
+async def claim_selection(db: AsyncSession, subject: str, topic: str, level: str, count: int) -> Optional[str]:
+    return (await db.execute(claim_selection_stmt(subject, topic, level, count, datetime.utcnow()))).scalar()
+
+
+async def get_test_questions(db: AsyncSession, test_id: int) -> Sequence[Row]:
+    return (await db.execute(test_questions_stmt(test_id))).all()
+
+
+async def get_questions(db: AsyncSession, question_ids: Sequence[int]) -> Sequence[Row]:
+    return (await db.execute(questions_by_ids_stmt(question_ids))).all()
+
+
+async def get_test_question_ids(db: AsyncSession, test_id: int) -> Sequence[int]:
+    return (await db.scalars(test_question_ids_stmt(test_id))).all()
+
+
+async def get_answer_key(db: AsyncSession, test_id: int) -> Sequence[Row]:
+    return (await db.execute(answer_key_stmt(test_id))).all()
+
+
+async def get_submission(db: AsyncSession, submission_id: int) -> Optional[Row]:
+    return (await db.execute(submission_stmt(submission_id))).first()
+
+
+async def submission_exists(db: AsyncSession, test_id: int) -> bool:
+    return bool((await db.execute(submission_exists_stmt(test_id))).scalar())
+
+
+async def get_result(db: AsyncSession, submission_id: int, created_after: datetime) -> Optional[Row]:
+    return (await db.execute(result_stmt(submission_id, created_after))).first()
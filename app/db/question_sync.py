@@ -0,0 +1,72 @@
+"""
+Chép ngân hàng câu hỏi từ database chính sang một shard (app/core/shards.py):
+upsert mọi câu theo lô id (câu mới và câu đã sửa) rồi xóa các câu không còn ở
+database chính. Đáp án khi chấm bài được đọc trên shard nên shard phải được sync
+sau mỗi lần seed/sửa/xóa câu hỏi: scripts/shards.py sync-questions, hoặc
+scripts/build_question_snapshot.py (tự sync các shard trước khi dựng snapshot).
+
+Câu đã xóa ở database chính nhưng còn được đề trên shard tham chiếu
+(test_question_association) được giữ lại và báo trong kết quả, để đề cũ vẫn
+xem và chấm được; ở database không shard, khóa ngoại cũng chặn xóa câu như vậy.
+"""
+
+from typing import Any, Dict, List, Set
+
+from sqlalchemy import delete, func, select, text
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.engine import Connection, Engine
+
+from app.models.question import Question, test_question_association
+
+SYNC_BATCH_SIZE = 1000
+
+
+def _chunks(ids: List[int], size: int) -> List[List[int]]:
+    return [ids[i:i + size] for i in range(0, len(ids), size)]
+
+
+def _upsert(source: Connection, target: Connection, batch_size: int) -> Set[int]:
+    columns = list(Question.__table__.columns)
+    # SQLite (dev/test) có cùng API ON CONFLICT với Postgres
+    dialect = postgresql if target.dialect.name == "postgresql" else sqlite
+    source_ids: Set[int] = set()
+    last_id = 0
+    while True:
+        rows = source.execute(
+            select(*columns).where(Question.id > last_id).order_by(Question.id).limit(batch_size)
+        ).mappings().all()
+        if not rows:
+            break
+        stmt = dialect.insert(Question.__table__).values([dict(r) for r in rows])
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["id"],
+            set_={c.name: stmt.excluded[c.name] for c in columns if c.name != "id"},
+        )
+        target.execute(stmt)
+        source_ids.update(r["id"] for r in rows)
+        last_id = rows[-1]["id"]
+    return source_ids
+
+
+def sync_questions(source_engine: Engine, shard_engine: Engine, batch_size: int = SYNC_BATCH_SIZE) -> Dict[str, Any]:
+    """Trả về số câu đã upsert/xóa và id các câu đã xóa ở nguồn nhưng còn được đề trên shard dùng."""
+    with source_engine.connect() as source, shard_engine.begin() as target:
+        source_ids = _upsert(source, target, batch_size)
+
+        stale = [i for i in target.execute(select(Question.id)).scalars() if i not in source_ids]
+        referenced: Set[int] = set()
+        for chunk in _chunks(stale, batch_size):
+            referenced.update(target.execute(
+                select(test_question_association.c.question_id)
+                .where(test_question_association.c.question_id.in_(chunk))
+                .distinct()
+            ).scalars())
+        deletable = [i for i in stale if i not in referenced]
+        for chunk in _chunks(deletable, batch_size):
+            target.execute(delete(Question).where(Question.id.in_(chunk)))
+
+        if target.dialect.name == "postgresql":
+            max_id = target.execute(select(func.max(Question.id))).scalar()
+            if max_id:
+                target.execute(text(f"SELECT setval('questions_id_seq', {max_id})"))
+    return {"upserted": len(source_ids), "deleted": len(deletable), "kept": sorted(referenced)}
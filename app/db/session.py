@@ -1,13 +1,3 @@
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
-from app.core.config import settings
-
-db_url = settings.DATABASE_URL
-if db_url.startswith("postgres://"):
-    db_url = db_url.replace("postgres://", "postgresql+psycopg://", 1)
-elif db_url.startswith("postgresql://"):
-    if "+psycopg" not in db_url:
-        db_url = db_url.replace("postgresql://", "postgresql+psycopg://", 1)
-
-engine = create_engine(db_url, pool_pre_ping=True)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
\ No newline at end of file
+# Engine và session factory dùng chung với app (xem app/core/database.py).
+# Giữ module này cho các script seed/check đang import từ đây.
+from app.core.database import engine, SessionLocal, create_db_engine, async_engine, AsyncSessionLocal  # noqa: F401
@@ -1,11 +1,23 @@
 import logging
 import sys
-from fastapi import FastAPI, Request
+from contextlib import asynccontextmanager
+from fastapi import Depends, FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
+from app.api import deps
 from app.api.v1.api import api_router
 from app.core.config import settings
+from app.core.database import async_engine
 from app.core.exceptions import EduNexiaException
+from app.core.hashing import password_hasher
+from app.core.metrics import metrics
+from app.core.query_stats import QueryStatsMiddleware
+from app.core.rate_limit import login_rate_limiter
+from app.core.replicas import ReadYourWritesMiddleware, replica_router
+from app.core.shards import shard_router
+from app.core.test_pool import test_pool
+from app.services.google_auth import google_oauth_client
+from app.services.provisioning_service import provisioning_service
 
 # Configure logging to stdout so it appears in Vercel logs
 logging.basicConfig(
@@ -15,9 +27,26 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    password_hasher.start()
+    await google_oauth_client.start()
+    await replica_router.start()
+    await test_pool.start()
+    yield
+    await provisioning_service.aclose()
+    await test_pool.aclose()
+    await google_oauth_client.aclose()
+    await replica_router.aclose()
+    await shard_router.aclose()
+    await login_rate_limiter.aclose()
+    password_hasher.shutdown()
+    await async_engine.dispose()
+
 app = FastAPI(
     title=settings.PROJECT_NAME,
-    openapi_url=f"{settings.API_V1_STR}/openapi.json"
+    openapi_url=f"{settings.API_V1_STR}/openapi.json",
+    lifespan=lifespan,
 )
 
 # CORS Configuration
@@ -35,12 +64,18 @@ app.add_middleware(
     expose_headers=["*"],
 )
 
+# Đếm câu lệnh SQL, thời gian DB và phát hiện N+1 cho từng request
+app.add_middleware(QueryStatsMiddleware)
+# Trả X-DB-Last-Write sau khi ghi để client đọc lại từ primary (app/core/replicas.py)
+app.add_middleware(ReadYourWritesMiddleware)
+
 # Global Exception Handler
 @app.exception_handler(EduNexiaException)
 async def edunexia_exception_handler(request: Request, exc: EduNexiaException):
     return JSONResponse(
         status_code=exc.status_code,
         content={"status": "error", "message": exc.detail},
+        headers=exc.headers,
     )
 
 # Routers
@@ -84,6 +119,10 @@ app.include_router(api_router, prefix=settings.API_V1_STR)
 def health_check():
     return {"status": "ok", "service": "EduNexia API", "version": "1.0.0"}
 
+@app.get("/metrics", dependencies=[Depends(deps.require_metrics_access)])
+def get_metrics():
+    return metrics.snapshot()
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run("app.main:app", host="0.0.0.0", port=8000, reload=True)
\ No newline at end of file
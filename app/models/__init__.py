@@ -7,6 +7,8 @@ from app.models.result import GradingResult
 from app.models.suggestion import LearningSuggestion
 from app.models.history import LearningHistory
 from app.models.session import Session
+from app.models.test_pool import PregeneratedSelection
+from app.models.provisioning import ProvisioningJob, ProvisioningRow
 
 __all__ = [
     "Base",
@@ -17,5 +19,8 @@ __all__ = [
     "GradingResult",
     "LearningSuggestion", 
     "LearningHistory",
-    "Session"
+    "Session",
+    "PregeneratedSelection",
+    "ProvisioningJob",
+    "ProvisioningRow"
 ]
\ No newline at end of file
@@ -1,4 +1,4 @@
-from sqlalchemy import String, Boolean
+from sqlalchemy import String, Boolean, Integer
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from app.models.base import Base
 
@@ -12,6 +12,8 @@ class User(Base):
     role: Mapped[str] = mapped_column(String, default="student") # student, admin, teacher
     is_active: Mapped[bool] = mapped_column(Boolean, default=True)
     is_locked: Mapped[bool] = mapped_column(Boolean, default=False)
+    # Tăng mỗi khi khóa/vô hiệu hóa/đổi role/đổi mật khẩu -> thu hồi mọi access token cũ
+    token_version: Mapped[int] = mapped_column(Integer, default=0, server_default="0", nullable=False)
 
     sessions: Mapped[list["Session"]] = relationship("Session", back_populates="user")
     practice_tests: Mapped[list["PracticeTest"]] = relationship("PracticeTest", back_populates="student")
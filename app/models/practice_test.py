@@ -1,21 +1,26 @@
-from sqlalchemy import String, Integer, ForeignKey
+from sqlalchemy import String, Integer, ForeignKey, Index
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from app.models.base import Base
 from app.models.question import test_question_association
 
 class PracticeTest(Base):
     __tablename__ = "practice_tests"
+    __table_args__ = (
+        # Job dọn đề bỏ dở (app/services/retention_service.py) quét theo thời gian tạo
+        Index("ix_practice_tests_created_at", "created_at"),
+    )
     
     title: Mapped[str] = mapped_column(String, nullable=False)
     subject: Mapped[str] = mapped_column(String, nullable=False)
-    student_id: Mapped[int] = mapped_column(ForeignKey("users.id"))
+    student_id: Mapped[int] = mapped_column(ForeignKey("users.id"), index=True)
     duration_minutes: Mapped[int] = mapped_column(Integer, default=45)
     status: Mapped[str] = mapped_column(String, default="ready") # ready, completed
 
     student: Mapped["User"] = relationship("User", back_populates="practice_tests")
+    # Chỉ đọc, xem Question.practice_tests
     questions: Mapped[list["Question"]] = relationship(
         "Question", 
-        secondary=test_question_association, 
-        back_populates="practice_tests"
+        secondary=test_question_association,
+        viewonly=True
     )
     submissions: Mapped[list["Submission"]] = relationship("Submission", back_populates="practice_test")
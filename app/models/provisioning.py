@@ -0,0 +1,44 @@
+from datetime import datetime
+from typing import Optional
+from sqlalchemy import String, Integer, DateTime, ForeignKey, Index, Text
+from sqlalchemy.orm import Mapped, mapped_column
+from app.models.base import Base
+
+class ProvisioningJob(Base):
+    """Một lần tạo tài khoản hàng loạt từ CSV (app/services/provisioning_service.py)."""
+    __tablename__ = "provisioning_jobs"
+
+    created_by: Mapped[Optional[int]] = mapped_column(ForeignKey("users.id", ondelete="SET NULL"), nullable=True)
+    filename: Mapped[Optional[str]] = mapped_column(String, nullable=True)
+    # pending -> running -> done; failed khi lô lỗi (chạy tiếp được bằng resume)
+    status: Mapped[str] = mapped_column(String, nullable=False, default="pending")
+    total_rows: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    processed_rows: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    created_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    conflict_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    invalid_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    # Runner cập nhật sau mỗi lô; job "running" có heartbeat quá cũ được coi là đã dừng
+    heartbeat_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
+    finished_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
+    error: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+
+class ProvisioningRow(Base):
+    """Kết quả từng dòng CSV của job; dòng pending là dòng runner còn phải xử lý."""
+    __tablename__ = "provisioning_rows"
+    __table_args__ = (
+        Index("ix_provisioning_rows_job_status_row", "job_id", "status", "row"),
+    )
+
+    job_id: Mapped[int] = mapped_column(ForeignKey("provisioning_jobs.id", ondelete="CASCADE"), nullable=False)
+    row: Mapped[int] = mapped_column(Integer, nullable=False)
+    username: Mapped[str] = mapped_column(String, nullable=False, default="")
+    email: Mapped[str] = mapped_column(String, nullable=False, default="")
+    full_name: Mapped[str] = mapped_column(String, nullable=False, default="")
+    # pending | created | conflict | invalid
+    status: Mapped[str] = mapped_column(String, nullable=False)
+    user_id: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
+    message: Mapped[str] = mapped_column(String, nullable=False, default="")
+    # Mật khẩu admin ghi trong CSV, chỉ giữ đến khi dòng được hash và tạo tài khoản
+    password: Mapped[Optional[str]] = mapped_column(String, nullable=True)
+    # Mật khẩu tạm sinh cho dòng không có password, trả lại trong CSV kết quả
+    temporary_password: Mapped[Optional[str]] = mapped_column(String, nullable=True)
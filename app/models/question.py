@@ -1,4 +1,4 @@
-from sqlalchemy import String, Text, Integer, Table, ForeignKey, Column
+from sqlalchemy import String, Text, Integer, Table, ForeignKey, Column, Index
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from app.models.base import Base
 
@@ -12,6 +12,10 @@ test_question_association = Table(
 
 class Question(Base):
     __tablename__ = "questions"
+    __table_args__ = (
+        # Tạo đề lọc đồng thời theo môn, chủ đề và mức độ
+        Index("ix_questions_subject_topic_level", "subject", "topic", "level", postgresql_include=["id"]),
+    )
     
     subject: Mapped[str] = mapped_column(String, index=True, nullable=False)
     topic: Mapped[str] = mapped_column(String, index=True, nullable=False)
@@ -21,8 +25,11 @@ class Question(Base):
     correct_answer: Mapped[str] = mapped_column(String, nullable=False)
     explanation: Mapped[str | None] = mapped_column(Text)
 
+    # Chỉ đọc: flush của quan hệ many-to-many lấy connection theo mapper Question
+    # (database chính), còn liên kết đề-câu hỏi phải nằm trên shard của đề
+    # (app/core/shards.py) nên được insert tường minh trong test_service
     practice_tests: Mapped[list["PracticeTest"]] = relationship(
         "PracticeTest", 
         secondary=test_question_association, 
-        back_populates="questions"
+        viewonly=True
     )
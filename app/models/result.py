@@ -1,16 +1,22 @@
-from sqlalchemy import Float, Integer, ForeignKey, Text
+from sqlalchemy import Float, Integer, Text
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from app.models.base import Base
 
 class GradingResult(Base):
+    # Trên Postgres bảng được partition theo tháng của created_at (khóa chính là (id, created_at)),
+    # nên submission_id không có khóa ngoại ở DB; quan hệ khai báo primaryjoin tường minh
     __tablename__ = "grading_results"
     
-    submission_id: Mapped[int] = mapped_column(ForeignKey("submissions.id"))
+    submission_id: Mapped[int] = mapped_column(Integer, index=True)
     score: Mapped[float] = mapped_column(Float, nullable=False)
     total_questions: Mapped[int] = mapped_column(Integer, nullable=False)
     correct_answers: Mapped[int] = mapped_column(Integer, nullable=False)
     wrong_answers: Mapped[int] = mapped_column(Integer, nullable=False)
     feedback_details: Mapped[str | None] = mapped_column(Text) # JSON string
 
-    submission: Mapped["Submission"] = relationship("Submission", back_populates="result")
-    suggestions: Mapped[list["LearningSuggestion"]] = relationship("LearningSuggestion", back_populates="result")
+    submission: Mapped["Submission"] = relationship(
+        "Submission", primaryjoin="foreign(GradingResult.submission_id) == Submission.id", back_populates="result"
+    )
+    suggestions: Mapped[list["LearningSuggestion"]] = relationship(
+        "LearningSuggestion", primaryjoin="GradingResult.id == foreign(LearningSuggestion.result_id)", back_populates="result"
+    )
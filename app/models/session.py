@@ -6,8 +6,9 @@ from app.models.base import Base
 class Session(Base):
     __tablename__ = "sessions"
     
+    # token lưu SHA-256 của refresh token, không bao giờ lưu token gốc
     token: Mapped[str] = mapped_column(String, unique=True, index=True, nullable=False)
     user_id: Mapped[int] = mapped_column(ForeignKey("users.id"))
-    expires_at: Mapped[datetime] = mapped_column(DateTime, nullable=False)
+    expires_at: Mapped[datetime] = mapped_column(DateTime, index=True, nullable=False)
 
     user: Mapped["User"] = relationship("User", back_populates="sessions")
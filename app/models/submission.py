@@ -1,10 +1,18 @@
 from datetime import datetime
-from sqlalchemy import String, ForeignKey, Text, DateTime
+from sqlalchemy import String, ForeignKey, Text, DateTime, Index
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from app.models.base import Base
 
 class Submission(Base):
+    # Trên Postgres bảng được partition theo tháng của created_at (migration f7a3c8e21d56).
+    # Truy vấn nên kèm điều kiện created_at khi biết để planner bỏ qua partition không liên quan
     __tablename__ = "submissions"
+    __table_args__ = (
+        # Lịch sử học tập: lọc theo học sinh, sắp theo thời gian nộp
+        Index("ix_submissions_student_id_submitted_at", "student_id", "submitted_at"),
+        # Kiểm tra đã nộp chưa: chỉ cần id nên quét index-only
+        Index("ix_submissions_test_id", "test_id", postgresql_include=["id"]),
+    )
     
     student_id: Mapped[int] = mapped_column(ForeignKey("users.id"))
     test_id: Mapped[int] = mapped_column(ForeignKey("practice_tests.id"))
@@ -16,4 +24,7 @@ class Submission(Base):
 
     student: Mapped["User"] = relationship("User", back_populates="submissions")
     practice_test: Mapped["PracticeTest"] = relationship("PracticeTest", back_populates="submissions")
-    result: Mapped["GradingResult"] = relationship("GradingResult", back_populates="submission", uselist=False)
+    result: Mapped["GradingResult"] = relationship(
+        "GradingResult", primaryjoin="Submission.id == foreign(GradingResult.submission_id)",
+        back_populates="submission", uselist=False
+    )
@@ -0,0 +1,27 @@
+from datetime import datetime
+from typing import Optional
+from sqlalchemy import String, Integer, DateTime, Index, text
+from sqlalchemy.orm import Mapped, mapped_column
+from app.models.base import Base
+
+class PregeneratedSelection(Base):
+    """Một bộ câu hỏi ngẫu nhiên dựng sẵn, chưa giao cho học sinh nào (app/core/test_pool.py)."""
+    __tablename__ = "pregenerated_selections"
+    __table_args__ = (
+        # Claim lấy dòng chưa giao cũ nhất theo tiêu chí; index chỉ chứa dòng chưa giao
+        Index(
+            "ix_pregenerated_selections_ready",
+            "subject", "topic", "level", "question_count", "id",
+            postgresql_where=text("claimed_at IS NULL"),
+            sqlite_where=text("claimed_at IS NULL"),
+        ),
+    )
+
+    subject: Mapped[str] = mapped_column(String, nullable=False)
+    topic: Mapped[str] = mapped_column(String, nullable=False)
+    level: Mapped[str] = mapped_column(String, nullable=False)
+    question_count: Mapped[int] = mapped_column(Integer, nullable=False)
+    # Id câu hỏi cách nhau bởi dấu phẩy
+    question_ids: Mapped[str] = mapped_column(String, nullable=False)
+    # Thời điểm được giao; dòng đã giao bị filler xóa ở lượt bù kế tiếp
+    claimed_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
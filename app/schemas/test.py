@@ -7,6 +7,18 @@ class TestGenerateRequest(BaseModel):
     topic: str
     level: str
     question_count: Optional[int] = 1
+    # True: trả luôn TestContent của đề vừa tạo, không cần gọi GET /{testId}/content
+    include_content: Optional[bool] = False
+
+class TestBatchGenerateRequest(BaseModel):
+    student_ids: List[int]
+    subject: str
+    topic: str
+    level: str
+    question_count: Optional[int] = 1
+    # Mỗi câu hỏi xuất hiện trong tối đa ngần này đề của lô (1 = các đề không trùng câu nào);
+    # để trống = không giới hạn
+    max_question_uses: Optional[int] = None
 
 class TestSummary(BaseModel):
     id: int
@@ -1,32 +1,53 @@
 import secrets
 import logging
 import re
-from sqlalchemy.orm import Session
+from fastapi import BackgroundTasks
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.exc import IntegrityError
+from sqlalchemy.dialects.postgresql import insert
 from app.models.account import User
-from app.core.security import verify_password, create_access_token, get_password_hash
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.core.metrics import metrics
+from app.core.security import create_access_token, password_needs_update
+from app.core.hashing import password_hasher
 from app.core.exceptions import AuthException, BusinessLogicException
 from app.schemas.auth import UserCreate
+from app.services.session_service import session_service
 
 logger = logging.getLogger(__name__)
 
+USERNAME_CONSTRAINT = "ix_users_username"
+EMAIL_CONSTRAINT = "ix_users_email"
+GOOGLE_USERNAME_ATTEMPTS = 5
+
+def _violated_constraint(error: IntegrityError) -> str | None:
+    """Lấy tên unique index/constraint bị vi phạm từ lỗi của psycopg."""
+    diag = getattr(error.orig, "diag", None)
+    name = getattr(diag, "constraint_name", None)
+    if name:
+        return name
+    message = str(error.orig)
+    for constraint, column in ((USERNAME_CONSTRAINT, "username"), (EMAIL_CONSTRAINT, "email")):
+        if constraint in message or f"users.{column}" in message:
+            return constraint
+    return None
+
 class AuthService:
     @staticmethod
-    def authenticate_student(db: Session, username: str, password: str):
-        user = db.query(User).filter(User.username == username).first()
-        if not user:
-            raise AuthException("Tài khoản không tồn tại")
-        
-        if not verify_password(password, user.hashed_password):
-            raise AuthException("Thông tin đăng nhập không đúng")
-        
-        if not user.is_active:
-            raise AuthException("Tài khoản bị khóa")
-        
-        token = create_access_token(subject=user.id)
+    async def issue_tokens(db: AsyncSession, user: User) -> dict:
+        """Cấp access token ngắn hạn + refresh token mới (lưu vào sessions) và commit."""
+        refresh_token = session_service.create_session(db, user.id)
+        await db.commit()
+        await db.refresh(user)
+
+        token = create_access_token(subject=user.id, role=user.role, token_version=user.token_version)
         return {
             "access_token": token,
             "token_type": "bearer",
+            "refresh_token": refresh_token,
+            "expires_in": settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60,
             "user": {
                 "id": user.id,
                 "username": user.username,
@@ -38,50 +59,115 @@ class AuthService:
         }
 
     @staticmethod
-    def register_student(db: Session, user_in: UserCreate):
-        if db.query(User).filter(User.username == user_in.username).first():
-            raise BusinessLogicException("Tên đăng nhập đã tồn tại")
-        if db.query(User).filter(User.email == user_in.email).first():
-            raise BusinessLogicException("Email đã được sử dụng")
-
-        user = User(
-            username=user_in.username,
-            email=user_in.email,
-            full_name=user_in.full_name,
-            hashed_password=get_password_hash(user_in.password),
-            role="student",
-            is_active=True
-        )
-        db.add(user)
-        db.commit()
-        db.refresh(user)
-        
-        token = create_access_token(subject=user.id)
+    async def refresh_tokens(db: AsyncSession, refresh_token: str) -> dict:
+        """Xoay vòng refresh token, không chạy lại bcrypt."""
+        user, new_refresh_token = await session_service.rotate(db, refresh_token)
+        token = create_access_token(subject=user.id, role=user.role, token_version=user.token_version)
         return {
             "access_token": token,
             "token_type": "bearer",
-            "user": {
-                "id": user.id,
-                "username": user.username,
-                "email": user.email,
-                "full_name": user.full_name,
-                "role": user.role,
-                "is_active": user.is_active
-            }
+            "refresh_token": new_refresh_token,
+            "expires_in": settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60
         }
 
     @staticmethod
-    def get_or_create_google_user(db: Session, email: str, full_name: str, google_id: str) -> User:
+    async def authenticate_student(db: AsyncSession, username: str, password: str, background_tasks: BackgroundTasks = None):
+        user = (await db.scalars(select(User).where(User.username == username))).first()
+        if not user:
+            raise AuthException("Tài khoản không tồn tại")
+        
+        if not await password_hasher.verify(password, user.hashed_password):
+            raise AuthException("Thông tin đăng nhập không đúng")
+        
+        if not user.is_active:
+            raise AuthException("Tài khoản bị khóa")
+
+        # Hash theo tham số cũ: hash lại sau khi đã trả response
+        if background_tasks is not None and password_needs_update(user.hashed_password):
+            background_tasks.add_task(AuthService.rehash_password, user.id, password, user.hashed_password)
+        
+        return await AuthService.issue_tokens(db, user)
+
+    @staticmethod
+    async def rehash_password(user_id: int, password: str, old_hash: str) -> None:
+        """
+        Nâng cấp hash lên tham số hiện tại. Chỉ ghi nếu hash chưa bị thay đổi
+        trong lúc chờ (vd. user vừa đổi mật khẩu); không thu hồi token.
+        """
+        try:
+            new_hash = await password_hasher.hash(password)
+        except Exception as e:
+            logger.warning(f"Skipping password rehash for user {user_id}: {e}")
+            return
+        async with AsyncSessionLocal() as db:
+            await db.execute(
+                update(User)
+                .where(User.id == user_id, User.hashed_password == old_hash)
+                .values(hashed_password=new_hash)
+            )
+            await db.commit()
+            metrics.inc("password_rehash_total")
+
+    @staticmethod
+    async def register_student(db: AsyncSession, user_in: UserCreate):
+        hashed_password = await password_hasher.hash(user_in.password)
+        # Một câu INSERT ... RETURNING; trùng lặp được nhận diện qua tên unique index
+        try:
+            user = (await db.scalars(
+                insert(User)
+                .values(
+                    username=user_in.username,
+                    email=user_in.email,
+                    full_name=user_in.full_name,
+                    hashed_password=hashed_password,
+                    role="student",
+                    is_active=True
+                )
+                .returning(User)
+            )).one()
+        except IntegrityError as e:
+            await db.rollback()
+            constraint = _violated_constraint(e)
+            if constraint == USERNAME_CONSTRAINT:
+                raise BusinessLogicException("Tên đăng nhập đã tồn tại")
+            if constraint == EMAIL_CONSTRAINT:
+                raise BusinessLogicException("Email đã được sử dụng")
+            raise
+        return await AuthService.issue_tokens(db, user)
+
+    @staticmethod
+    async def change_password(db: AsyncSession, user_id: int, current_password: str, new_password: str) -> dict:
+        """
+        Đổi mật khẩu sau khi kiểm tra mật khẩu hiện tại: tăng token_version (thu hồi
+        mọi access token) và xóa mọi refresh token, rồi cấp phiên mới cho client đang đổi.
+        """
+        user = await db.get(User, user_id)
+        if user is None or not user.is_active:
+            raise AuthException("Tài khoản không tồn tại")
+        if not await password_hasher.verify(current_password, user.hashed_password):
+            raise AuthException("Mật khẩu hiện tại không đúng")
+        if not new_password:
+            raise BusinessLogicException("Mật khẩu mới không được để trống")
+
+        user.hashed_password = await password_hasher.hash(new_password)
+        user.token_version = (user.token_version or 0) + 1
+        await session_service.revoke_all(db, user.id)
+        return await AuthService.issue_tokens(db, user)
+
+    @staticmethod
+    async def get_or_create_google_user(db: AsyncSession, email: str, full_name: str, google_id: str) -> User:
         """
         Tìm hoặc tạo user từ Google. Chuẩn hóa email lowercase.
-        Xử lý IntegrityError triệt để nếu có tranh chấp tạo user đồng thời.
+        User đã có: một câu SELECT theo email. User mới: một câu
+        INSERT ... ON CONFLICT (email) DO UPDATE ... RETURNING, nên đăng nhập
+        đồng thời lần đầu cùng email đều nhận về cùng một dòng.
         """
         email = (email or "").strip().lower()
         if not email:
             raise AuthException("Email không hợp lệ từ Google")
 
-        # 1. Tìm theo email trước
-        user = db.query(User).filter(User.email == email).first()
+        # 1. Tìm theo email trước (tránh bcrypt cho user đã tồn tại)
+        user = (await db.scalars(select(User).where(User.email == email))).first()
         if user:
             return user
 
@@ -91,35 +177,36 @@ class AuthService:
         if not username:
             username = f"u_{secrets.token_hex(4)}"
 
-        # Kiểm tra trùng username, nếu trùng thì thêm hậu tố ngẫu nhiên
-        original_username = username
-        while db.query(User).filter(User.username == username).first():
-            username = f"{original_username}_{secrets.token_hex(2)}"
+        # Dùng secrets.token_hex(16) tạo mật khẩu ngẫu nhiên 32 ký tự.
+        # Rất an toàn và nằm gọn trong giới hạn 72 ký tự của bcrypt.
+        random_password = secrets.token_hex(16)
+        hashed_password = await password_hasher.hash(random_password)
 
-        try:
-            # Dùng secrets.token_hex(16) tạo mật khẩu ngẫu nhiên 32 ký tự.
-            # Rất an toàn và nằm gọn trong giới hạn 72 ký tự của bcrypt.
-            random_password = secrets.token_hex(16)
-            
-            user = User(
-                username=username,
+        # Trùng username thì thử lại với hậu tố ngẫu nhiên, không dò trước bằng SELECT
+        candidate = username
+        for _ in range(GOOGLE_USERNAME_ATTEMPTS):
+            stmt = insert(User).values(
+                username=candidate,
                 email=email,
                 full_name=full_name or base_username,
-                hashed_password=get_password_hash(random_password),
+                hashed_password=hashed_password,
                 role="student",
                 is_active=True
             )
-            db.add(user)
-            db.commit()
-            db.refresh(user)
-            logger.info(f"Successfully created Google user: {email}")
-            return user
-        except IntegrityError:
-            db.rollback()
-            # Thử tìm lại lần cuối đề phòng race condition
-            user = db.query(User).filter(User.email == email).first()
-            if user:
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[User.email],
+                set_={"email": stmt.excluded.email}
+            ).returning(User)
+            try:
+                user = (await db.scalars(stmt)).one()
+                await db.commit()
+                logger.info(f"Successfully synced Google user: {email}")
                 return user
-            raise AuthException("Không thể đồng bộ tài khoản Google")
+            except IntegrityError as e:
+                await db.rollback()
+                if _violated_constraint(e) != USERNAME_CONSTRAINT:
+                    raise AuthException("Không thể đồng bộ tài khoản Google")
+                candidate = f"{username}_{secrets.token_hex(2)}"
+        raise AuthException("Không thể đồng bộ tài khoản Google")
 
 auth_service = AuthService()
\ No newline at end of file
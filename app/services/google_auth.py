@@ -1,113 +1,157 @@
-import httpx
-import secrets
+import asyncio
 import logging
-from sqlalchemy.orm import Session
+import re
+import time
+from typing import Any, Dict, Optional
+
+import httpx
+from jose import jwt, JWTError
 from app.core.config import settings
-from app.core.security import create_access_token, get_password_hash
-from app.models.account import User
 from app.core.exceptions import AuthException
+from app.core.metrics import metrics
 
 logger = logging.getLogger(__name__)
 
-class GoogleAuthService:
-    @staticmethod
-    def get_google_auth_url() -> str:
-        """Tạo URL để người dùng đăng nhập qua Google OAuth 2.0."""
-        base_url = "https://accounts.google.com/o/oauth2/v2/auth"
-        params = {
-            "client_id": settings.GOOGLE_CLIENT_ID,
-            "redirect_uri": settings.GOOGLE_REDIRECT_URI,
-            "response_type": "code",
-            "scope": "openid email profile",
-            "access_type": "offline",
-            "prompt": "select_account"
-        }
-        query_params = "&".join([f"{k}={v}" for k, v in params.items()])
-        return f"{base_url}?{query_params}"
-
-    @staticmethod
-    async def verify_and_login(db: Session, code: str) -> str:
-        """
-        Trao đổi authorization code lấy access_token, 
-        xác thực profile và trả về hệ thống JWT token.
-        """
-        async with httpx.AsyncClient(timeout=10.0) as client:
+# Khoảng thời gian tối thiểu giữa hai lần ép tải lại JWKS khi gặp kid lạ
+JWKS_FORCED_REFRESH_INTERVAL = 60.0
+# Làm mới JWKS trước khi hết hạn một khoảng này
+JWKS_REFRESH_MARGIN = 300.0
+
+
+class GoogleOAuthClient:
+    """
+    HTTP client dùng chung (keep-alive) cho suốt vòng đời ứng dụng để nói chuyện với Google.
+    id_token được xác thực cục bộ bằng JWKS đã cache nên không cần gọi UserInfo API.
+    """
+
+    def __init__(self, transport: Optional[httpx.AsyncBaseTransport] = None):
+        self._transport = transport
+        self._client: Optional[httpx.AsyncClient] = None
+        self._keys: Dict[str, Dict[str, Any]] = {}
+        self._keys_expires_at = 0.0
+        self._last_forced_refresh = 0.0
+        self._refresh_lock: Optional[asyncio.Lock] = None
+        self._refresh_task: Optional[asyncio.Task] = None
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        # Tạo lười: trên Vercel lifespan có thể không chạy
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                timeout=settings.GOOGLE_HTTP_TIMEOUT_SECONDS,
+                limits=httpx.Limits(
+                    max_connections=settings.GOOGLE_HTTP_MAX_CONNECTIONS,
+                    max_keepalive_connections=settings.GOOGLE_HTTP_MAX_CONNECTIONS,
+                ),
+                transport=self._transport,
+            )
+        return self._client
+
+    async def start(self) -> None:
+        self.client
+        if settings.GOOGLE_CLIENT_ID and self._refresh_task is None:
+            self._refresh_task = asyncio.create_task(self._refresh_loop())
+
+    async def aclose(self) -> None:
+        if self._refresh_task is not None:
+            self._refresh_task.cancel()
+            self._refresh_task = None
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def exchange_code(self, code: str, redirect_uri: str) -> httpx.Response:
+        return await self.client.post(
+            settings.GOOGLE_TOKEN_URL,
+            data={
+                "code": code,
+                "client_id": settings.GOOGLE_CLIENT_ID,
+                "client_secret": settings.GOOGLE_CLIENT_SECRET,
+                "redirect_uri": redirect_uri,
+                "grant_type": "authorization_code",
+            },
+            headers={"Content-Type": "application/x-www-form-urlencoded"},
+        )
+
+    async def fetch_userinfo(self, access_token: str) -> httpx.Response:
+        """Chỉ dùng khi Google không trả id_token."""
+        return await self.client.get(
+            settings.GOOGLE_USERINFO_URL,
+            headers={"Authorization": f"Bearer {access_token}"},
+        )
+
+    async def verify_id_token(self, id_token: str, access_token: Optional[str] = None) -> Dict[str, Any]:
+        try:
+            kid = jwt.get_unverified_header(id_token).get("kid")
+        except JWTError:
+            raise AuthException("id_token không hợp lệ")
+
+        keys = await self._get_keys()
+        key = keys.get(kid)
+        if key is None and time.monotonic() - self._last_forced_refresh > JWKS_FORCED_REFRESH_INTERVAL:
+            # Google vừa xoay khóa: tải lại JWKS một lần
+            self._last_forced_refresh = time.monotonic()
+            keys = await self._refresh_keys(force=True)
+            key = keys.get(kid)
+        if key is None:
+            raise AuthException("Không tìm thấy khóa ký id_token")
+
+        try:
+            claims = jwt.decode(
+                id_token,
+                key,
+                algorithms=[key.get("alg", "RS256")],
+                audience=settings.GOOGLE_CLIENT_ID,
+                access_token=access_token,
+            )
+        except JWTError as e:
+            logger.error(f"Google id_token verification failed: {e}")
+            raise AuthException("id_token không hợp lệ")
+        if claims.get("iss") not in settings.GOOGLE_ISSUERS:
+            raise AuthException("id_token không hợp lệ")
+        metrics.inc("google_id_token_verified_total")
+        return claims
+
+    async def _get_keys(self) -> Dict[str, Dict[str, Any]]:
+        if self._keys and time.monotonic() < self._keys_expires_at:
+            return self._keys
+        return await self._refresh_keys()
+
+    async def _refresh_keys(self, force: bool = False) -> Dict[str, Dict[str, Any]]:
+        if self._refresh_lock is None:
+            self._refresh_lock = asyncio.Lock()
+        async with self._refresh_lock:
+            # Request khác đã tải xong trong lúc chờ lock
+            if not force and self._keys and time.monotonic() < self._keys_expires_at - JWKS_REFRESH_MARGIN:
+                return self._keys
+            response = await self.client.get(settings.GOOGLE_JWKS_URL)
+            response.raise_for_status()
+            self._keys = {k["kid"]: k for k in response.json().get("keys", []) if "kid" in k}
+            max_age = re.search(r"max-age=(\d+)", response.headers.get("cache-control", ""))
+            ttl = int(max_age.group(1)) if max_age else 3600
+            self._keys_expires_at = time.monotonic() + ttl
+            metrics.inc("google_jwks_refresh_total")
+            return self._keys
+
+    async def _refresh_loop(self) -> None:
+        """Làm mới JWKS ở nền để request đăng nhập không phải chờ tải khóa."""
+        while True:
             try:
-                # 1. Trao đổi Authorization Code lấy Tokens
-                token_url = "https://oauth2.googleapis.com/token"
-                data = {
-                    "code": code,
-                    "client_id": settings.GOOGLE_CLIENT_ID,
-                    "client_secret": settings.GOOGLE_CLIENT_SECRET,
-                    "redirect_uri": settings.GOOGLE_REDIRECT_URI,
-                    "grant_type": "authorization_code",
-                }
-                
-                token_response = await client.post(token_url, data=data)
-                token_data = token_response.json()
-                
-                if token_response.status_code != 200:
-                    logger.error(f"Google Token Exchange Error: {token_data}")
-                    raise AuthException(f"Google Auth Error: {token_data.get('error_description', 'Invalid Code')}")
-
-                access_token = token_data.get("access_token")
-
-                # 2. Lấy thông tin người dùng từ Google UserInfo API
-                user_info_url = "https://www.googleapis.com/oauth2/v3/userinfo"
-                user_info_response = await client.get(
-                    user_info_url, 
-                    headers={"Authorization": f"Bearer {access_token}"}
-                )
-                google_user = user_info_response.json()
-
-                if user_info_response.status_code != 200:
-                    logger.error(f"Google UserInfo Error: {google_user}")
-                    raise AuthException("Không thể lấy dữ liệu profile từ Google")
-
-                email = google_user.get("email")
-                full_name = google_user.get("name") or google_user.get("given_name") or email.split('@')[0]
-
-                if not email:
-                    raise AuthException("Email không được cung cấp từ Google account")
-
-                # 3. Xử lý đồng bộ User trong hệ thống
-                user = db.query(User).filter(User.email == email).first()
-                
-                if not user:
-                    # Tự động tạo tài khoản mới nếu email chưa tồn tại
-                    username = f"{email.split('@')[0]}_{secrets.token_hex(2)}"
-                    
-                    user = User(
-                        username=username,
-                        email=email,
-                        full_name=full_name,
-                        hashed_password=get_password_hash(secrets.token_urlsafe(32)),
-                        role="student",
-                        is_active=True
-                    )
-                    try:
-                        db.add(user)
-                        db.commit()
-                        db.refresh(user)
-                        logger.info(f"Created new user via Google: {email}")
-                    except Exception as db_err:
-                        db.rollback()
-                        logger.error(f"Database error during Google user creation: {db_err}")
-                        raise AuthException("Lỗi hệ thống khi tạo tài khoản")
-
-                if not user.is_active:
-                    raise AuthException("Tài khoản của bạn hiện đang bị khóa")
-
-                # 4. Trả về JWT token của hệ thống EduNexia
-                return create_access_token(subject=user.id)
-
-            except httpx.RequestError as exc:
-                logger.error(f"HTTP Request error while talking to Google: {exc}")
-                raise AuthException("Lỗi kết nối tới máy chủ Google")
+                await self._refresh_keys(force=True)
+                delay = max(self._keys_expires_at - time.monotonic() - JWKS_REFRESH_MARGIN, 60.0)
+            except asyncio.CancelledError:
+                raise
             except Exception as e:
-                logger.error(f"Unexpected error in verify_and_login: {e}")
-                if 'db' in locals():
-                    db.rollback()
-                raise e
+                logger.warning(f"Background JWKS refresh failed: {e}")
+                delay = 60.0
+            await asyncio.sleep(delay)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "jwks_keys": len(self._keys),
+            "jwks_ttl_seconds": max(0, round(self._keys_expires_at - time.monotonic())),
+        }
+
 
-google_auth_service = GoogleAuthService()
\ No newline at end of file
+google_oauth_client = GoogleOAuthClient()
+metrics.register("google_oauth", google_oauth_client.stats)
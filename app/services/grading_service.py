@@ -1,15 +1,17 @@
 
 import json
-from sqlalchemy.orm import Session
+from sqlalchemy import update
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.models.submission import Submission
 from app.models.result import GradingResult
-from app.models.practice_test import PracticeTest
 from app.core.exceptions import NotFoundException, BusinessLogicException
+from app.core.question_bank import load_answer_key
+from app.db import queries
 
 class GradingService:
     @staticmethod
-    def grade_submission(db: Session, submission_id: int):
-        submission = db.query(Submission).filter(Submission.id == submission_id).first()
+    async def grade_submission(db: AsyncSession, submission_id: int):
+        submission = await queries.get_submission(db, submission_id)
         if not submission:
             raise NotFoundException("Bài làm")
         
@@ -18,13 +20,13 @@ class GradingService:
             pass
 
         # Lấy đáp án chuẩn từ đề
-        test = submission.practice_test
+        questions = await load_answer_key(db, submission.test_id)
         student_answers = json.loads(submission.answers) if submission.answers else {}
         
         correct_count = 0
         feedback = []
         
-        for q in test.questions:
+        for q in questions:
             ans = student_answers.get(str(q.id))
             is_correct = ans == q.correct_answer
             if is_correct:
@@ -37,7 +39,7 @@ class GradingService:
                 "explanation": q.explanation
             })
             
-        total = len(test.questions)
+        total = len(questions)
         score = (correct_count / total) * 10 if total > 0 else 0
         
         result = GradingResult(
@@ -49,14 +51,14 @@ class GradingService:
             feedback_details=json.dumps(feedback)
         )
         
-        submission.status = "graded"
+        await db.execute(update(Submission).where(Submission.id == submission_id).values(status="graded"))
         db.add(result)
-        db.commit()
+        await db.commit()
         return result
 
     @staticmethod
-    def get_result(db: Session, submission_id: int, student_id: int):
-        submission = db.query(Submission).filter(Submission.id == submission_id).first()
+    async def get_result(db: AsyncSession, submission_id: int, student_id: int):
+        submission = await queries.get_submission(db, submission_id)
         if not submission:
             raise NotFoundException("Bài làm")
         if submission.student_id != student_id:
@@ -64,7 +66,7 @@ class GradingService:
         if submission.status != "graded":
             raise BusinessLogicException("Bài chưa được chấm")
         
-        result = submission.result
+        result = await queries.get_result(db, submission_id, submission.created_at)
         if not result:
             raise BusinessLogicException("Không tìm thấy kết quả")
         
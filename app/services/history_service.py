@@ -1,26 +1,43 @@
 
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.models.practice_test import PracticeTest
 from app.models.submission import Submission
 from app.models.result import GradingResult
 
 class HistoryService:
     @staticmethod
-    def get_history(db: Session, student_id: int):
-        submissions = db.query(Submission).filter(Submission.student_id == student_id).all()
+    async def get_history(db: AsyncSession, student_id: int):
+        submissions = (await db.execute(
+            select(Submission.id, Submission.submitted_at, Submission.created_at, PracticeTest.title)
+            .join(PracticeTest, PracticeTest.id == Submission.test_id)
+            .where(Submission.student_id == student_id)
+            .order_by(Submission.id)
+        )).all()
+        
+        scores = {}
+        if submissions:
+            # Kết quả được tạo sau bài nộp: cận dưới created_at giúp bỏ qua các partition cũ hơn
+            scores = dict((await db.execute(
+                select(GradingResult.submission_id, GradingResult.score).where(
+                    GradingResult.submission_id.in_([sub.id for sub in submissions]),
+                    GradingResult.created_at >= min(sub.created_at for sub in submissions),
+                )
+            )).all())
         
         results = []
         total_score = 0
         count = 0
         
         for sub in submissions:
-            if sub.result:
+            if sub.id in scores:
                 results.append({
                     "id": sub.id,
-                    "test_title": sub.practice_test.title,
-                    "score": sub.result.score,
+                    "test_title": sub.title,
+                    "score": scores[sub.id],
                     "submitted_at": sub.submitted_at
                 })
-                total_score += sub.result.score
+                total_score += scores[sub.id]
                 count += 1
         
         avg = total_score / count if count > 0 else 0
@@ -0,0 +1,373 @@
+import asyncio
+import contextvars
+import csv
+import io
+import logging
+import re
+import secrets
+from datetime import datetime, timedelta
+from itertools import islice
+from typing import IO, Any, Dict, Iterator, List, Optional
+from pydantic import ValidationError
+from sqlalchemy import and_, delete, insert, or_, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.core.exceptions import BusinessLogicException, NotFoundException
+from app.core.hashing import password_hasher
+from app.models.account import User
+from app.models.provisioning import ProvisioningJob, ProvisioningRow
+from app.schemas.auth import UserCreate
+
+logger = logging.getLogger(__name__)
+
+REQUIRED_COLUMNS = {"username", "email", "full_name"}
+RESULT_COLUMNS = ["row", "username", "email", "status", "user_id", "message", "temporary_password"]
+USERNAME_PATTERN = re.compile(r"^[A-Za-z0-9_.-]{1,64}$")
+
+# Job đang chạy nền trong worker này; giữ tham chiếu để task không bị thu gom
+_running: Dict[int, asyncio.Task] = {}
+
+class ProvisioningService:
+    """
+    Tạo tài khoản học sinh hàng loạt dưới dạng job lưu trong database:
+    request chỉ kiểm tra CSV và lưu từng dòng (create_job), việc hash mật khẩu
+    và INSERT chạy nền (start_job/run_job) theo lô PROVISION_BATCH_SIZE dòng,
+    mỗi lô commit tài khoản cùng kết quả của dòng. Runner dừng giữa chừng
+    (deploy, crash) thì chạy tiếp từ các dòng còn pending; mật khẩu tạm
+    không bị mất vì kết quả được đọc lại từ provisioning_rows.
+    """
+
+    @staticmethod
+    def read_rows(file: IO[bytes]) -> Iterator[Dict[str, str]]:
+        """Đọc CSV theo luồng (không nạp cả file vào bộ nhớ). Cột password là tùy chọn."""
+        reader = csv.DictReader(io.TextIOWrapper(file, encoding="utf-8-sig", newline=""))
+        columns = {(c or "").strip().lower() for c in reader.fieldnames or []}
+        missing = REQUIRED_COLUMNS - columns
+        if missing:
+            raise BusinessLogicException(f"File CSV thiếu cột: {', '.join(sorted(missing))}")
+        for row in reader:
+            yield {(k or "").strip().lower(): (v or "").strip() for k, v in row.items()}
+
+    @staticmethod
+    def parse_rows(rows: List[Dict[str, str]]) -> List[Dict[str, Any]]:
+        """Kiểm tra từng dòng; dòng hợp lệ ở trạng thái pending, kèm mật khẩu (tạm) cần hash."""
+        parsed: List[Dict[str, Any]] = []
+        seen_usernames = set()
+        seen_emails = set()
+
+        for row_number, row in enumerate(rows, start=2):  # dòng 1 là header
+            item = {
+                "row": row_number,
+                "username": row.get("username", ""),
+                "email": row.get("email", "").lower(),
+                "full_name": row.get("full_name", ""),
+                "status": "invalid",
+                "message": "",
+                "password": None,
+                "temporary_password": None,
+            }
+            parsed.append(item)
+
+            password = row.get("password") or ""
+            try:
+                user_in = UserCreate(
+                    username=item["username"],
+                    email=item["email"],
+                    full_name=item["full_name"],
+                    password=password,
+                )
+            except ValidationError as e:
+                item["message"] = "; ".join(f"{err['loc'][0]}: {err['msg']}" for err in e.errors())
+                continue
+            if not USERNAME_PATTERN.match(user_in.username):
+                item["message"] = "username: chỉ gồm chữ, số, _ . - (tối đa 64 ký tự)"
+                continue
+            if user_in.username in seen_usernames or user_in.email in seen_emails:
+                item["message"] = "Trùng lặp trong file"
+                continue
+            seen_usernames.add(user_in.username)
+            seen_emails.add(user_in.email)
+
+            item.update(status="pending", username=user_in.username, email=user_in.email, full_name=user_in.full_name)
+            if password:
+                item["password"] = password
+            else:
+                item["temporary_password"] = secrets.token_urlsafe(9)
+        return parsed
+
+    @staticmethod
+    async def create_job(
+        db: AsyncSession, rows: Iterator[Dict[str, str]], created_by: Optional[int] = None, filename: Optional[str] = None
+    ) -> ProvisioningJob:
+        """
+        Lưu job và mọi dòng của file trong một transaction, chưa tạo tài khoản nào.
+        File quá PROVISION_MAX_ROWS dòng bị từ chối.
+        """
+        rows = list(islice(rows, settings.PROVISION_MAX_ROWS + 1))
+        if len(rows) > settings.PROVISION_MAX_ROWS:
+            raise BusinessLogicException(f"File vượt quá {settings.PROVISION_MAX_ROWS} dòng")
+
+        parsed = ProvisioningService.parse_rows(rows)
+        invalid = sum(1 for item in parsed if item["status"] == "invalid")
+        job = ProvisioningJob(
+            created_by=created_by,
+            filename=filename,
+            status="pending",
+            total_rows=len(parsed),
+            processed_rows=invalid,
+            invalid_count=invalid,
+        )
+        db.add(job)
+        await db.flush()
+        if parsed:
+            await db.execute(insert(ProvisioningRow), [{**item, "job_id": job.id} for item in parsed])
+        await db.commit()
+        return job
+
+    @staticmethod
+    def start_job(job_id: int) -> None:
+        """
+        Chạy job trong task nền của worker, tách khỏi request tạo job: hạn chót
+        của route và việc client ngắt kết nối không hủy được việc hash/INSERT.
+        """
+        if job_id in _running:
+            return
+        # Context mới: không mang hạn chót (statement_timeout) và thống kê query của request
+        task = asyncio.create_task(ProvisioningService._run_in_background(job_id), context=contextvars.Context())
+        _running[job_id] = task
+        task.add_done_callback(lambda _: _running.pop(job_id, None))
+
+    @staticmethod
+    async def _run_in_background(job_id: int) -> None:
+        try:
+            async with AsyncSessionLocal() as db:
+                await ProvisioningService.run_job(db, job_id)
+        except Exception as e:
+            logger.error(f"Provisioning job {job_id} failed: {e}")
+
+    @staticmethod
+    async def aclose() -> None:
+        # Job bị hủy giữ trạng thái running; hết PROVISION_JOB_STALE_SECONDS thì chạy tiếp được
+        for task in list(_running.values()):
+            task.cancel()
+
+    @staticmethod
+    async def run_job(db: AsyncSession, job_id: int) -> bool:
+        """Chạy (hoặc chạy tiếp) job; False khi job đã xong hoặc đang có runner khác giữ."""
+        if not await ProvisioningService._claim(db, job_id):
+            return False
+        try:
+            while True:
+                rows = (await db.execute(
+                    select(
+                        ProvisioningRow.id,
+                        ProvisioningRow.username,
+                        ProvisioningRow.email,
+                        ProvisioningRow.full_name,
+                        ProvisioningRow.password,
+                        ProvisioningRow.temporary_password,
+                    )
+                    .where(ProvisioningRow.job_id == job_id, ProvisioningRow.status == "pending")
+                    .order_by(ProvisioningRow.row)
+                    .limit(settings.PROVISION_BATCH_SIZE)
+                )).all()
+                # Không giữ transaction mở trong lúc hash
+                await db.commit()
+                if not rows:
+                    break
+                await ProvisioningService._process_batch(db, job_id, rows)
+        except Exception as e:
+            await db.rollback()
+            await db.execute(
+                update(ProvisioningJob).where(ProvisioningJob.id == job_id).values(status="failed", error=str(e)[:1000])
+            )
+            await db.commit()
+            raise
+
+        now = datetime.utcnow()
+        await db.execute(
+            update(ProvisioningJob)
+            .where(ProvisioningJob.id == job_id)
+            .values(status="done", finished_at=now, heartbeat_at=now)
+        )
+        await db.commit()
+        return True
+
+    @staticmethod
+    async def _claim(db: AsyncSession, job_id: int) -> bool:
+        """Nhận job pending/failed hoặc job running mà runner đã dừng (heartbeat quá cũ)."""
+        now = datetime.utcnow()
+        stale_before = now - timedelta(seconds=settings.PROVISION_JOB_STALE_SECONDS)
+        claimed = (await db.execute(
+            update(ProvisioningJob)
+            .where(
+                ProvisioningJob.id == job_id,
+                or_(
+                    ProvisioningJob.status.in_(("pending", "failed")),
+                    and_(ProvisioningJob.status == "running", ProvisioningJob.heartbeat_at < stale_before),
+                ),
+            )
+            .values(status="running", heartbeat_at=now, error=None)
+            .returning(ProvisioningJob.id)
+        )).first()
+        await db.commit()
+        return claimed is not None
+
+    @staticmethod
+    async def _process_batch(db: AsyncSession, job_id: int, rows: List[Any]) -> None:
+        """Hash một lô, tạo tài khoản và ghi kết quả của lô trong cùng một transaction."""
+        hashes = await password_hasher.hash_many([row.password or row.temporary_password for row in rows])
+        users = [
+            {
+                "username": row.username,
+                "email": row.email,
+                "full_name": row.full_name,
+                "hashed_password": hashed,
+                "role": "student",
+                "is_active": True,
+            }
+            for row, hashed in zip(rows, hashes)
+        ]
+        # SQLite (dev/test) có cùng API ON CONFLICT với Postgres
+        dialect = postgresql if db.bind.dialect.name == "postgresql" else sqlite
+        # Dòng trùng username/email với dữ liệu đã có sẽ không được RETURNING
+        created = (await db.execute(
+            dialect.insert(User).values(users).on_conflict_do_nothing().returning(User.id, User.username)
+        )).all()
+
+        created_ids = {username: user_id for user_id, username in created}
+        results = []
+        for row in rows:
+            user_id = created_ids.get(row.username)
+            result = {"id": row.id, "password": None, "user_id": user_id}
+            if user_id is None:
+                result.update(status="conflict", message="Tên đăng nhập hoặc email đã tồn tại", temporary_password=None)
+            else:
+                result.update(status="created", message="", temporary_password=row.temporary_password)
+            results.append(result)
+        await db.execute(update(ProvisioningRow), results)
+        await db.execute(
+            update(ProvisioningJob)
+            .where(ProvisioningJob.id == job_id)
+            .values(
+                processed_rows=ProvisioningJob.processed_rows + len(rows),
+                created_count=ProvisioningJob.created_count + len(created),
+                conflict_count=ProvisioningJob.conflict_count + len(rows) - len(created),
+                heartbeat_at=datetime.utcnow(),
+            )
+        )
+        await db.commit()
+        logger.info(f"Provisioning job {job_id}: created {len(created)}/{len(rows)} students in batch")
+
+    @staticmethod
+    async def get_job(db: AsyncSession, job_id: int) -> ProvisioningJob:
+        job = await db.get(ProvisioningJob, job_id, populate_existing=True)
+        if job is None:
+            raise NotFoundException("Provisioning job")
+        return job
+
+    @staticmethod
+    async def list_jobs(db: AsyncSession, limit: int = 20) -> List[ProvisioningJob]:
+        return list((await db.scalars(
+            select(ProvisioningJob).order_by(ProvisioningJob.id.desc()).limit(limit)
+        )).all())
+
+    @staticmethod
+    def is_stale(job: ProvisioningJob) -> bool:
+        return (
+            job.status == "running"
+            and job.heartbeat_at is not None
+            and job.heartbeat_at < datetime.utcnow() - timedelta(seconds=settings.PROVISION_JOB_STALE_SECONDS)
+        )
+
+    @staticmethod
+    def summary(job: ProvisioningJob) -> Dict[str, Any]:
+        return {
+            "job_id": job.id,
+            "status": job.status,
+            "filename": job.filename,
+            "total_rows": job.total_rows,
+            "processed_rows": job.processed_rows,
+            "created": job.created_count,
+            "conflicts": job.conflict_count,
+            "invalid": job.invalid_count,
+            "stale": ProvisioningService.is_stale(job),
+            "error": job.error,
+            "created_at": job.created_at.isoformat() if job.created_at else None,
+            "finished_at": job.finished_at.isoformat() if job.finished_at else None,
+        }
+
+    @staticmethod
+    async def ensure_resumable(db: AsyncSession, job_id: int) -> ProvisioningJob:
+        job = await ProvisioningService.get_job(db, job_id)
+        if job.status == "done":
+            raise BusinessLogicException("Job đã hoàn tất")
+        if job.status == "running" and not ProvisioningService.is_stale(job):
+            raise BusinessLogicException("Job đang chạy")
+        return job
+
+    @staticmethod
+    async def result_rows(db: AsyncSession, job_id: int) -> List[Dict]:
+        rows = (await db.scalars(
+            select(ProvisioningRow).where(ProvisioningRow.job_id == job_id).order_by(ProvisioningRow.row)
+        )).all()
+        return [
+            {
+                "row": row.row,
+                "username": row.username,
+                "email": row.email,
+                "status": row.status,
+                "user_id": row.user_id or "",
+                "message": row.message,
+                "temporary_password": row.temporary_password or "",
+            }
+            for row in rows
+        ]
+
+    @staticmethod
+    async def delete_job(db: AsyncSession, job_id: int) -> None:
+        """Xóa job cùng kết quả (gồm mật khẩu tạm) sau khi admin đã tải CSV kết quả."""
+        job = await ProvisioningService.get_job(db, job_id)
+        if job.status == "running" and not ProvisioningService.is_stale(job):
+            raise BusinessLogicException("Job đang chạy")
+        await db.execute(delete(ProvisioningRow).where(ProvisioningRow.job_id == job_id))
+        await db.execute(delete(ProvisioningJob).where(ProvisioningJob.id == job_id))
+        await db.commit()
+
+    @staticmethod
+    async def purge_finished_jobs(db: AsyncSession, older_than_days: int = None) -> int:
+        """Xóa job đã xong quá PROVISION_JOB_RETENTION_DAYS ngày để không giữ mật khẩu tạm lâu."""
+        older_than_days = older_than_days or settings.PROVISION_JOB_RETENTION_DAYS
+        cutoff = datetime.utcnow() - timedelta(days=older_than_days)
+        ids = (await db.scalars(
+            select(ProvisioningJob.id).where(ProvisioningJob.status == "done", ProvisioningJob.finished_at < cutoff)
+        )).all()
+        if ids:
+            await db.execute(delete(ProvisioningRow).where(ProvisioningRow.job_id.in_(ids)))
+            await db.execute(delete(ProvisioningJob).where(ProvisioningJob.id.in_(ids)))
+            await db.commit()
+        return len(ids)
+
+    @staticmethod
+    async def resumable_job_ids(db: AsyncSession) -> List[int]:
+        stale_before = datetime.utcnow() - timedelta(seconds=settings.PROVISION_JOB_STALE_SECONDS)
+        return list((await db.scalars(
+            select(ProvisioningJob.id)
+            .where(or_(
+                ProvisioningJob.status.in_(("pending", "failed")),
+                and_(ProvisioningJob.status == "running", ProvisioningJob.heartbeat_at < stale_before),
+            ))
+            .order_by(ProvisioningJob.id)
+        )).all())
+
+    @staticmethod
+    def to_csv(results: List[Dict]) -> str:
+        output = io.StringIO()
+        writer = csv.DictWriter(output, fieldnames=RESULT_COLUMNS)
+        writer.writeheader()
+        writer.writerows(results)
+        return output.getvalue()
+
+provisioning_service = ProvisioningService()
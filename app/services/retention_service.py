@@ -0,0 +1,76 @@
+from datetime import datetime, timedelta
+from typing import Dict
+from sqlalchemy import delete, exists, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.config import settings
+from app.core.shards import shard_router
+from app.db.partitions import archive_cutoff
+from app.models.practice_test import PracticeTest
+from app.models.question import test_question_association
+from app.models.submission import Submission
+from app.services.provisioning_service import provisioning_service
+from app.services.session_service import session_service
+
+class RetentionService:
+    @staticmethod
+    async def purge_abandoned_tests(db: AsyncSession, older_than_days: int = None, batch_size: int = None) -> Dict[str, int]:
+        """
+        Xóa đề tạo quá older_than_days ngày mà chưa có bài nộp, kèm các dòng
+        test_question_association của đề. Mỗi lô là một transaction ngắn:
+        chọn id theo ix_practice_tests_created_at, xóa liên kết theo khóa chính
+        (test_id, question_id) rồi xóa đề.
+        Với PARTITION_ARCHIVE_MODE=detach, bài nộp của partition đã tách không còn
+        thấy qua bảng submissions (app/db/partitions.py) nên đề đã nộp trông như bỏ
+        dở và partition tách vẫn giữ khóa ngoại tới đề: chỉ xét đề tạo từ
+        archive_cutoff() trở đi, đề cũ hơn được giữ lại.
+        """
+        older_than_days = older_than_days or settings.RETENTION_UNSUBMITTED_TEST_DAYS
+        batch_size = batch_size or settings.RETENTION_BATCH_SIZE
+        cutoff = datetime.utcnow() - timedelta(days=older_than_days)
+        conditions = [
+            PracticeTest.created_at < cutoff,
+            ~exists().where(Submission.test_id == PracticeTest.id),
+        ]
+        if settings.PARTITION_ARCHIVE_MODE == "detach":
+            archived_before = archive_cutoff()
+            conditions.append(PracticeTest.created_at >= datetime(archived_before.year, archived_before.month, 1))
+        reclaimed = {"practice_tests": 0, "test_question_associations": 0}
+        while True:
+            # SKIP LOCKED: bỏ qua đề đang bị request khác giữ; khóa dòng để không ai nộp bài vào giữa lúc xóa
+            ids = (await db.scalars(
+                select(PracticeTest.id)
+                .where(*conditions)
+                .order_by(PracticeTest.created_at)
+                .limit(batch_size)
+                .with_for_update(skip_locked=True)
+            )).all()
+            if not ids:
+                break
+            links = await db.execute(
+                delete(test_question_association).where(test_question_association.c.test_id.in_(ids))
+            )
+            await db.execute(delete(PracticeTest).where(PracticeTest.id.in_(ids)))
+            await db.commit()
+            reclaimed["practice_tests"] += len(ids)
+            reclaimed["test_question_associations"] += links.rowcount
+            if len(ids) < batch_size:
+                break
+        return reclaimed
+
+    @staticmethod
+    async def run(db: AsyncSession, older_than_days: int = None, batch_size: int = None) -> Dict[str, int]:
+        """Chạy mọi bước dọn dữ liệu, trả về số dòng đã xóa theo bảng."""
+        reclaimed = {"practice_tests": 0, "test_question_associations": 0}
+        # Đề nằm trên shard của học sinh: dọn lần lượt từng shard
+        for index in shard_router.indexes():
+            shard_router.use_shard(db, index)
+            for table, count in (await RetentionService.purge_abandoned_tests(db, older_than_days, batch_size)).items():
+                reclaimed[table] += count
+        shard_router.use_shard(db, None)
+        reclaimed["sessions"] = await session_service.purge_expired(
+            db, batch_size=batch_size or settings.SESSION_PURGE_BATCH_SIZE
+        )
+        reclaimed["provisioning_jobs"] = await provisioning_service.purge_finished_jobs(db)
+        return reclaimed
+
+retention_service = RetentionService()
@@ -0,0 +1,85 @@
+
+from datetime import datetime, timedelta
+from typing import Tuple
+from sqlalchemy import select, update, delete
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.config import settings
+from app.core.security import create_refresh_token, hash_refresh_token
+from app.core.exceptions import AuthException
+from app.models.account import User
+from app.models.session import Session as UserSession
+
+class SessionService:
+    @staticmethod
+    def create_session(db: AsyncSession, user_id: int) -> str:
+        """Tạo refresh token mới; chỉ lưu hash vào bảng sessions. Caller tự commit."""
+        refresh_token = create_refresh_token()
+        db.add(UserSession(
+            token=hash_refresh_token(refresh_token),
+            user_id=user_id,
+            expires_at=datetime.utcnow() + timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS)
+        ))
+        return refresh_token
+
+    @staticmethod
+    async def rotate(db: AsyncSession, refresh_token: str) -> Tuple[User, str]:
+        """
+        Đổi refresh token cũ lấy token mới trong một câu UPDATE duy nhất.
+        Token cũ dùng lại (hoặc dùng đồng thời) sẽ không khớp dòng nào.
+        """
+        new_token = create_refresh_token()
+        now = datetime.utcnow()
+        user_id = (await db.execute(
+            update(UserSession)
+            .where(
+                UserSession.token == hash_refresh_token(refresh_token),
+                UserSession.expires_at > now
+            )
+            .values(
+                token=hash_refresh_token(new_token),
+                expires_at=now + timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS),
+                updated_at=now
+            )
+            .returning(UserSession.user_id)
+        )).scalar_one_or_none()
+        if user_id is None:
+            await db.rollback()
+            raise AuthException("Phiên đăng nhập đã hết hạn")
+
+        user = await db.get(User, user_id)
+        if not user or not user.is_active or user.is_locked:
+            await db.rollback()
+            raise AuthException("Tài khoản bị khóa")
+
+        await db.commit()
+        return user, new_token
+
+    @staticmethod
+    async def revoke(db: AsyncSession, refresh_token: str) -> None:
+        await db.execute(delete(UserSession).where(UserSession.token == hash_refresh_token(refresh_token)))
+        await db.commit()
+
+    @staticmethod
+    async def revoke_all(db: AsyncSession, user_id: int) -> None:
+        """Xóa mọi refresh token của user. Caller tự commit."""
+        await db.execute(delete(UserSession).where(UserSession.user_id == user_id))
+
+    @staticmethod
+    async def purge_expired(db: AsyncSession, batch_size: int = None) -> int:
+        """Xóa session hết hạn theo từng lô nhỏ để không giữ lock lâu trên bảng."""
+        batch_size = batch_size or settings.SESSION_PURGE_BATCH_SIZE
+        total = 0
+        while True:
+            ids = (await db.scalars(
+                select(UserSession.id)
+                .where(UserSession.expires_at < datetime.utcnow())
+                .limit(batch_size)
+            )).all()
+            if not ids:
+                break
+            await db.execute(delete(UserSession).where(UserSession.id.in_(ids)))
+            await db.commit()
+            total += len(ids)
+        return total
+
+session_service = SessionService()
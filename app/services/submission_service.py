@@ -1,23 +1,22 @@
 
 import json
 from datetime import datetime
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.models.submission import Submission
-from app.models.practice_test import PracticeTest
 from app.core.exceptions import BusinessLogicException, NotFoundException
+from app.db import queries
 
 class SubmissionService:
     @staticmethod
-    def submit_online(db: Session, student_id: int, test_id: int, answers: dict, start_time: datetime, end_time: datetime):
-        test = db.query(PracticeTest).filter(PracticeTest.id == test_id).first()
+    async def submit_online(db: AsyncSession, student_id: int, test_id: int, answers: dict, start_time: datetime, end_time: datetime):
+        test = await queries.get_test_header(db, test_id)
         if not test:
             raise NotFoundException("Đề luyện tập")
         if test.student_id != student_id:
             raise BusinessLogicException("Bạn không có quyền nộp bài cho đề này")
         
         # Kiểm tra xem đã nộp chưa
-        existing = db.query(Submission).filter(Submission.test_id == test_id).first()
-        if existing:
+        if await queries.submission_exists(db, test_id):
             raise BusinessLogicException("Bài đã được nộp trước đó")
 
         submission = Submission(
@@ -29,18 +28,18 @@ class SubmissionService:
             submitted_at=end_time
         )
         db.add(submission)
-        db.commit()
-        db.refresh(submission)
+        await db.commit()
+        await db.refresh(submission)
         
         # Gọi grading_service (giả định được import hoặc inject)
         from app.services.grading_service import grading_service
-        grading_service.grade_submission(db, submission.id)
+        await grading_service.grade_submission(db, submission.id)
         
         return submission
 
     @staticmethod
-    def submit_offline(db: Session, student_id: int, test_id: int, file_path: str):
-        test = db.query(PracticeTest).filter(PracticeTest.id == test_id).first()
+    async def submit_offline(db: AsyncSession, student_id: int, test_id: int, file_path: str):
+        test = await queries.get_test_header(db, test_id)
         if not test:
             raise NotFoundException("Đề luyện tập")
         
@@ -53,8 +52,8 @@ class SubmissionService:
             submitted_at=datetime.utcnow()
         )
         db.add(submission)
-        db.commit()
-        db.refresh(submission)
+        await db.commit()
+        await db.refresh(submission)
         return submission
 
 submission_service = SubmissionService()
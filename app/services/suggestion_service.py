@@ -1,18 +1,19 @@
 
 import json
-from sqlalchemy.orm import Session
-from app.models.result import GradingResult
-from app.models.suggestion import LearningSuggestion
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.core.exceptions import BusinessLogicException
+from app.db import queries
 
 class SuggestionService:
     @staticmethod
-    def get_suggestions(db: Session, submission_id: int, student_id: int):
-        result = db.query(GradingResult).filter(GradingResult.submission_id == submission_id).first()
+    async def get_suggestions(db: AsyncSession, submission_id: int, student_id: int):
+        submission = await queries.get_submission(db, submission_id)
+        # Đọc kết quả với cận dưới created_at của bài nộp để chỉ quét các partition liên quan
+        result = await queries.get_result(db, submission_id, submission.created_at) if submission else None
         if not result:
             raise BusinessLogicException("Bài chưa được chấm nên chưa có gợi ý")
         
-        if result.submission.student_id != student_id:
+        if submission.student_id != student_id:
             raise BusinessLogicException("Permission denied")
 
         # Phân tích logic
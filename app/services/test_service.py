@@ -1,52 +1,252 @@
-
+import logging
 import random
-from sqlalchemy.orm import Session
-from app.models.question import Question
+from typing import Dict, List, Optional, Sequence, Tuple
+from sqlalchemy import insert
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.models.question import test_question_association
 from app.models.practice_test import PracticeTest
-from app.models.account import User
+from app.core.config import settings
 from app.core.exceptions import BusinessLogicException, NotFoundException
+from app.core.question_bank import load_questions, load_test_questions, question_bank
+from app.core.shards import shard_router
+from app.core.test_pool import test_pool
+from app.db import queries
+
+logger = logging.getLogger(__name__)
+
+def _sample_batch(pool: Sequence[int], tests: int, count: int, max_uses: Optional[int]) -> List[List[int]]:
+    """
+    Chọn count câu khác nhau cho từng đề trong lô. max_uses giới hạn số đề mà
+    một câu được dùng: câu hết lượt bị bỏ khỏi pool (swap-remove, O(count) mỗi đề).
+    """
+    if max_uses is None:
+        return [random.sample(pool, count) for _ in range(tests)]
+
+    available = list(pool)
+    remaining = {question_id: max_uses for question_id in available}
+    selections = []
+    for _ in range(tests):
+        if len(available) < count:
+            raise BusinessLogicException(
+                "Không đủ câu hỏi để tạo đề cho cả lớp với giới hạn trùng câu này. "
+                f"Pool có {len(pool)} câu, mỗi câu dùng tối đa {max_uses} lần"
+            )
+        positions = random.sample(range(len(available)), count)
+        chosen = [available[i] for i in positions]
+        selections.append(chosen)
+        # Bỏ vị trí từ cuối lên để swap-remove không làm lệch các vị trí còn lại
+        for i in sorted(positions, reverse=True):
+            question_id = available[i]
+            remaining[question_id] -= 1
+            if remaining[question_id] == 0:
+                available[i] = available[-1]
+                available.pop()
+    return selections
 
 class PracticeTestService:
     @staticmethod
-    def generate_test(db: Session, student_id: int, subject: str, topic: str, level: str, count: int):
-        # 1. Tìm câu hỏi phù hợp
-        questions = db.query(Question).filter(
-            Question.subject == subject,
-            Question.topic == topic,
-            Question.level == level
-        ).all()
-        
-        if len(questions) < count:
-            raise BusinessLogicException(f"Không đủ câu hỏi theo tiêu chí yêu cầu. Hiện có: {len(questions)}")
-        
-        selected_questions = random.sample(questions, count)
-        
+    async def generate_test(db: AsyncSession, student_id: int, subject: str, topic: str, level: str, count: int):
+        test, _ = await PracticeTestService._create_test(db, student_id, subject, topic, level, count)
+        return test
+
+    @staticmethod
+    async def generate_test_content(db: AsyncSession, student_id: int, subject: str, topic: str, level: str, count: int):
+        """Tạo đề và trả luôn nội dung như get_test_content, không đọc lại đề vừa ghi."""
+        test, question_ids = await PracticeTestService._create_test(db, student_id, subject, topic, level, count)
+        return PracticeTestService._content(test, await load_questions(db, question_ids))
+
+    @staticmethod
+    async def generate_batch(
+        db: AsyncSession,
+        student_ids: Sequence[int],
+        subject: str,
+        topic: str,
+        level: str,
+        count: int,
+        max_question_uses: Optional[int] = None,
+    ) -> List[Dict[str, int]]:
+        """
+        Tạo đề riêng cho từng học sinh với cùng tiêu chí: đọc pool id một lần,
+        chọn câu trong bộ nhớ, insert toàn bộ đề và liên kết trong một transaction
+        (mỗi shard một transaction khi bật shard). Trả về [{student_id, test_id}].
+        """
+        student_ids = list(dict.fromkeys(student_ids))
+        if not student_ids:
+            raise BusinessLogicException("Danh sách học sinh trống")
+        if len(student_ids) > settings.TEST_BATCH_MAX_STUDENTS:
+            raise BusinessLogicException(f"Tối đa {settings.TEST_BATCH_MAX_STUDENTS} học sinh mỗi lần tạo")
+        if max_question_uses is not None and max_question_uses < 1:
+            raise BusinessLogicException("max_question_uses phải lớn hơn 0")
+
+        known = set(await queries.get_student_ids(db, student_ids))
+        missing = [student_id for student_id in student_ids if student_id not in known]
+        if missing:
+            raise BusinessLogicException(f"Không tìm thấy học sinh: {', '.join(map(str, missing[:20]))}")
+
+        shards = list(dict.fromkeys(shard_router.index_for(student_id) for student_id in student_ids))
+        pool = await PracticeTestService._batch_pool(db, subject, topic, level, count, shards)
+        selections = _sample_batch(pool, len(student_ids), count, max_question_uses)
+        try:
+            test_ids = await PracticeTestService._insert_batch(db, student_ids, subject, topic, count, selections)
+        except IntegrityError:
+            # Như _create_test: snapshot có thể còn câu đã bị xóa, chọn lại từ database một lần
+            await db.rollback()
+            logger.warning(f"Sampled questions no longer exist for {subject}/{topic}/{level}, resampling from the database")
+            pool = await PracticeTestService._batch_pool(db, subject, topic, level, count, shards, use_snapshot=False)
+            selections = _sample_batch(pool, len(student_ids), count, max_question_uses)
+            test_ids = await PracticeTestService._insert_batch(db, student_ids, subject, topic, count, selections)
+        return [{"student_id": student_id, "test_id": test_id} for student_id, test_id in zip(student_ids, test_ids)]
+
+    @staticmethod
+    async def _batch_pool(
+        db: AsyncSession, subject: str, topic: str, level: str, count: int,
+        shards: List[Optional[int]], use_snapshot: bool = True,
+    ) -> Sequence[int]:
+        snapshot = question_bank.snapshot() if use_snapshot else None
+        pool = snapshot.pool_ids(subject, topic, level) if snapshot is not None else []
+        if snapshot is not None:
+            question_bank.record(len(pool) >= count)
+        if len(pool) < count:
+            # Đọc pool trên từng shard của lô và chỉ giữ câu có ở mọi shard đó
+            available = None
+            try:
+                for shard in shards:
+                    shard_router.use_shard(db, shard)
+                    ids = await queries.get_question_pool_ids(db, subject, topic, level)
+                    if available is None:
+                        available = list(ids)
+                    else:
+                        on_shard = set(ids)
+                        available = [i for i in available if i in on_shard]
+            finally:
+                shard_router.use_shard(db, None)
+            pool = available or []
+        if len(pool) < count:
+            raise BusinessLogicException(f"Không đủ câu hỏi theo tiêu chí yêu cầu. Hiện có: {len(pool)}")
+        return pool
+
+    @staticmethod
+    async def _insert_batch(
+        db: AsyncSession, student_ids: List[int], subject: str, topic: str, count: int, selections: List[List[int]]
+    ) -> List[int]:
+        """Insert đề và liên kết của cả lô, commit một lần; trả về id đề theo thứ tự student_ids."""
+        by_shard: Dict[Optional[int], List[int]] = {}
+        for position, student_id in enumerate(student_ids):
+            by_shard.setdefault(shard_router.index_for(student_id), []).append(position)
+
+        title = f"Đề luyện tập {subject} - {topic}"
+        test_ids: List[int] = [0] * len(student_ids)
+        try:
+            for shard, positions in by_shard.items():
+                shard_router.use_shard(db, shard)
+                # INSERT ... RETURNING id theo đúng thứ tự tham số
+                ids = (await db.scalars(
+                    insert(PracticeTest).returning(PracticeTest.id, sort_by_parameter_order=True),
+                    [
+                        {
+                            "title": title,
+                            "subject": subject,
+                            "student_id": student_ids[position],
+                            "duration_minutes": count * 2,
+                            "status": "ready",
+                        }
+                        for position in positions
+                    ],
+                )).all()
+                links = []
+                for position, test_id in zip(positions, ids):
+                    test_ids[position] = test_id
+                    links.extend({"test_id": test_id, "question_id": question_id} for question_id in selections[position])
+                # executemany: câu lệnh compile một lần, driver gửi theo lô (pipeline với psycopg)
+                await db.execute(insert(test_question_association), links)
+            await db.commit()
+        finally:
+            shard_router.use_shard(db, None)
+        return test_ids
+
+    @staticmethod
+    async def _create_test(
+        db: AsyncSession, student_id: int, subject: str, topic: str, level: str, count: int
+    ) -> Tuple[PracticeTest, List[int]]:
+        # 1. Chọn id câu hỏi: nhận bộ dựng sẵn (app/core/test_pool.py) nếu pool còn,
+        #    không thì chọn ngẫu nhiên, không tải nội dung câu hỏi
+        claimed = await test_pool.claim(db, subject, topic, level, count)
+        question_ids = claimed
+        if question_ids is None:
+            question_ids = await PracticeTestService._sample_question_ids(db, subject, topic, level, count)
+        try:
+            test = await PracticeTestService._insert_test(db, student_id, subject, topic, question_ids)
+        except IntegrityError:
+            # Snapshot/pool dựng trước có thể còn câu đã bị xóa (khóa ngoại của liên kết):
+            # chọn lại một lần trực tiếp từ database
+            await db.rollback()
+            logger.warning(f"Sampled questions no longer exist for {subject}/{topic}/{level}, resampling from the database")
+            if claimed is not None:
+                await test_pool.discard(db, subject, topic, level, claimed)
+            question_ids = await PracticeTestService._sample_question_ids(
+                db, subject, topic, level, count, use_snapshot=False
+            )
+            test = await PracticeTestService._insert_test(db, student_id, subject, topic, question_ids)
+        # expire_on_commit=False: thuộc tính của test vẫn dùng được, không cần refresh
+        return test, list(question_ids)
+
+    @staticmethod
+    async def _insert_test(
+        db: AsyncSession, student_id: int, subject: str, topic: str, question_ids: Sequence[int]
+    ) -> PracticeTest:
         # 2. Tạo đề
         test = PracticeTest(
             title=f"Đề luyện tập {subject} - {topic}",
             subject=subject,
             student_id=student_id,
-            duration_minutes=count * 2, # Giả định 2p/câu
+            duration_minutes=len(question_ids) * 2, # Giả định 2p/câu
             status="ready"
         )
-        test.questions = selected_questions
-        
         db.add(test)
-        db.commit()
-        db.refresh(test)
+        await db.flush()
+        # Một câu INSERT nhiều dòng, cùng transaction với đề; chạy bằng câu lệnh
+        # để đi cùng shard với đề (app/core/shards.py)
+        await db.execute(
+            insert(test_question_association).values(
+                [{"test_id": test.id, "question_id": question_id} for question_id in question_ids]
+            )
+        )
+        await db.commit()
         return test
 
     @staticmethod
-    def get_test_content(db: Session, test_id: int, student_id: int):
-        test = db.query(PracticeTest).filter(PracticeTest.id == test_id).first()
+    async def _sample_question_ids(
+        db: AsyncSession, subject: str, topic: str, level: str, count: int, use_snapshot: bool = True
+    ) -> List[int]:
+        # Từ snapshot nếu có, không thì đếm pool rồi chọn trong database
+        snapshot = question_bank.snapshot() if use_snapshot else None
+        if snapshot is not None and snapshot.pool_size(subject, topic, level) >= count:
+            question_bank.record(True)
+            return snapshot.sample_ids(subject, topic, level, count)
+        if snapshot is not None:
+            question_bank.record(False)
+        pool_size = await queries.count_question_pool(db, subject, topic, level)
+        if pool_size < count:
+            raise BusinessLogicException(f"Không đủ câu hỏi theo tiêu chí yêu cầu. Hiện có: {pool_size}")
+        return list(await queries.sample_question_ids(db, subject, topic, level, count, pool_size))
+
+    @staticmethod
+    async def get_test_content(db: AsyncSession, test_id: int, student_id: int):
+        test = await queries.get_test_header(db, test_id)
         if not test:
             raise NotFoundException("Đề luyện tập")
         if test.student_id != student_id:
             raise BusinessLogicException("Bạn không có quyền truy cập đề này")
         
+        questions = await load_test_questions(db, test_id)
+        return PracticeTestService._content(test, questions)
+
+    @staticmethod
+    def _content(test, questions) -> dict:
         # Build response manually to avoid serialization issues
         questions_data = []
-        for question in test.questions:
+        for question in questions:
             questions_data.append({
                 "id": question.id,
                 "content": question.content,
@@ -57,14 +257,14 @@ class PracticeTestService:
             "id": test.id,
             "title": test.title,
             "subject": test.subject,
-            "question_count": len(test.questions),
+            "question_count": len(questions),
             "duration_minutes": test.duration_minutes,
             "status": test.status,
             "questions": questions_data
         }
 
     @staticmethod
-    def export_test(db: Session, test_id: int, student_id: int, format: str):
+    async def export_test(db: AsyncSession, test_id: int, student_id: int, format: str):
         # Giả lập logic sinh file PDF/DOCX
         return {"filename": f"test_{test_id}.{format}", "url": f"/downloads/test_{test_id}"}
 
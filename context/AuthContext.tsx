@@ -11,7 +11,7 @@ interface AuthContextType {
   login: (credentials: LoginRequest) => Promise<void>;
   register: (data: UserCreate) => Promise<void>;
   logout: () => void;
-  setTokenManually: (token: string) => void;
+  setTokenManually: (token: string, refreshToken?: string | null) => void;
 }
 
 const AuthContext = createContext<AuthContextType | undefined>(undefined);
@@ -46,6 +46,10 @@ export const AuthProvider: React.FC<{ children: React.ReactNode }> = ({ children
     const urlToken = params.get('token');
     if (urlToken) {
       setSafeStorage('edunexia_token', urlToken);
+      const urlRefreshToken = params.get('refresh_token');
+      if (urlRefreshToken) {
+        setSafeStorage('edunexia_refresh_token', urlRefreshToken);
+      }
       return urlToken;
     }
     // 2. Fallback to localStorage
@@ -73,10 +77,13 @@ export const AuthProvider: React.FC<{ children: React.ReactNode }> = ({ children
   }, [token, user, fetchProfile]);
 
   const handleAuthSuccess = (data: any) => {
-    const { access_token, user: userData } = data;
+    const { access_token, refresh_token, user: userData } = data;
     setToken(access_token);
     setUser(userData || null);
     setSafeStorage('edunexia_token', access_token);
+    if (refresh_token) {
+      setSafeStorage('edunexia_refresh_token', refresh_token);
+    }
     if (userData) {
       setSafeStorage('edunexia_user', JSON.stringify(userData));
     }
@@ -110,16 +117,24 @@ export const AuthProvider: React.FC<{ children: React.ReactNode }> = ({ children
     }
   };
 
-  const setTokenManually = (newToken: string) => {
+  const setTokenManually = (newToken: string, refreshToken?: string | null) => {
     setSafeStorage('edunexia_token', newToken);
+    if (refreshToken) {
+      setSafeStorage('edunexia_refresh_token', refreshToken);
+    }
     setToken(newToken);
   };
 
   const logout = () => {
+    const refreshToken = getSafeStorage('edunexia_refresh_token');
+    if (refreshToken) {
+      authService.logout(refreshToken).catch(() => { });
+    }
     setToken(null);
     setUser(null);
     try {
       localStorage.removeItem('edunexia_token');
+      localStorage.removeItem('edunexia_refresh_token');
       localStorage.removeItem('edunexia_user');
     } catch { }
   };
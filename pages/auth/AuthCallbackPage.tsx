@@ -29,6 +29,7 @@ export const AuthCallbackPage: React.FC = () => {
         const processAuth = async () => {
             const params = new URLSearchParams(location.search);
             const token = params.get('token');
+            const refreshToken = params.get('refresh_token');
             const error = params.get('error');
             const details = params.get('details');
             const status_code = params.get('status');
@@ -41,7 +42,7 @@ export const AuthCallbackPage: React.FC = () => {
 
                 try {
                     // 1. Lưu token vào localStorage
-                    setTokenManually(token);
+                    setTokenManually(token, refreshToken);
                     addLog("Token đã được lưu vào Storage.");
 
                     // 2. Kiểm tra tính hợp lệ của Token ngay lập tức bằng Profile API
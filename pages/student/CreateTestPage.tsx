@@ -1,7 +1,7 @@
 
 import React, { useState } from 'react';
 import { useNavigate } from 'react-router-dom';
-import { generateTest } from '../../services/test.service.ts';
+import { generateTestWithContent } from '../../services/test.service.ts';
 import { Card, Button, Input, LoadingOverlay } from '../../components/common/UI.tsx';
 import { ROUTES } from '../../constants/routes.ts';
 
@@ -24,9 +24,12 @@ export const CreateTestPage: React.FC = () => {
     };
 
     try {
-      const res = await generateTest(data);
+      const res = await generateTestWithContent(data);
       if (res.status === 'success' && res.data) {
-        navigate(ROUTES.PROTECTED.PRACTICE_TEST.replace(':testId', res.data.test_id.toString()));
+        // Truyền sẵn nội dung đề để trang làm bài không phải gọi lại API
+        navigate(ROUTES.PROTECTED.PRACTICE_TEST.replace(':testId', res.data.test_id.toString()), {
+          state: { content: res.data }
+        });
       } else {
         setError(res.message || 'Không thể tạo đề vào lúc này');
       }
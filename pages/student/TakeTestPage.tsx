@@ -1,6 +1,6 @@
 
 import React, { useEffect, useState } from 'react';
-import { useParams, useNavigate } from 'react-router-dom';
+import { useParams, useNavigate, useLocation } from 'react-router-dom';
 import { getTestContent } from '../../services/test.service.ts';
 import { submitOnline } from '../../services/submission.service.ts';
 import { TestContent, QuestionOut } from '../../types/test.types.ts';
@@ -18,6 +18,7 @@ interface ProcessedTest extends Omit<TestContent, 'questions'> {
 export const TakeTestPage: React.FC = () => {
   const { testId } = useParams<{ testId: string }>();
   const navigate = useNavigate();
+  const location = useLocation();
   
   const [test, setTest] = useState<ProcessedTest | null>(null);
   const [answers, setAnswers] = useState<Record<string, string>>({});
@@ -29,20 +30,32 @@ export const TakeTestPage: React.FC = () => {
 
   useEffect(() => {
     if (!testId) return;
+    const showTest = (content: TestContent) => {
+      const processedQuestions: ProcessedQuestion[] = content.questions.map(q => ({
+        ...q,
+        parsedOptions: q.options ? JSON.parse(q.options) : { A: '', B: '', C: '', D: '' }
+      }));
+      
+      setTest({
+        ...content,
+        questions: processedQuestions
+      });
+      setTimeLeft(content.duration_minutes * 60);
+    };
+
+    // Vừa tạo đề ở CreateTestPage: nội dung đã có sẵn trong state của router
+    const prefetched = (location.state as { content?: TestContent } | null)?.content;
+    if (prefetched && prefetched.id === parseInt(testId)) {
+      showTest(prefetched);
+      setLoading(false);
+      return;
+    }
+
     const fetchTest = async () => {
       try {
         const res = await getTestContent(parseInt(testId));
         if (res.status === 'success' && res.data) {
-          const processedQuestions: ProcessedQuestion[] = res.data.questions.map(q => ({
-            ...q,
-            parsedOptions: q.options ? JSON.parse(q.options) : { A: '', B: '', C: '', D: '' }
-          }));
-          
-          setTest({
-            ...res.data,
-            questions: processedQuestions
-          });
-          setTimeLeft(res.data.duration_minutes * 60);
+          showTest(res.data);
         } else {
           setError(res.message || 'Không thể tải đề thi');
         }
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark: chi phí mỗi lần gọi của truy vấn ORM (db.query(...).first())
+so với câu lambda_stmt trả tuple trong app/db/queries.py.
+Chạy trên SQLite in-memory nên con số chủ yếu phản ánh overhead phía Python.
+
+Ví dụ:
+    python scripts/bench_queries.py --iterations 5000
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import Session
+
+from app.db import base  # noqa: F401
+from app.db import queries
+from app.models.account import User
+from app.models.base import Base
+from app.models.practice_test import PracticeTest
+from app.models.question import Question, test_question_association
+from app.models.submission import Submission
+
+QUESTIONS_PER_TEST = 20
+LONG_TEXT = "Nội dung câu hỏi dài " * 50
+
+def seed(db: Session) -> None:
+    user = User(username="bench", email="bench@example.com", hashed_password="x", full_name="Bench", role="student")
+    questions = [
+        Question(
+            subject="Toán", topic="Đại số", level="easy", content=LONG_TEXT,
+            options=json.dumps(["A", "B", "C", "D"]), correct_answer="A", explanation=LONG_TEXT,
+        )
+        for _ in range(QUESTIONS_PER_TEST)
+    ]
+    test = PracticeTest(title="Bench", subject="Toán", student=user, duration_minutes=40)
+    db.add_all([user, test, *questions])
+    db.flush()
+    db.execute(insert(test_question_association), [{"test_id": test.id, "question_id": q.id} for q in questions])
+    db.add(Submission(student_id=user.id, test_id=test.id, type="online", status="graded", answers="{}"))
+    db.commit()
+
+def orm_user(db: Session) -> None:
+    user = db.query(User).filter(User.id == 1).first()
+    (user.token_version, user.role, user.is_active, user.is_locked)
+
+def orm_test(db: Session) -> None:
+    test = db.query(PracticeTest).filter(PracticeTest.id == 1).first()
+    test.student_id == 1
+
+def orm_submission(db: Session) -> None:
+    submission = db.query(Submission).filter(Submission.id == 1).first()
+    submission.status
+
+def orm_test_questions(db: Session) -> None:
+    test = db.query(PracticeTest).filter(PracticeTest.id == 1).first()
+    [(q.id, q.content, q.options) for q in test.questions]
+
+def fast_user(db: Session) -> None:
+    db.execute(queries.auth_state_stmt(1)).first()
+
+def fast_test(db: Session) -> None:
+    db.execute(queries.test_header_stmt(1)).first()
+
+def fast_submission(db: Session) -> None:
+    db.execute(queries.submission_stmt(1)).first()
+
+def fast_test_questions(db: Session) -> None:
+    db.execute(queries.test_questions_stmt(1)).all()
+
+CASES = [
+    ("user by id", orm_user, fast_user),
+    ("test by id", orm_test, fast_test),
+    ("submission by id", orm_submission, fast_submission),
+    ("questions for test", orm_test_questions, fast_test_questions),
+]
+
+def bench(db: Session, fn, iterations: int) -> float:
+    for _ in range(min(100, iterations)):
+        fn(db)
+        db.expunge_all()
+    started = time.perf_counter()
+    for _ in range(iterations):
+        fn(db)
+        # Không để identity map che chi phí dựng ORM object
+        db.expunge_all()
+    return (time.perf_counter() - started) / iterations * 1e6
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare ORM queries with precompiled tuple statements")
+    parser.add_argument("--iterations", type=int, default=2000)
+    args = parser.parse_args()
+
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    with Session(engine) as db:
+        seed(db)
+        print(f"{'query':<22}{'ORM µs/call':>14}{'fast µs/call':>14}{'speedup':>10}")
+        for name, orm_fn, fast_fn in CASES:
+            orm_us = bench(db, orm_fn, args.iterations)
+            fast_us = bench(db, fast_fn, args.iterations)
+            print(f"{name:<22}{orm_us:>14.1f}{fast_us:>14.1f}{orm_us / fast_us:>9.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+Dựng snapshot ngân hàng câu hỏi (app/core/question_bank.py) từ database chính
+và thay file QUESTION_SNAPSHOT_PATH một cách nguyên tử; worker tự mmap lại bản mới.
+Chạy sau khi seed/sửa câu hỏi, hoặc để chạy nền và dựng lại khi ngân hàng đổi
+(và ít nhất mỗi QUESTION_SNAPSHOT_MAX_AGE_SECONDS / 2 giây, worker bỏ qua bản cũ hơn).
+Khi bật shard, mỗi lần ngân hàng đổi các shard được sync trước (app/db/question_sync.py)
+để id trong snapshot mới đã có trên shard:
+    python scripts/build_question_snapshot.py
+    python scripts/build_question_snapshot.py --watch 60
+"""
+
+import argparse
+import os
+import sys
+import time
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core.config import settings
+from app.core.question_bank import build_snapshot, snapshot_is_current
+from app.db.question_sync import sync_questions
+from app.db.session import create_db_engine, engine
+
+def sync_shards():
+    for index, url in enumerate(settings.shard_urls):
+        shard_engine = create_db_engine(url, pool_mode="null")
+        try:
+            report = sync_questions(engine, shard_engine)
+        finally:
+            shard_engine.dispose()
+        print(f"shard{index}: synced {report['upserted']} questions, deleted {report['deleted']}, "
+              f"kept {len(report['kept'])} still used by tests")
+
+def build(path: str, force: bool = False) -> bool:
+    with engine.connect() as conn:
+        if not force and snapshot_is_current(conn, path):
+            return False
+    sync_shards()
+    with engine.connect() as conn:
+        started = time.perf_counter()
+        count = build_snapshot(conn, path)
+    print(f"Built {path}: {count} questions, {os.path.getsize(path)} bytes in {time.perf_counter() - started:.2f}s")
+    return True
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the memory-mapped question bank snapshot")
+    parser.add_argument("--path", default=settings.QUESTION_SNAPSHOT_PATH)
+    parser.add_argument("--force", action="store_true", help="rebuild even if the bank has not changed")
+    parser.add_argument("--watch", type=float, default=None, metavar="SECONDS", help="keep running and rebuild on change")
+    args = parser.parse_args()
+    if not args.path:
+        print("Set QUESTION_SNAPSHOT_PATH or pass --path")
+        sys.exit(2)
+
+    if not build(args.path, args.force):
+        print(f"{args.path} is up to date")
+    while args.watch:
+        time.sleep(args.watch)
+        build(args.path)
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Đo thời gian hash mật khẩu trên phần cứng hiện tại và chọn tham số cost
+lớn nhất vẫn nằm trong ngân sách độ trễ cho mỗi lần đăng nhập.
+
+Ví dụ:
+    python scripts/calibrate_password_hash.py --target-ms 250
+    python scripts/calibrate_password_hash.py --scheme argon2 --target-ms 300 --write .env
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core.config import settings
+from app.core.security import build_password_context
+
+SAMPLE_PASSWORD = "calibration-password-123"
+
+def measure_ms(context, samples: int) -> float:
+    timings = []
+    for _ in range(samples):
+        started = time.perf_counter()
+        context.hash(SAMPLE_PASSWORD)
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings)
+
+def calibrate_bcrypt(target_ms: float, samples: int) -> dict:
+    chosen = None
+    for rounds in range(8, 17):
+        ms = measure_ms(build_password_context(scheme="bcrypt", bcrypt_rounds=rounds), samples)
+        print(f"  bcrypt rounds={rounds:<2} {ms:8.1f} ms")
+        if ms > target_ms:
+            break
+        chosen = {"BCRYPT_ROUNDS": rounds, "_ms": ms}
+    # Thấp hơn 10 rounds không an toàn dù phần cứng chậm
+    return chosen or {"BCRYPT_ROUNDS": 10, "_ms": None}
+
+def calibrate_argon2(target_ms: float, samples: int, memory_cost: int, parallelism: int) -> dict | None:
+    from passlib.hash import argon2
+    if not argon2.has_backend():
+        print("  argon2 backend not installed (pip install argon2-cffi), skipping")
+        return None
+    chosen = None
+    for time_cost in range(1, 11):
+        context = build_password_context(
+            scheme="argon2",
+            argon2_time_cost=time_cost,
+            argon2_memory_cost=memory_cost,
+            argon2_parallelism=parallelism,
+        )
+        ms = measure_ms(context, samples)
+        print(f"  argon2 time_cost={time_cost:<2} memory={memory_cost}KiB {ms:8.1f} ms")
+        if ms > target_ms:
+            break
+        chosen = {
+            "ARGON2_TIME_COST": time_cost,
+            "ARGON2_MEMORY_COST": memory_cost,
+            "ARGON2_PARALLELISM": parallelism,
+            "_ms": ms,
+        }
+    return chosen
+
+def write_env(path: str, values: dict):
+    """Cập nhật (hoặc thêm) các biến trong file .env, giữ nguyên các dòng khác."""
+    lines = []
+    if os.path.exists(path):
+        with open(path, encoding="utf-8") as f:
+            lines = f.read().splitlines()
+    remaining = dict(values)
+    for i, line in enumerate(lines):
+        key = line.split("=", 1)[0].strip()
+        if key in remaining:
+            lines[i] = f"{key}={remaining.pop(key)}"
+    lines.extend(f"{key}={value}" for key, value in remaining.items())
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("\n".join(lines) + "\n")
+    print(f"Wrote {', '.join(values)} to {path}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Calibrate password hash cost for this hardware")
+    parser.add_argument("--target-ms", type=float, default=250.0, help="latency budget per hash")
+    parser.add_argument("--scheme", choices=["bcrypt", "argon2"], default=settings.PASSWORD_HASH_SCHEME)
+    parser.add_argument("--samples", type=int, default=3)
+    parser.add_argument("--argon2-memory", type=int, default=settings.ARGON2_MEMORY_COST, help="KiB")
+    parser.add_argument("--argon2-parallelism", type=int, default=settings.ARGON2_PARALLELISM)
+    parser.add_argument("--write", metavar="ENV_FILE", help="write chosen parameters to this .env file")
+    args = parser.parse_args()
+
+    print(f"Target: {args.target_ms:.0f} ms per hash, {os.cpu_count()} CPUs")
+    if args.scheme == "argon2":
+        chosen = calibrate_argon2(args.target_ms, args.samples, args.argon2_memory, args.argon2_parallelism)
+        if chosen is None:
+            sys.exit(1)
+    else:
+        chosen = calibrate_bcrypt(args.target_ms, args.samples)
+
+    ms = chosen.pop("_ms")
+    chosen = {"PASSWORD_HASH_SCHEME": args.scheme, **chosen}
+    print("\nChosen parameters:")
+    for key, value in chosen.items():
+        print(f"  {key}={value}")
+    if ms:
+        workers = max(1, settings.PASSWORD_HASH_WORKERS)
+        print(f"  ~{ms:.0f} ms/hash -> ~{workers * 1000 / ms:.0f} logins/s with {workers} hash workers")
+
+    if args.write:
+        write_env(args.write, chosen)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Chạy EXPLAIN cho các câu truy vấn của service trên database Postgres local
+(đã migrate + seed) và báo lỗi nếu câu nào còn Seq Scan.
+enable_seqscan=off khiến planner luôn chọn index nếu có, nên bảng nhỏ vẫn kiểm tra được.
+
+Ví dụ:
+    alembic upgrade head && python seed_questions.py
+    python scripts/check_query_plans.py
+"""
+
+import os
+import sys
+from datetime import datetime
+from typing import Any, Dict, Iterator, List
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import select, text
+from sqlalchemy.dialects import postgresql
+
+from app.db import queries
+from app.db.session import engine
+from app.models.practice_test import PracticeTest
+from app.models.result import GradingResult
+from app.models.submission import Submission
+from app.models.suggestion import LearningSuggestion
+
+SAMPLE_ID = 1
+SAMPLE_IDS = [1, 2, 3]
+SAMPLE_CREATED_AFTER = datetime(2026, 1, 1)
+
+# Câu lệnh trong app/db/queries.py và các truy vấn còn lại của app/services (kể cả selectinload)
+QUERIES = {
+    "queries.question_pool_count_stmt": queries.question_pool_count_stmt("Toán", "Đại số", "easy"),
+    "queries.sample_question_ids_stmt": queries.sample_question_ids_stmt("Toán", "Đại số", "easy", 10),
+    "queries.claim_selection_stmt": queries.claim_selection_stmt("Toán", "Đại số", "easy", 10, SAMPLE_CREATED_AFTER),
+    "queries.test_questions_stmt": queries.test_questions_stmt(SAMPLE_ID),
+    "queries.answer_key_stmt": queries.answer_key_stmt(SAMPLE_ID),
+    "queries.submission_exists_stmt": queries.submission_exists_stmt(SAMPLE_ID),
+    "queries.result_stmt": queries.result_stmt(SAMPLE_ID, SAMPLE_CREATED_AFTER),
+    "history_service.get_history: submissions of student": select(Submission.id, PracticeTest.title)
+    .join(PracticeTest, PracticeTest.id == Submission.test_id)
+    .where(Submission.student_id == SAMPLE_ID),
+    "history_service.get_history: results of submissions": select(GradingResult.submission_id).where(
+        GradingResult.submission_id.in_(SAMPLE_IDS), GradingResult.created_at >= SAMPLE_CREATED_AFTER
+    ),
+    "suggestions of result": select(LearningSuggestion).where(LearningSuggestion.result_id == SAMPLE_ID),
+    "practice tests of student": select(PracticeTest).where(PracticeTest.student_id == SAMPLE_ID),
+}
+
+def iter_nodes(plan: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+    yield plan
+    for child in plan.get("Plans", []):
+        yield from iter_nodes(child)
+
+def check_query_plans() -> List[str]:
+    failures = []
+    with engine.connect() as conn:
+        conn.execute(text("SET enable_seqscan = off"))
+        for name, stmt in QUERIES.items():
+            sql = str(stmt.compile(dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True}))
+            plan = conn.execute(text(f"EXPLAIN (FORMAT JSON) {sql}")).scalar()[0]["Plan"]
+            seq_scans = [n["Relation Name"] for n in iter_nodes(plan) if n["Node Type"] == "Seq Scan"]
+            scans = sorted({n.get("Index Name") or n["Node Type"] for n in iter_nodes(plan) if "Scan" in n["Node Type"]})
+            if seq_scans:
+                failures.append(name)
+                print(f"FAIL {name}: Seq Scan on {', '.join(seq_scans)}")
+            else:
+                print(f"ok   {name}: {', '.join(scans)}")
+    return failures
+
+if __name__ == "__main__":
+    if engine.dialect.name != "postgresql":
+        print("check_query_plans requires a PostgreSQL DATABASE_URL")
+        sys.exit(2)
+    failed = check_query_plans()
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+"""
+Bù pool đề dựng sẵn (app/core/test_pool.py) về TEST_POOL_DEPTH bộ chưa giao cho
+mỗi tiêu chí, dùng khi không chạy filler nền trong worker (TEST_POOL_FILL_SECONDS=0),
+ví dụ cron trên Vercel/Render hoặc một process riêng:
+    python scripts/fill_test_pool.py
+    python scripts/fill_test_pool.py --watch 5
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core.test_pool import test_pool
+from app.db.session import AsyncSessionLocal, async_engine
+
+async def fill_once():
+    async with AsyncSessionLocal() as db:
+        report = await test_pool.fill(db)
+    for key, result in report.items():
+        print(f"{key}: depth {result['depth']}, created {result['created']}, "
+              f"consumed {result['consumed']}, expired {result['expired']}")
+    stats = test_pool.stats()
+    print(f"Filled {len(report)} criteria in {stats['last_fill_ms']} ms, refill lag {stats['refill_lag_seconds']}s")
+
+async def main(watch: float = None):
+    try:
+        await fill_once()
+        while watch:
+            await asyncio.sleep(watch)
+            await fill_once()
+    finally:
+        await async_engine.dispose()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Top up the pre-generated test pool")
+    parser.add_argument("--watch", type=float, default=None, metavar="SECONDS", help="keep running and refill every SECONDS")
+    args = parser.parse_args()
+    if not test_pool.enabled:
+        print("TEST_POOL_DEPTH is 0, the pre-generated test pool is disabled")
+        sys.exit(2)
+    asyncio.run(main(args.watch))
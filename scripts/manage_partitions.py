@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+"""
+Bảo trì partition theo tháng của submissions và grading_results:
+tạo trước partition các tháng tới và chuyển partition cũ sang lưu trữ lạnh
+(xem app/db/partitions.py). Chạy định kỳ (cron / Render cron job), ví dụ mỗi ngày:
+    python scripts/manage_partitions.py
+    python scripts/manage_partitions.py --no-archive
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core.shards import shard_router
+from app.db.partitions import maintain_partitions
+from app.db.session import async_engine
+
+async def manage_partitions(archive: bool = True):
+    reports = []
+    try:
+        # Bảng partition nằm trên mọi shard khi bật shard (app/core/shards.py)
+        for engine in shard_router.data_engines():
+            # Mỗi lệnh DDL commit riêng để không giữ lock trên bảng cha suốt cả lần chạy
+            async with engine.connect() as conn:
+                conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+                report = await maintain_partitions(conn, archive=archive)
+            print(f"[{engine.url.render_as_string(hide_password=True)}]")
+            for table, changes in report.items():
+                print(f"{table}: created {len(changes['created'])}, archived {len(changes['archived'])}")
+                for name in changes["created"]:
+                    print(f"  + {name}")
+                for name in changes["archived"]:
+                    print(f"  > {name}")
+            reports.append(report)
+        return reports
+    finally:
+        await shard_router.aclose()
+        await async_engine.dispose()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Create upcoming monthly partitions and archive cold ones")
+    parser.add_argument("--no-archive", action="store_true", help="only create upcoming partitions")
+    args = parser.parse_args()
+    if async_engine.dialect.name != "postgresql":
+        print("manage_partitions requires a PostgreSQL DATABASE_URL")
+        sys.exit(2)
+    asyncio.run(manage_partitions(archive=not args.no_archive))
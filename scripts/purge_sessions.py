@@ -0,0 +1,27 @@
+#!/usr/bin/env python3
+"""
+Xóa các refresh token (bảng sessions) đã hết hạn theo từng lô.
+Chạy định kỳ (cron / Render cron job): python scripts/purge_sessions.py
+"""
+
+import asyncio
+import os
+import sys
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core.config import settings
+from app.db.session import AsyncSessionLocal, async_engine
+from app.services.session_service import session_service
+
+async def purge_sessions(batch_size: int = None):
+    try:
+        async with AsyncSessionLocal() as db:
+            deleted = await session_service.purge_expired(db, batch_size=batch_size)
+        print(f"Purged {deleted} expired sessions")
+        return deleted
+    finally:
+        await async_engine.dispose()
+
+if __name__ == "__main__":
+    batch = int(sys.argv[1]) if len(sys.argv) > 1 else settings.SESSION_PURGE_BATCH_SIZE
+    asyncio.run(purge_sessions(batch))
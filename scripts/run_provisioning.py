@@ -0,0 +1,40 @@
+#!/usr/bin/env python3
+"""
+Chạy (tiếp) job tạo tài khoản hàng loạt (app/services/provisioning_service.py)
+trong process này, dùng khi worker tạo job không chạy lâu được (Vercel) hoặc
+job bị dừng giữa chừng. Không truyền id thì chạy mọi job pending, failed hoặc
+running đã quá PROVISION_JOB_STALE_SECONDS không cập nhật:
+    python scripts/run_provisioning.py
+    python scripts/run_provisioning.py 12 13
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core.hashing import password_hasher
+from app.db.session import AsyncSessionLocal, async_engine
+from app.services.provisioning_service import provisioning_service
+
+async def main(job_ids):
+    password_hasher.start()
+    try:
+        async with AsyncSessionLocal() as db:
+            for job_id in job_ids or await provisioning_service.resumable_job_ids(db):
+                if not await provisioning_service.run_job(db, job_id):
+                    print(f"job {job_id}: done or held by another runner, skipped")
+                    continue
+                summary = provisioning_service.summary(await provisioning_service.get_job(db, job_id))
+                print(f"job {job_id}: {summary['created']} created, {summary['conflicts']} conflicts, "
+                      f"{summary['invalid']} invalid of {summary['total_rows']} rows")
+    finally:
+        password_hasher.shutdown()
+        await async_engine.dispose()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run or resume bulk student provisioning jobs")
+    parser.add_argument("job_ids", type=int, nargs="*")
+    args = parser.parse_args()
+    asyncio.run(main(args.job_ids))
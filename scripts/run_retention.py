@@ -0,0 +1,37 @@
+#!/usr/bin/env python3
+"""
+Dọn dữ liệu định kỳ (cron / Render cron job): đề luyện tập chưa nộp quá
+RETENTION_UNSUBMITTED_TEST_DAYS ngày (kèm liên kết câu hỏi), refresh token hết hạn
+và job provisioning đã xong quá PROVISION_JOB_RETENTION_DAYS ngày.
+Xóa theo từng lô RETENTION_BATCH_SIZE dòng, mỗi lô commit riêng.
+    python scripts/run_retention.py
+    python scripts/run_retention.py --days 14 --batch-size 200
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core.shards import shard_router
+from app.db.session import AsyncSessionLocal, async_engine
+from app.services.retention_service import retention_service
+
+async def run_retention(days: int = None, batch_size: int = None):
+    try:
+        async with AsyncSessionLocal() as db:
+            reclaimed = await retention_service.run(db, older_than_days=days, batch_size=batch_size)
+        for table, count in reclaimed.items():
+            print(f"{table}: deleted {count} rows")
+        return reclaimed
+    finally:
+        await shard_router.aclose()
+        await async_engine.dispose()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Delete abandoned practice tests and expired sessions in batches")
+    parser.add_argument("--days", type=int, default=None, help="age of unsubmitted tests to delete")
+    parser.add_argument("--batch-size", type=int, default=None)
+    args = parser.parse_args()
+    asyncio.run(run_retention(args.days, args.batch_size))
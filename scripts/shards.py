@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Chuẩn bị các shard trong DATABASE_SHARD_URLS (xem app/core/shards.py).
+
+    python scripts/shards.py init            # migrate + bỏ khóa ngoại tới users + xen kẽ id + chép câu hỏi
+    python scripts/shards.py sync-questions  # chép lại ngân hàng câu hỏi sau khi seed/sửa/xóa câu hỏi
+
+Đáp án khi chấm bài được đọc trên shard: chạy sync-questions sau mỗi lần đổi ngân
+hàng câu hỏi, hoặc dùng scripts/build_question_snapshot.py (tự sync trước khi dựng
+snapshot). Xem app/db/question_sync.py.
+
+Thử local với nhiều instance Postgres, ví dụ:
+    docker run -d -p 5434:5432 -e POSTGRES_PASSWORD=password postgres:16
+    docker run -d -p 5435:5432 -e POSTGRES_PASSWORD=password postgres:16
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import text
+
+from app.core.config import settings
+from app.db.question_sync import sync_questions
+from app.db.session import create_db_engine, engine
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# users chỉ có ở database chính nên shard không giữ các khóa ngoại này
+USER_FOREIGN_KEYS = [
+    ("practice_tests", "practice_tests_student_id_fkey"),
+    ("submissions", "submissions_student_id_fkey"),
+    ("learning_history", "learning_history_student_id_fkey"),
+]
+# id của các bảng này được sinh trên shard: xen kẽ để duy nhất giữa các shard
+SHARD_SEQUENCES = ["practice_tests", "submissions", "grading_results", "learning_suggestions", "learning_history"]
+
+def migrate(url: str):
+    # env.py đọc DATABASE_URL lúc import nên chạy Alembic trong process riêng cho mỗi shard
+    subprocess.run(
+        [sys.executable, "-m", "alembic", "upgrade", "head"],
+        cwd=ROOT, env={**os.environ, "DATABASE_URL": url}, check=True,
+    )
+
+def prepare_shard(shard_engine, index: int, count: int):
+    with shard_engine.begin() as conn:
+        for table, constraint in USER_FOREIGN_KEYS:
+            conn.execute(text(f"ALTER TABLE {table} DROP CONSTRAINT IF EXISTS {constraint}"))
+        for table in SHARD_SEQUENCES:
+            if conn.execute(text(f"SELECT EXISTS (SELECT 1 FROM {table})")).scalar():
+                print(f"  {table} already has rows, keeping its id sequence")
+                continue
+            conn.execute(text(f"ALTER SEQUENCE {table}_id_seq INCREMENT BY {count} RESTART WITH {index + 1}"))
+
+def print_sync_report(report):
+    print(f"  synced {report['upserted']} questions, deleted {report['deleted']}")
+    if report["kept"]:
+        # Còn được đề trên shard dùng: giữ để đề cũ vẫn xem/chấm được
+        print(f"  kept {len(report['kept'])} questions removed from the main database but used by tests: "
+              f"{', '.join(map(str, report['kept'][:20]))}{' ...' if len(report['kept']) > 20 else ''}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Prepare student data shards")
+    parser.add_argument("command", choices=["init", "sync-questions"])
+    args = parser.parse_args()
+
+    urls = settings.shard_urls
+    if not urls:
+        print("DATABASE_SHARD_URLS is empty, nothing to do")
+        sys.exit(2)
+
+    for index, url in enumerate(urls):
+        shard_engine = create_db_engine(url, pool_mode="null")
+        print(f"shard{index}: {shard_engine.url.render_as_string(hide_password=True)}")
+        if args.command == "init":
+            migrate(url)
+            prepare_shard(shard_engine, index, len(urls))
+        print_sync_report(sync_questions(engine, shard_engine))
+        shard_engine.dispose()
+
+if __name__ == "__main__":
+    main()
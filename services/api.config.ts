@@ -13,27 +13,75 @@ export const apiClient = axios.create({
   },
 });
 
+// Thời điểm lần ghi gần nhất do backend trả về: gửi lại để đọc ngay sau khi ghi
+// (vd. xem kết quả sau khi nộp bài) không rơi vào read replica còn trễ
+const LAST_WRITE_KEY = 'edunexia_last_write';
+
 apiClient.interceptors.request.use((config) => {
   const token = localStorage.getItem('edunexia_token');
   if (token && config.headers) {
     config.headers.Authorization = `Bearer ${token}`;
   }
+  const lastWrite = localStorage.getItem(LAST_WRITE_KEY);
+  if (lastWrite && config.headers) {
+    config.headers['X-DB-Last-Write'] = lastWrite;
+  }
   return config;
 }, (error) => {
   return Promise.reject(error);
 });
 
+// Dùng chung một lời gọi refresh cho mọi request bị 401 cùng lúc
+let refreshPromise: Promise<string | null> | null = null;
+
+const refreshAccessToken = async (): Promise<string | null> => {
+  const refreshToken = localStorage.getItem('edunexia_refresh_token');
+  if (!refreshToken) return null;
+  try {
+    const response = await axios.post(`${BASE_URL}/auth/student/refresh`, { refresh_token: refreshToken });
+    const data = response.data?.data;
+    if (!data?.access_token) return null;
+    localStorage.setItem('edunexia_token', data.access_token);
+    if (data.refresh_token) {
+      localStorage.setItem('edunexia_refresh_token', data.refresh_token);
+    }
+    return data.access_token;
+  } catch {
+    return null;
+  }
+};
+
 apiClient.interceptors.response.use(
-  (response) => response,
-  (error) => {
+  (response) => {
+    const lastWrite = response.headers?.['x-db-last-write'];
+    if (lastWrite) {
+      localStorage.setItem(LAST_WRITE_KEY, lastWrite);
+    }
+    return response;
+  },
+  async (error) => {
     // Tránh redirect loop: Chỉ chuyển hướng nếu lỗi 401 
     // Không redirect nếu đang ở trang login hoặc trang callback xác thực
     const isAuthPage = window.location.pathname.includes('/login') ||
       window.location.pathname.includes('/auth/callback');
 
+    const originalRequest = error.config;
+    if (error.response?.status === 401 && originalRequest && !originalRequest._retry) {
+      // Access token ngắn hạn đã hết hạn: thử lấy token mới bằng refresh token rồi gửi lại request
+      originalRequest._retry = true;
+      refreshPromise = refreshPromise || refreshAccessToken().finally(() => { refreshPromise = null; });
+      const newToken = await refreshPromise;
+      if (newToken) {
+        originalRequest.headers = originalRequest.headers || {};
+        originalRequest.headers.Authorization = `Bearer ${newToken}`;
+        return apiClient(originalRequest);
+      }
+    }
+
     if (error.response?.status === 401 && !isAuthPage) {
       console.warn(`[API] 401 Unauthorized at ${window.location.pathname}. Redirecting to login...`);
       localStorage.removeItem('edunexia_token');
+      localStorage.removeItem('edunexia_refresh_token');
       localStorage.removeItem('edunexia_user');
 
       const details = error.response?.data?.detail || 'session_expired';
@@ -48,6 +96,11 @@ export const setAuthToken = (token: string) => {
   localStorage.setItem('edunexia_token', token);
 };
 
+export const setRefreshToken = (token: string) => {
+  localStorage.setItem('edunexia_refresh_token', token);
+};
+
 export const clearAuthToken = () => {
   localStorage.removeItem('edunexia_token');
+  localStorage.removeItem('edunexia_refresh_token');
 };
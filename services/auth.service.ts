@@ -20,3 +20,12 @@ export async function register(data: UserCreate): Promise<APIResponse<Token>> {
   const response = await apiClient.post<APIResponse<Token>>('/auth/student/register', data);
   return response.data;
 }
+
+/**
+ * Thu hồi refresh token hiện tại khi đăng xuất
+ * @param {string} refreshToken - Refresh token đang lưu
+ */
+export async function logout(refreshToken: string): Promise<APIResponse<null>> {
+  const response = await apiClient.post<APIResponse<null>>('/auth/student/logout', { refresh_token: refreshToken });
+  return response.data;
+}
@@ -13,6 +13,19 @@ export async function generateTest(data: TestGenerateRequest): Promise<APIRespon
   return response.data;
 }
 
+/**
+ * Tạo đề và nhận luôn nội dung đề trong cùng một request
+ * @param {TestGenerateRequest} data - Môn học, chủ đề, độ khó
+ * @returns {Promise<APIResponse<TestContent & {test_id: number}>>}
+ */
+export async function generateTestWithContent(data: TestGenerateRequest): Promise<APIResponse<TestContent & {test_id: number}>> {
+  const response = await apiClient.post<APIResponse<TestContent & {test_id: number}>>(
+    '/practice-tests/generate',
+    { ...data, include_content: true }
+  );
+  return response.data;
+}
+
 /**
  * Lấy nội dung đầy đủ của đề thi (bao gồm danh sách câu hỏi)
  * @param {number} testId - ID của đề thi
@@ -0,0 +1,28 @@
+"""
+Kiểm thử tự động, chạy không cần Postgres/Redis/Google thật:
+
+    python -m unittest discover -s tests -t .
+
+Mỗi lần chạy dùng các file SQLite tạm làm stand-in cho database chính, một read
+replica và hai shard (xem tests/support.py). Biến môi trường phải đặt trước khi
+import app vì settings và các router được tạo lúc import.
+"""
+
+import os
+import tempfile
+
+DATA_DIR = tempfile.mkdtemp(prefix="edunexia-tests-")
+
+
+def sqlite_url(name: str) -> str:
+    return f"sqlite:///{os.path.join(DATA_DIR, name)}.db"
+
+
+os.environ.update({
+    "DATABASE_URL": sqlite_url("primary"),
+    "DATABASE_REPLICA_URLS": sqlite_url("replica"),
+    "DATABASE_SHARD_URLS": ",".join([sqlite_url("shard0"), sqlite_url("shard1")]),
+    "BCRYPT_ROUNDS": "4",
+    "PASSWORD_HASH_WORKERS": "0",
+    "LOGIN_RATE_LIMIT_BACKEND": "memory",
+})
@@ -0,0 +1,77 @@
+from typing import Any, Dict, Iterable, List
+
+import httpx
+from sqlalchemy import insert
+
+from tests import sqlite_url  # noqa: F401  (đặt biến môi trường trước khi import app)
+
+from app.core import security
+from app.core.auth_cache import principal_cache, token_version_cache
+from app.core.config import settings
+from app.core.database import create_db_engine
+from app.models import Base, Question, User
+
+API = settings.API_V1_STR
+
+
+def database_urls() -> List[str]:
+    return [settings.DATABASE_URL, *settings.replica_urls, *settings.shard_urls]
+
+
+def reset_databases() -> None:
+    """Tạo lại schema trống trên database chính, replica và các shard."""
+    # Id user được dùng lại sau mỗi lần reset: bỏ trạng thái xác thực đã cache của user cũ
+    principal_cache.clear()
+    token_version_cache.clear()
+    for url in database_urls():
+        engine = create_db_engine(url, pool_mode="null")
+        Base.metadata.drop_all(engine)
+        Base.metadata.create_all(engine)
+        engine.dispose()
+
+
+def insert_rows(url: str, table: Any, rows: Iterable[Dict[str, Any]]) -> None:
+    engine = create_db_engine(url, pool_mode="null")
+    with engine.begin() as conn:
+        conn.execute(insert(table), list(rows))
+    engine.dispose()
+
+
+def question_rows(ids: Iterable[int], subject: str = "math", topic: str = "alg", level: str = "easy") -> List[Dict[str, Any]]:
+    return [
+        {
+            "id": i, "subject": subject, "topic": topic, "level": level,
+            "content": f"q{i}", "options": "[]", "correct_answer": "A", "explanation": "e",
+        }
+        for i in ids
+    ]
+
+
+def add_questions(urls: Iterable[str], ids: Iterable[int], **criteria: str) -> None:
+    rows = question_rows(ids, **criteria)
+    for url in urls:
+        insert_rows(url, Question, rows)
+
+
+def add_user(username: str, role: str = "student", password: str = "password123") -> int:
+    """Tạo user trên database chính, trả về id."""
+    engine = create_db_engine(settings.DATABASE_URL, pool_mode="null")
+    with engine.begin() as conn:
+        user_id = conn.execute(
+            insert(User).returning(User.id),
+            {
+                "username": username, "email": f"{username}@example.com", "full_name": username,
+                "hashed_password": security.get_password_hash(password), "role": role,
+                "is_active": True, "is_locked": False, "token_version": 0,
+            },
+        ).scalar_one()
+    engine.dispose()
+    return user_id
+
+
+def auth_headers(user_id: int, role: str = "student") -> Dict[str, str]:
+    return {"Authorization": f"Bearer {security.create_access_token(user_id, role=role, token_version=0)}"}
+
+
+def client(app: Any, **kwargs: Any) -> httpx.AsyncClient:
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://testserver", **kwargs)
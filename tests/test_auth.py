@@ -0,0 +1,50 @@
+import unittest
+
+from tests import support
+
+from app.main import app
+
+
+class ChangePasswordTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        support.reset_databases()
+        support.add_user("alice", password="old-password")
+
+    async def login(self, c, password):
+        return await c.post(f"{support.API}/auth/student/login", json={"username": "alice", "password": password})
+
+    async def test_change_password_revokes_every_session(self):
+        async with support.client(app) as c:
+            first = (await self.login(c, "old-password")).json()["data"]
+            second = (await self.login(c, "old-password")).json()["data"]
+            old_headers = {"Authorization": f"Bearer {first['access_token']}"}
+
+            wrong = await c.post(
+                f"{support.API}/auth/student/change-password",
+                json={"current_password": "nope", "new_password": "new-password"},
+                headers=old_headers,
+            )
+            self.assertEqual(wrong.status_code, 401)
+
+            changed = await c.post(
+                f"{support.API}/auth/student/change-password",
+                json={"current_password": "old-password", "new_password": "new-password"},
+                headers=old_headers,
+            )
+            self.assertEqual(changed.status_code, 200)
+            fresh = changed.json()["data"]
+
+            # Access token và refresh token cũ của mọi phiên đều bị thu hồi
+            self.assertEqual((await c.get(f"{support.API}/auth/student/me", headers=old_headers)).status_code, 401)
+            for session in (first, second):
+                refreshed = await c.post(f"{support.API}/auth/student/refresh", json={"refresh_token": session["refresh_token"]})
+                self.assertEqual(refreshed.status_code, 401)
+
+            fresh_headers = {"Authorization": f"Bearer {fresh['access_token']}"}
+            self.assertEqual((await c.get(f"{support.API}/auth/student/me", headers=fresh_headers)).status_code, 200)
+            self.assertEqual((await self.login(c, "old-password")).status_code, 401)
+            self.assertEqual((await self.login(c, "new-password")).status_code, 200)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,32 @@
+import unittest
+
+from tests import support  # noqa: F401
+
+from app.core.database import normalize_database_url
+
+
+class NormalizeDatabaseUrlTest(unittest.TestCase):
+    def test_sqlite_urls_are_unchanged(self):
+        for url in ("sqlite:///./x.db", "sqlite:///:memory:", "sqlite:////tmp/x.db", "sqlite://"):
+            self.assertEqual(normalize_database_url(url), (url, False))
+
+    def test_postgres_urls_use_psycopg(self):
+        for url in ("postgres://u:p@db:5432/app", "postgresql://u:p@db:5432/app"):
+            self.assertEqual(normalize_database_url(url), ("postgresql+psycopg://u:p@db:5432/app", False))
+        self.assertEqual(
+            normalize_database_url("postgresql+psycopg://u:p@db/app")[0], "postgresql+psycopg://u:p@db/app"
+        )
+
+    def test_pgbouncer_flag_is_removed_from_query(self):
+        url, pgbouncer = normalize_database_url("postgresql://u:p@db:6543/app?pgbouncer=true&sslmode=require")
+        self.assertTrue(pgbouncer)
+        self.assertEqual(url, "postgresql+psycopg://u:p@db:6543/app?sslmode=require")
+        self.assertEqual(normalize_database_url("postgresql://u:p@db/app?pgbouncer=false")[1], False)
+
+    def test_password_special_characters_survive(self):
+        url, _ = normalize_database_url("postgresql://user:p%40ss%2Fw0rd@db/app?pgbouncer=true")
+        self.assertEqual(url, "postgresql+psycopg://user:p%40ss%2Fw0rd@db/app")
+
+
+if __name__ == "__main__":
+    unittest.main()
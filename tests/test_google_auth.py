@@ -0,0 +1,130 @@
+import time
+import unittest
+from collections import Counter
+from unittest import mock
+from urllib.parse import parse_qs, urlsplit
+
+import httpx
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from jose import jwk, jwt
+from sqlalchemy import select
+
+from tests import support
+
+from app.api.v1.endpoints import auth_google
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.main import app
+from app.models import User
+from app.services.google_auth import GoogleOAuthClient
+
+CLIENT_ID = "test-client.apps.googleusercontent.com"
+
+
+def rsa_key() -> bytes:
+    key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    return key.private_bytes(
+        serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption()
+    )
+
+
+class FakeGoogle:
+    """Token endpoint và JWKS của Google chạy trong process, nối vào client qua httpx.MockTransport."""
+
+    def __init__(self):
+        self.keys = {"k1": rsa_key()}
+        self.signing_kid = "k1"
+        self.audience = CLIENT_ID
+        self.email = "new.student@school.edu"
+        self.calls: Counter = Counter()
+
+    def rotate(self, kid: str) -> None:
+        self.keys[kid] = rsa_key()
+        self.signing_kid = kid
+
+    def id_token(self) -> str:
+        now = int(time.time())
+        claims = {
+            "iss": "https://accounts.google.com", "aud": self.audience, "sub": "google-123",
+            "email": self.email, "email_verified": True, "name": "New Student",
+            "iat": now, "exp": now + 300,
+        }
+        return jwt.encode(claims, self.keys[self.signing_kid], algorithm="RS256", headers={"kid": self.signing_kid})
+
+    def __call__(self, request: httpx.Request) -> httpx.Response:
+        url = str(request.url)
+        if url == settings.GOOGLE_TOKEN_URL:
+            self.calls["token"] += 1
+            form = parse_qs(request.content.decode())
+            if form.get("code") != ["good-code"]:
+                return httpx.Response(400, json={"error": "invalid_grant"})
+            return httpx.Response(200, json={"access_token": "google-access", "id_token": self.id_token()})
+        if url == settings.GOOGLE_JWKS_URL:
+            self.calls["jwks"] += 1
+            keys = [
+                {**jwk.construct(pem, "RS256").public_key().to_dict(), "kid": kid, "use": "sig"}
+                for kid, pem in self.keys.items()
+            ]
+            return httpx.Response(200, json={"keys": keys}, headers={"Cache-Control": "public, max-age=3600"})
+        self.calls["other"] += 1
+        return httpx.Response(404)
+
+
+class GoogleCallbackTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        support.reset_databases()
+        self.google = FakeGoogle()
+        self.oauth = GoogleOAuthClient(transport=httpx.MockTransport(self.google))
+        for patcher in (
+            mock.patch.object(auth_google, "google_oauth_client", self.oauth),
+            mock.patch.multiple(settings, GOOGLE_CLIENT_ID=CLIENT_ID, GOOGLE_CLIENT_SECRET="secret"),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    async def asyncTearDown(self):
+        await self.oauth.aclose()
+
+    async def _callback(self, code: str = "good-code") -> dict:
+        async with support.client(app) as c:
+            response = await c.get(f"{support.API}/auth/google/callback", params={"code": code})
+        self.assertEqual(response.status_code, 302)
+        location = urlsplit(response.headers["location"])
+        self.assertEqual(location.path, "/auth/callback")
+        return {k: v[0] for k, v in parse_qs(location.query).items()}
+
+    async def test_login_creates_user_and_reuses_cached_jwks(self):
+        first = await self._callback()
+        second = await self._callback()
+
+        for params in (first, second):
+            self.assertIn("token", params)
+            self.assertIn("refresh_token", params)
+        # id_token được xác thực cục bộ: JWKS tải một lần, không gọi UserInfo
+        self.assertEqual(self.google.calls, Counter(token=2, jwks=1))
+        async with AsyncSessionLocal() as db:
+            users = (await db.scalars(select(User).where(User.email == self.google.email))).all()
+        self.assertEqual([u.username for u in users], ["newstudent"])
+
+    async def test_key_rotation_refreshes_jwks_once(self):
+        await self._callback()
+        self.google.rotate("k2")
+
+        params = await self._callback()
+
+        self.assertIn("token", params)
+        self.assertEqual(self.google.calls["jwks"], 2)
+
+    async def test_rejects_token_for_another_client(self):
+        self.google.audience = "someone-else.apps.googleusercontent.com"
+        self.assertEqual((await self._callback())["error"], "user_info_failed")
+
+    async def test_failed_code_exchange_redirects_with_error(self):
+        params = await self._callback(code="bad-code")
+        self.assertEqual(params, {"error": "token_failed", "status": "400"})
+        self.assertEqual(self.google.calls["jwks"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,106 @@
+import asyncio
+import csv
+import io
+import unittest
+from datetime import datetime, timedelta
+from unittest import mock
+
+from sqlalchemy import select, update
+
+from tests import support
+
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.main import app
+from app.models import ProvisioningJob, ProvisioningRow
+from app.services.provisioning_service import provisioning_service
+
+JOB_TIMEOUT = 10
+
+
+def roster(count: int) -> bytes:
+    lines = ["username,email,full_name,password"]
+    lines += [f"s{i},s{i}@school.edu,Student {i}," for i in range(count)]
+    lines.append("bad name,bad,Bad,")  # không hợp lệ
+    lines.append("taken,taken@school.edu,Taken,")  # trùng tài khoản đã có
+    return "\n".join(lines).encode()
+
+
+class BulkProvisioningTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        support.reset_databases()
+        self.headers = support.auth_headers(support.add_user("admin", role="admin"), role="admin")
+        support.add_user("taken")
+
+    async def _wait_done(self, c, job_id):
+        for _ in range(JOB_TIMEOUT * 20):
+            job = (await c.get(f"{support.API}/admin/students/bulk/{job_id}", headers=self.headers)).json()["data"]
+            if job["status"] in ("done", "failed"):
+                return job
+            await asyncio.sleep(0.05)
+        self.fail(f"job {job_id} did not finish")
+
+    async def test_job_returns_every_temporary_password(self):
+        with mock.patch.object(settings, "PROVISION_BATCH_SIZE", 7):
+            async with support.client(app) as c:
+                response = await c.post(
+                    f"{support.API}/admin/students/bulk",
+                    files={"file": ("roster.csv", roster(30), "text/csv")},
+                    headers=self.headers,
+                )
+                self.assertEqual(response.status_code, 202)
+                job = await self._wait_done(c, response.json()["data"]["job_id"])
+                self.assertEqual((job["created"], job["conflicts"], job["invalid"]), (30, 1, 1))
+
+                result = await c.get(f"{support.API}/admin/students/bulk/{job['job_id']}/result", headers=self.headers)
+                rows = list(csv.DictReader(io.StringIO(result.text)))
+                created = [r for r in rows if r["status"] == "created"]
+                self.assertEqual(len(created), 30)
+                self.assertTrue(all(r["temporary_password"] for r in created))
+
+                login = await c.post(
+                    f"{support.API}/auth/student/login",
+                    json={"username": created[0]["username"], "password": created[0]["temporary_password"]},
+                )
+                self.assertEqual(login.status_code, 200)
+
+    async def test_interrupted_job_resumes_from_pending_rows(self):
+        with mock.patch.object(settings, "PROVISION_BATCH_SIZE", 5):
+            async with AsyncSessionLocal() as db:
+                job = await provisioning_service.create_job(db, iter(list(provisioning_service.read_rows(io.BytesIO(roster(12))))))
+                job_id = job.id
+                # Runner dừng sau lô đầu: lô đã commit giữ nguyên kết quả
+                rows = (await db.execute(
+                    select(ProvisioningRow.id, ProvisioningRow.username, ProvisioningRow.email, ProvisioningRow.full_name,
+                           ProvisioningRow.password, ProvisioningRow.temporary_password)
+                    .where(ProvisioningRow.job_id == job_id, ProvisioningRow.status == "pending")
+                    .order_by(ProvisioningRow.row).limit(5)
+                )).all()
+                await provisioning_service._process_batch(db, job_id, rows)
+                await db.execute(
+                    update(ProvisioningJob).where(ProvisioningJob.id == job_id)
+                    .values(status="running", heartbeat_at=datetime.utcnow() - timedelta(hours=1))
+                )
+                await db.commit()
+
+            async with support.client(app) as c:
+                response = await c.post(f"{support.API}/admin/students/bulk/{job_id}/resume", headers=self.headers)
+                self.assertEqual(response.status_code, 202)
+                job = await self._wait_done(c, job_id)
+        self.assertEqual((job["status"], job["created"], job["processed_rows"]), ("done", 12, 14))
+
+    async def test_resume_rejects_running_job(self):
+        async with AsyncSessionLocal() as db:
+            job = await provisioning_service.create_job(db, iter([]))
+            await db.execute(
+                update(ProvisioningJob).where(ProvisioningJob.id == job.id)
+                .values(status="running", heartbeat_at=datetime.utcnow())
+            )
+            await db.commit()
+        async with support.client(app) as c:
+            response = await c.post(f"{support.API}/admin/students/bulk/{job.id}/resume", headers=self.headers)
+        self.assertEqual(response.status_code, 400)
+
+
+if __name__ == "__main__":
+    unittest.main()
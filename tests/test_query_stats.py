@@ -0,0 +1,27 @@
+import unittest
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import OperationalError
+
+from tests import support  # noqa: F401
+
+from app.core import query_stats  # noqa: F401  (đăng ký listener trên Engine)
+
+
+class QueryTimingTest(unittest.TestCase):
+    def test_failed_statement_does_not_leave_start_time_on_connection(self):
+        engine = create_engine("sqlite://")
+        with engine.connect() as conn:
+            for _ in range(3):
+                with self.assertRaises(OperationalError):
+                    conn.execute(text("SELECT * FROM missing_table"))
+                conn.rollback()
+            self.assertEqual(conn.info["query_started_at"], [])
+            # Câu lệnh sau vẫn đo được thời gian
+            self.assertEqual(conn.execute(text("SELECT 1")).scalar(), 1)
+            self.assertEqual(conn.info["query_started_at"], [])
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    unittest.main()
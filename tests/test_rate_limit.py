@@ -0,0 +1,103 @@
+import math
+import unittest
+from unittest import mock
+
+from tests import support
+
+from app.core.config import settings
+from app.core.rate_limit import MemoryBucketBackend, login_rate_limiter
+from app.main import app
+
+try:
+    import fakeredis
+except ImportError:  # pragma: no cover - cài bằng requirements-dev.txt
+    fakeredis = None
+
+CAPACITY = 3
+PER_MINUTE = 6
+RETRY_AFTER = str(math.ceil(60 / PER_MINUTE))
+
+
+class LoginRateLimitTest(unittest.IsolatedAsyncioTestCase):
+    """Đăng nhập sai liên tục: CAPACITY lần đầu tới bcrypt (401), lần sau bị chặn 429."""
+
+    @classmethod
+    def setUpClass(cls):
+        support.reset_databases()
+
+    def setUp(self):
+        self.patches = [
+            mock.patch.object(settings, "LOGIN_RATE_LIMIT_USERNAME_CAPACITY", CAPACITY),
+            mock.patch.object(settings, "LOGIN_RATE_LIMIT_USERNAME_PER_MINUTE", PER_MINUTE),
+            mock.patch.object(login_rate_limiter, "_backend", None),
+        ]
+        for patch in self.patches:
+            patch.start()
+
+    async def asyncTearDown(self):
+        await login_rate_limiter.aclose()
+        for patch in reversed(self.patches):
+            patch.stop()
+
+    def use_redis(self, on_failure: str, connected: bool = True) -> None:
+        server = fakeredis.FakeServer()
+        server.connected = connected
+        for patch in (
+            mock.patch.object(settings, "LOGIN_RATE_LIMIT_BACKEND", "redis"),
+            mock.patch.object(settings, "REDIS_URL", "redis://stand-in:6379/0"),
+            mock.patch.object(settings, "LOGIN_RATE_LIMIT_REDIS_FAILURE", on_failure),
+            mock.patch("redis.asyncio.from_url", lambda url: fakeredis.FakeAsyncRedis(server=server)),
+        ):
+            patch.start()
+            self.patches.append(patch)
+
+    async def attempts(self, count: int):
+        async with support.client(app) as c:
+            return [
+                await c.post(f"{support.API}/auth/student/login", json={"username": "mallory", "password": "wrong"})
+                for _ in range(count)
+            ]
+
+    def assert_throttled_after_capacity(self, responses):
+        self.assertEqual([r.status_code for r in responses[:CAPACITY]], [401] * CAPACITY)
+        self.assertEqual(responses[CAPACITY].status_code, 429)
+        self.assertEqual(responses[CAPACITY].headers["retry-after"], RETRY_AFTER)
+
+    async def test_memory_backend(self):
+        self.assert_throttled_after_capacity(await self.attempts(CAPACITY + 1))
+        self.assertIsInstance(login_rate_limiter.backend, MemoryBucketBackend)
+
+    @unittest.skipIf(fakeredis is None, "fakeredis is not installed")
+    async def test_redis_backend(self):
+        self.use_redis("memory")
+        self.assert_throttled_after_capacity(await self.attempts(CAPACITY + 1))
+        stats = login_rate_limiter.stats()
+        self.assertEqual((stats["backend"], stats["errors"]), ("redis", 0))
+
+    @unittest.skipIf(fakeredis is None, "fakeredis is not installed")
+    async def test_redis_down_falls_back_to_memory(self):
+        self.use_redis("memory", connected=False)
+        self.assert_throttled_after_capacity(await self.attempts(CAPACITY + 1))
+        stats = login_rate_limiter.stats()
+        self.assertGreater(stats["errors"], 0)
+        self.assertEqual(stats["fallbacks"], stats["errors"])
+        self.assertIsNotNone(stats["last_error"])
+
+    @unittest.skipIf(fakeredis is None, "fakeredis is not installed")
+    async def test_redis_down_fail_closed(self):
+        self.use_redis("closed", connected=False)
+        response, = await self.attempts(1)
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response.headers["retry-after"], RETRY_AFTER)
+        self.assertEqual(login_rate_limiter.stats()["rejected_on_error"], 1)
+
+    @unittest.skipIf(fakeredis is None, "fakeredis is not installed")
+    async def test_redis_down_fail_open(self):
+        self.use_redis("open", connected=False)
+        responses = await self.attempts(CAPACITY + 2)
+        self.assertEqual({r.status_code for r in responses}, {401})
+        self.assertGreater(login_rate_limiter.stats()["errors"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,88 @@
+import time
+import unittest
+from unittest import mock
+
+from tests import support
+
+from app.core.config import settings
+from app.core.database import RoutingSession
+from app.core.replicas import LAST_WRITE_HEADER, replica_router
+from app.main import app
+from app.models import PracticeTest
+from app.models.question import test_question_association
+
+
+class ReadYourWritesTest(unittest.IsolatedAsyncioTestCase):
+    """Primary và một replica SQLite; replica chỉ có dữ liệu khi test chép sang (mô phỏng độ trễ replication)."""
+
+    async def asyncSetUp(self):
+        support.reset_databases()
+        # Không shard: bảng dữ liệu học sinh đọc từ replica như khi chỉ cấu hình DATABASE_REPLICA_URLS
+        patcher = mock.patch.object(RoutingSession, "router", None)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        support.add_questions([settings.DATABASE_URL, settings.replica_urls[0]], range(1, 6))
+        self.student_id = support.add_user("student")
+        self.headers = support.auth_headers(self.student_id)
+        replica_router._recent_writers.clear()
+
+    async def _generate(self, c):
+        response = await c.post(
+            f"{support.API}/practice-tests/generate", headers=self.headers,
+            json={"subject": "math", "topic": "alg", "level": "easy", "question_count": 3},
+        )
+        self.assertEqual(response.status_code, 200, response.text)
+        return response.json()["data"]["test_id"], response.headers.get(LAST_WRITE_HEADER)
+
+    async def _content(self, c, test_id, **headers):
+        return await c.get(f"{support.API}/practice-tests/{test_id}/content", headers={**self.headers, **headers})
+
+    def _replicate(self, test_id):
+        support.insert_rows(settings.replica_urls[0], PracticeTest, [
+            {"id": test_id, "title": "t", "subject": "math", "student_id": self.student_id},
+        ])
+        support.insert_rows(settings.replica_urls[0], test_question_association, [
+            {"test_id": test_id, "question_id": q} for q in range(1, 4)
+        ])
+
+    async def test_write_response_pins_next_read_to_primary(self):
+        async with support.client(app) as c:
+            test_id, last_write = await self._generate(c)
+            self.assertIsNotNone(last_write)
+            # Worker khác không nhớ user vừa ghi: chỉ header giữ read-your-writes
+            replica_router._recent_writers.clear()
+
+            pinned = replica_router.pinned_reads
+            self.assertEqual((await self._content(c, test_id, **{LAST_WRITE_HEADER: last_write})).status_code, 200)
+            self.assertEqual(replica_router.pinned_reads, pinned + 1)
+
+            # Không header: đọc replica, nơi đề chưa được chép sang
+            self.assertEqual((await self._content(c, test_id)).status_code, 404)
+
+    async def test_worker_remembers_recent_writer_without_header(self):
+        async with support.client(app) as c:
+            test_id, _ = await self._generate(c)
+            self.assertEqual((await self._content(c, test_id)).status_code, 200)
+
+    async def test_reads_go_to_replica_once_write_is_old(self):
+        async with support.client(app) as c:
+            test_id, _ = await self._generate(c)
+            replica_router._recent_writers.clear()
+            self._replicate(test_id)
+            stale = f"{time.time() - settings.DB_READ_YOUR_WRITES_SECONDS - 1:.3f}"
+
+            reads = replica_router.replica_reads
+            self.assertEqual((await self._content(c, test_id, **{LAST_WRITE_HEADER: stale})).status_code, 200)
+            self.assertEqual(replica_router.replica_reads, reads + 1)
+
+    async def test_unhealthy_replica_falls_back_to_primary(self):
+        async with support.client(app) as c:
+            test_id, _ = await self._generate(c)
+            replica_router._recent_writers.clear()
+            replica = replica_router.replicas[0]
+            with mock.patch.object(replica, "healthy", False):
+                self.assertEqual((await self._content(c, test_id)).status_code, 200)
+
+
+if __name__ == "__main__":
+    unittest.main()
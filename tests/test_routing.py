@@ -0,0 +1,115 @@
+import asyncio
+import unittest
+from unittest import mock
+
+from fastapi import APIRouter, FastAPI
+
+from tests import support
+
+from app.api.routing import ManagedRoute
+from app.core.config import settings
+from app.core.exceptions import AuthException, EduNexiaException, RateLimitException
+from app.core.rate_limit import MemoryBucketBackend, login_rate_limiter
+from app.main import app as main_app
+from app.main import edunexia_exception_handler
+
+RESPONSE_TIMEOUT = 5
+
+
+def build_app(state: dict) -> FastAPI:
+    router = APIRouter(route_class=ManagedRoute)
+
+    @router.post("/throttled")
+    async def throttled():
+        raise RateLimitException(retry_after=7)
+
+    @router.post("/unauthorized")
+    async def unauthorized():
+        raise AuthException()
+
+    @router.post("/ok")
+    async def ok():
+        return {"ok": True}
+
+    @router.post("/slow")
+    async def slow():
+        state["started"].set()
+        try:
+            await asyncio.sleep(60)
+        except asyncio.CancelledError:
+            state["cancelled"] = True
+            raise
+
+    app = FastAPI()
+    app.include_router(router)
+    app.add_exception_handler(EduNexiaException, edunexia_exception_handler)
+    return app
+
+
+class ManagedRouteTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.state = {"started": asyncio.Event(), "cancelled": False}
+        self.app = build_app(self.state)
+
+    async def _post(self, path: str):
+        async with support.client(self.app) as c:
+            return await asyncio.wait_for(c.post(path), RESPONSE_TIMEOUT)
+
+    async def test_handler_raising_immediately_returns_response(self):
+        response = await self._post("/throttled")
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response.headers["retry-after"], "7")
+
+        response = await self._post("/unauthorized")
+        self.assertEqual(response.status_code, 401)
+
+    async def test_no_watcher_task_left_behind(self):
+        before = len(asyncio.all_tasks())
+        for path in ("/ok", "/throttled", "/unauthorized") * 5:
+            await self._post(path)
+        await asyncio.sleep(0.05)
+        self.assertEqual(len(asyncio.all_tasks()), before)
+
+    async def test_client_disconnect_cancels_handler(self):
+        disconnected = asyncio.Event()
+        messages = [{"type": "http.request", "body": b"", "more_body": False}]
+        sent = []
+
+        async def receive():
+            if messages:
+                return messages.pop(0)
+            await disconnected.wait()
+            return {"type": "http.disconnect"}
+
+        async def send(message):
+            sent.append(message)
+
+        scope = {
+            "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "POST",
+            "scheme": "http", "path": "/slow", "raw_path": b"/slow", "root_path": "", "query_string": b"",
+            "headers": [(b"host", b"testserver")], "client": ("127.0.0.1", 1), "server": ("testserver", 80),
+        }
+        call = asyncio.ensure_future(self.app(scope, receive, send))
+        await asyncio.wait_for(self.state["started"].wait(), RESPONSE_TIMEOUT)
+        disconnected.set()
+        await asyncio.wait_for(call, RESPONSE_TIMEOUT)
+        self.assertTrue(self.state["cancelled"])
+        self.assertEqual(sent[0]["status"], 504)
+
+
+class LoginThrottleRouteTest(unittest.IsolatedAsyncioTestCase):
+    async def test_login_with_empty_bucket_returns_429(self):
+        # Bucket dung lượng 0: bị chặn ngay ở lần đầu, trước khi chạm database
+        with mock.patch.object(settings, "LOGIN_RATE_LIMIT_USERNAME_CAPACITY", 0), \
+                mock.patch.object(login_rate_limiter, "_backend", MemoryBucketBackend(100)):
+            async with support.client(main_app) as c:
+                response = await asyncio.wait_for(
+                    c.post(f"{support.API}/auth/student/login", json={"username": "alice", "password": "x"}),
+                    RESPONSE_TIMEOUT,
+                )
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response.headers["retry-after"], "12")
+
+
+if __name__ == "__main__":
+    unittest.main()
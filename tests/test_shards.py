@@ -0,0 +1,107 @@
+import unittest
+from datetime import datetime, timedelta
+
+from sqlalchemy import func, insert, select, update
+
+from tests import support
+
+from app.core.config import settings
+from app.core.database import create_db_engine
+from app.core.shards import shard_router
+from app.db.question_sync import sync_questions
+from app.main import app
+from app.models import GradingResult, PracticeTest, Question, Submission
+from app.models.question import test_question_association
+
+
+def count_rows(url, model):
+    engine = create_db_engine(url, pool_mode="null")
+    with engine.connect() as conn:
+        count = conn.execute(select(func.count()).select_from(model)).scalar()
+    engine.dispose()
+    return count
+
+
+class QuestionSyncTest(unittest.TestCase):
+    def setUp(self):
+        support.reset_databases()
+        self.main = create_db_engine(settings.DATABASE_URL, pool_mode="null")
+        self.shard = create_db_engine(settings.shard_urls[0], pool_mode="null")
+
+    def tearDown(self):
+        self.main.dispose()
+        self.shard.dispose()
+
+    def _shard_questions(self):
+        with self.shard.connect() as conn:
+            return dict(conn.execute(select(Question.id, Question.content)).all())
+
+    def test_sync_upserts_and_deletes_questions_missing_from_main(self):
+        support.add_questions([settings.DATABASE_URL], [1, 2, 3])
+        support.add_questions([settings.shard_urls[0]], [1, 4, 5])
+        with self.main.begin() as conn:
+            conn.execute(update(Question).where(Question.id == 1).values(content="edited"))
+        # Câu 5 đã bị xóa ở database chính nhưng còn nằm trong một đề trên shard
+        with self.shard.begin() as conn:
+            test_id = conn.execute(
+                insert(PracticeTest).returning(PracticeTest.id),
+                {"title": "t", "subject": "math", "student_id": 1},
+            ).scalar_one()
+            conn.execute(insert(test_question_association), [{"test_id": test_id, "question_id": 5}])
+
+        report = sync_questions(self.main, self.shard, batch_size=2)
+
+        self.assertEqual(report, {"upserted": 3, "deleted": 1, "kept": [5]})
+        self.assertEqual(self._shard_questions(), {1: "edited", 2: "q2", 3: "q3", 5: "q5"})
+
+
+class ShardRoutingTest(unittest.IsolatedAsyncioTestCase):
+    """Database chính và hai shard SQLite: học sinh id lẻ ở shard1, id chẵn ở shard0."""
+
+    async def asyncSetUp(self):
+        support.reset_databases()
+        # Câu hỏi chỉ có trên shard: đề chỉ tạo được nếu chọn câu trên shard của học sinh
+        support.add_questions(settings.shard_urls, range(1, 6))
+        self.students = [support.add_user("odd"), support.add_user("even")]
+
+    async def _take_test(self, c, student_id):
+        headers = support.auth_headers(student_id)
+        generated = await c.post(
+            f"{support.API}/practice-tests/generate", headers=headers,
+            json={"subject": "math", "topic": "alg", "level": "easy", "question_count": 5},
+        )
+        self.assertEqual(generated.status_code, 200, generated.text)
+        test_id = generated.json()["data"]["test_id"]
+
+        now = datetime.utcnow()
+        submitted = await c.post(
+            f"{support.API}/practice-tests/{test_id}/submit-online", headers=headers,
+            json={
+                "answers": {str(q): "A" for q in range(1, 6)},
+                "start_time": (now - timedelta(minutes=10)).isoformat(), "end_time": now.isoformat(),
+            },
+        )
+        self.assertEqual(submitted.status_code, 200, submitted.text)
+        submission_id = submitted.json()["data"]["submission_id"]
+        result = await c.get(f"{support.API}/submissions/{submission_id}/result", headers=headers)
+        self.assertEqual(result.status_code, 200, result.text)
+        return result.json()["data"]
+
+    async def test_student_data_lives_on_the_students_shard(self):
+        async with support.client(app) as c:
+            for student_id in self.students:
+                result = await self._take_test(c, student_id)
+                # Đáp án đọc trên shard
+                self.assertEqual((result["total_questions"], result["correct_answers"]), (5, 5))
+
+        for model in (PracticeTest, Submission, GradingResult):
+            self.assertEqual(count_rows(settings.DATABASE_URL, model), 0)
+            for url in settings.shard_urls:
+                self.assertEqual(count_rows(url, model), 1, f"{model.__tablename__} on {url}")
+        self.assertEqual(
+            sorted(shard_router.shard_index(s) for s in self.students), list(range(len(settings.shard_urls)))
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
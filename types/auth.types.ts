@@ -6,6 +6,10 @@
 export interface Token {
   access_token: string;
   token_type: string;
+  /** Refresh token xoay vòng, dùng để lấy access token mới khi hết hạn */
+  refresh_token?: string;
+  /** Thời gian sống của access token (giây) */
+  expires_in?: number;
   /** Đính kèm thông tin user (tùy chỉnh trong auth_service.py) */
   user?: UserOut;
 }
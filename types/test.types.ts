@@ -9,6 +9,8 @@ export interface TestGenerateRequest {
   level: 'easy' | 'medium' | 'hard';
   /** Số lượng câu hỏi (mặc định 10) */
   question_count?: number;
+  /** true: trả luôn nội dung đề (TestContent) trong response */
+  include_content?: boolean;
 }
 
 /**